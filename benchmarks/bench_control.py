@@ -0,0 +1,244 @@
+"""Load test for the local control server
+
+Usage: python benchmarks/bench_control.py [--commands N] [--clients C] [--depth D]
+                                          [--tcp] [--connect ADDRESS]
+
+Starts a control server on a headless core, with a thread standing in for the
+Tk loop (commands reach it in batches through a queue, like the event bus),
+then drives it with C clients that each keep D "next" commands in flight.
+Reports commands/sec and round-trip latency percentiles, first unpipelined
+and then pipelined, then sends more commands than a connection's reply
+queue holds (MAX_PENDING) in a single write and checks every one is answered.
+Against the local server it finally has clients flood commands without
+reading the replies and then disconnect, and checks that their connections
+are cleaned up and the server still stops promptly. --connect drives a
+running overlay instead: a socket path, or host:port for TCP.
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vtask_core import TrackerCore
+from control_server import ControlServer, core_handlers, MAX_PENDING
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def connect(address):
+    if isinstance(address, tuple):
+        sock = socket.create_connection(address)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(address)
+    return sock
+
+
+def run_client(address, count, depth, samples, errors):
+    """Send `count` commands keeping `depth` in flight; latency is send to matching reply"""
+    sock = connect(address)
+    reader = sock.makefile('rb')
+    sent_at = []
+    received = 0
+    try:
+        while received < count:
+            window = min(depth - (len(sent_at) - received), count - len(sent_at))
+            if window > 0:
+                now = time.perf_counter()
+                sent_at.extend([now] * window)
+                sock.sendall(b"next\n" * window)
+            line = reader.readline()
+            if not line:
+                errors.append("connection closed")
+                return
+            samples.append(time.perf_counter() - sent_at[received])
+            received += 1
+            if not line.startswith(b"ok"):
+                errors.append(line.decode('utf-8', 'replace').strip())
+    finally:
+        reader.close()
+        sock.close()
+
+
+def load_test(address, commands, clients, depth):
+    samples = []
+    errors = []
+    threads = [threading.Thread(target=run_client, args=(address, commands // clients, depth, samples, errors))
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, samples, errors
+
+
+def burst_test(address, count, timeout=30):
+    """Send `count` commands in one write; returns (seconds, replies received before the timeout)"""
+    sock = connect(address)
+    sock.settimeout(timeout)
+    reader = sock.makefile('rb')
+    received = 0
+    start = time.perf_counter()
+    try:
+        sock.sendall(b"next\n" * count)
+        while received < count and reader.readline():
+            received += 1
+    except socket.timeout:
+        pass
+    finally:
+        reader.close()
+        sock.close()
+    return time.perf_counter() - start, received
+
+
+def abandon_test(server, clients=2, timeout=5):
+    """Flood without reading replies until both sides back up, then disconnect
+
+    Returns the number of connections still open after `timeout` seconds.
+    """
+    socks = []
+    for _ in range(clients):
+        sock = connect(server.address)
+
+        def flood(sock=sock):
+            try:
+                sock.sendall(b"next\n" * (MAX_PENDING * 200))
+            except OSError:
+                pass
+        threading.Thread(target=flood, daemon=True).start()
+        socks.append(sock)
+    # Long enough for the reply queue and the socket buffers to fill
+    time.sleep(1)
+    for sock in socks:
+        sock.shutdown(socket.SHUT_RDWR)
+        sock.close()
+    deadline = time.perf_counter() + timeout
+    while server._connections and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    return len(server._connections)
+
+
+def start_local_server(tmp, use_tcp, steps):
+    """Serve a headless core, running commands on a stand-in UI thread"""
+    core = TrackerCore(keybind_config_file=os.path.join(tmp, 'keybind_config.json'),
+                       settings_file=os.path.join(tmp, 'overlay_settings.json'),
+                       journal_file=os.path.join(tmp, 'progress.journal'),
+                       template=os.path.join(tmp, 'guide.json'),
+                       snapshot_file=os.path.join(tmp, 'startup.bin'),
+                       library_index_file=os.path.join(tmp, 'library.bin'),
+                       personal_bests_file=os.path.join(tmp, 'personal_bests.json'),
+                       bookmarks_file=os.path.join(tmp, 'bookmarks.json'))
+    with open(core.current_template, 'w', encoding='utf-8') as f:
+        json.dump({"title": "bench", "steps": [f"Step {i}" for i in range(steps)]}, f)
+    core.start()
+    core.load_guide()
+
+    ui_queue = queue.Queue(256)
+
+    def submit(callback):
+        try:
+            ui_queue.put_nowait(callback)
+        except queue.Full:
+            return False
+        return True
+
+    def ui_loop():
+        while True:
+            callback = ui_queue.get()
+            if callback is None:
+                return
+            callback()
+
+    ui_thread = threading.Thread(target=ui_loop, name="FakeUI", daemon=True)
+    ui_thread.start()
+    if use_tcp:
+        server = ControlServer(core_handlers(core), submit, tcp_port=0)
+    else:
+        server = ControlServer(core_handlers(core), submit, unix_path=os.path.join(tmp, 'control.sock'))
+    server.start()
+
+    def stop():
+        server.stop()
+        ui_queue.put(None)
+        ui_thread.join()
+        core.close()
+    return server, stop
+
+
+def parse_address(text):
+    host, sep, port = text.rpartition(':')
+    if sep and port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--commands', type=int, default=50000, help="commands per run, split across clients")
+    parser.add_argument('--clients', type=int, default=1)
+    parser.add_argument('--depth', type=int, default=64, help="commands each client keeps in flight when pipelining")
+    parser.add_argument('--tcp', action='store_true', help="use loopback TCP instead of a Unix socket")
+    parser.add_argument('--connect', help="address of a running overlay's control server")
+    args = parser.parse_args()
+
+    if not args.tcp and not args.connect and not hasattr(socket, 'AF_UNIX'):
+        args.tcp = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        stop = None
+        if args.connect:
+            address = parse_address(args.connect)
+        else:
+            server, stop = start_local_server(tmp, args.tcp, args.commands + 1)
+            address = server.address
+        try:
+            runs = []
+            for depth in (1, args.depth):
+                runs.append((depth, load_test(address, args.commands, args.clients, depth)))
+            burst = MAX_PENDING + 1000
+            burst_elapsed, burst_received = burst_test(address, burst)
+            leaked = abandon_test(server) if server is not None else None
+        finally:
+            if stop is not None:
+                stop_start = time.perf_counter()
+                stop()
+                stop_elapsed = time.perf_counter() - stop_start
+
+    print(f"{'depth':<8}{'cmds/s':>12}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    failed = False
+    for depth, (elapsed, samples, errors) in runs:
+        if not samples:
+            print(f"{depth:<8}{'-':>12}")
+            failed = True
+            continue
+        print(f"{depth:<8}{len(samples) / elapsed:>12.0f}{percentile(samples, 0.5) * 1e6:>10.1f}"
+              f"{percentile(samples, 0.99) * 1e6:>10.1f}{max(samples) * 1e6:>10.1f}")
+        if errors:
+            print(f"  {len(errors)} errors, first: {errors[0]}")
+            failed = True
+    print(f"burst of {burst} in one write: {burst_received} replies in {burst_elapsed * 1000:.0f} ms")
+    if burst_received != burst:
+        failed = True
+    if server is not None:
+        print(f"server: {server.commands} commands in {server.batches} batches")
+        print(f"abandoned clients: {leaked} connections left open, server stopped in {stop_elapsed * 1000:.0f} ms")
+        if leaked or stop_elapsed > 1:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Template load time and file size: JSON versus the binary .vtg format
+
+Usage: python benchmarks/bench_formats.py [--sizes 1000 10000 100000 500000]
+
+For each guide size, times a cold open through TrackerCore (no startup
+snapshot, no sidecar index) followed by reading the first, middle and last
+step, and a full read of every step. Prints the file sizes alongside.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vtask_core import TrackerCore
+from binary_template import write_binary_template
+
+
+def best_of(func, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def format_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    return f"{seconds * 1000:.2f} ms"
+
+
+def measure(core, path, repeats):
+    """Return (cold open + three steps, full read) in seconds"""
+    def open_cold():
+        core.snapshot.entries.clear()
+        try:
+            os.remove(path + '.idx')
+        except OSError:
+            pass
+        core.open_template_file(path)
+        steps = core.steps
+        steps[0], steps[len(steps) // 2], steps[-1]
+
+    def read_all():
+        for _ in core.steps:
+            pass
+    open_time = best_of(open_cold, repeats)
+    read_time = best_of(read_all, 3)
+    return open_time, read_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 500000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        core = TrackerCore(keybind_config_file=os.path.join(tmp, 'keybind_config.json'),
+                           settings_file=os.path.join(tmp, 'overlay_settings.json'),
+                           journal_file=os.path.join(tmp, 'progress.journal'),
+                           snapshot_file=os.path.join(tmp, 'startup.bin'),
+                           library_index_file=os.path.join(tmp, 'library.bin'))
+        print(f"{'steps':>8}  {'format':<6}{'size':>12}{'open':>12}{'read all':>12}")
+        for count in args.sizes:
+            steps = [f"Step {i}: go to waypoint {i} and loot the chest" for i in range(count)]
+            json_path = os.path.join(tmp, f'guide_{count}.json')
+            binary_path = os.path.join(tmp, f'guide_{count}.vtg')
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({"title": f"{count} steps", "steps": steps}, f, indent=2)
+            write_binary_template(binary_path, f"{count} steps", steps)
+            del steps
+
+            repeats = 3 if count > 10000 else 10
+            for label, path in (('json', json_path), ('vtg', binary_path)):
+                open_time, read_time = measure(core, path, repeats)
+                size = os.path.getsize(path)
+                print(f"{count:>8}  {label:<6}{size / 1024:>9.0f} KB{format_time(open_time):>12}"
+                      f"{format_time(read_time):>12}")
+        core.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
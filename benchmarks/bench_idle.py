@@ -0,0 +1,100 @@
+"""Hook cost and background wakeups with the overlay active and idle
+
+Usage: python benchmarks/bench_idle.py [--events N] [--seconds S]
+
+Feeds N raw key events (mostly unbound gameplay keys) through the hook with
+the full keybind index and with the idle index (restore chord only), then
+counts process wakeups while the hot-reload watcher sits on an unchanged
+template. The Tk side needs a display; measure it with
+`python vrising_overlay.py --measure-idle 10`.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run_benchmarks import FakeKey, FakeKeyCode, make_core, write_template
+from panel_dispatch import PanelDispatcher
+from key_hook import KeyHook
+from keybind_index import MODIFIER_BITS
+from hot_reload import TemplateWatcher
+from idle_stats import context_switches
+
+
+def feed_hook(dispatcher, events):
+    """Return (wall seconds, CPU seconds, keys passed on to matching) for `events` keystrokes"""
+    matched = []
+
+    def on_key(name, hook_start):
+        matched.append(name)
+        dispatcher.handle_key(name)
+    hook = KeyHook(dispatcher, on_key,
+                   {FakeKey.shift: MODIFIER_BITS['shift'], FakeKey.ctrl: MODIFIER_BITS['ctrl']}, FakeKey)
+    chars = {char: FakeKeyCode(char) for char in 'wasdeqrfDR'}
+    # Gameplay keys, then a next-step chord and a restore chord with Shift held
+    burst = [(chars[c], True) for c in 'wwwawwdwsssqerf'] + [(FakeKey.space, True), (FakeKey.tab, True)]
+    burst += [(FakeKey.shift, False), (chars['D'], True), (chars['R'], True), (FakeKey.shift, None)]
+    pairs = (burst * (events // len(burst) + 1))[:events]
+    on_press = hook.on_press
+    on_release = hook.on_release
+    start, cpu = time.perf_counter(), time.process_time()
+    # True: press and release; False: press only; None: release only
+    for key, tap in pairs:
+        if tap is not None:
+            on_press(key)
+        if tap is not False:
+            on_release(key)
+    return time.perf_counter() - start, time.process_time() - cpu, len(matched)
+
+
+def watcher_wakeups(workdir, seconds):
+    """Process wakeups per second while the template watcher waits on an unchanged file"""
+    path = os.path.join(workdir, 'watched.json')
+    write_template(path, 10)
+    started = threading.Event()
+    watcher = TemplateWatcher(path, lambda: None, on_start=started.set).start()
+    started.wait(5)
+    before = context_switches()
+    time.sleep(seconds)
+    after = context_switches()
+    watcher.stop()
+    if before is None or after is None:
+        return None
+    return (after - before) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--seconds', type=float, default=2.0, help="how long to count watcher wakeups")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        core = make_core(workdir)
+        dispatcher = PanelDispatcher(core)
+        print(f"{'hook':<10}{'ns/event':>10}{'CPU ms':>10}{'matched':>10}")
+        # matched: keys that got past the filter into keybind matching
+        for state, idle in (('active', False), ('idle', True)):
+            dispatcher.set_idle(idle)
+            wall, cpu, matched = feed_hook(dispatcher, args.events)
+            print(f"{state:<10}{wall / args.events * 1e9:>10.0f}{cpu * 1000:>10.1f}{matched:>10}")
+        core.close()
+
+        baseline = context_switches()
+        time.sleep(args.seconds)
+        quiet = context_switches()
+        wakeups = watcher_wakeups(workdir, args.seconds)
+    if wakeups is None or baseline is None:
+        print("watcher wakeups: n/a (needs /proc)")
+    else:
+        print(f"wakeups/s: {(quiet - baseline) / args.seconds:.1f} without a watcher, "
+              f"{wakeups:.1f} with one idle")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Navigation latency with and without the progress journal
+
+Usage: python benchmarks/bench_journal.py [--steps N] [--budget-us US]
+
+Simulates the navigation hot path (advance the step, record progress) and
+reports per-call latency percentiles. Exits non-zero if journaling adds more
+than the budget at p99.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from progress_journal import ProgressJournal
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def navigate(count, journal, template):
+    """Step through `count` positions, timing each navigation"""
+    samples = []
+    perf_counter = time.perf_counter
+    current_step = 0
+    for _ in range(count):
+        start = perf_counter()
+        current_step += 1
+        if journal is not None:
+            journal.record(template, current_step)
+        samples.append(perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--steps', type=int, default=200000)
+    parser.add_argument('--budget-us', type=float, default=50.0,
+                        help="maximum p99 overhead added by journaling, in microseconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, 'guide.json')
+        baseline = navigate(args.steps, None, template)
+
+        journal = ProgressJournal(os.path.join(tmp, 'progress.journal'))
+        journal.load()
+        journal.start()
+        journaled = navigate(args.steps, journal, template)
+        start = time.perf_counter()
+        journal.close()
+        close_time = time.perf_counter() - start
+
+        replay = ProgressJournal(os.path.join(tmp, 'progress.journal'))
+        replay.load()
+        resumed = replay.get(template)
+
+    rows = [('baseline', baseline), ('journal', journaled)]
+    print(f"{'mode':<10}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    for name, samples in rows:
+        print(f"{name:<10}{percentile(samples, 0.5) * 1e6:>10.2f}{percentile(samples, 0.99) * 1e6:>10.2f}"
+              f"{max(samples) * 1e6:>10.2f}")
+    overhead = (percentile(journaled, 0.99) - percentile(baseline, 0.99)) * 1e6
+    print(f"p99 overhead: {overhead:.2f} us (budget {args.budget_us:.0f} us), "
+          f"final flush: {close_time * 1000:.1f} ms, resumed at step {resumed}")
+
+    if resumed != args.steps:
+        print("FAIL: journal did not replay the last position")
+        return 1
+    if overhead > args.budget_us:
+        print("FAIL: journaling slowed navigation")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
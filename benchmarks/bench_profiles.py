@@ -0,0 +1,141 @@
+"""Stress test for switching keybind profiles under a flood of keystrokes
+
+Usage: python benchmarks/bench_profiles.py [--taps N] [--interval SECONDS]
+
+A hook thread feeds N rounds of raw key events (Shift held throughout, a
+chord bound the same in both profiles, one bound differently in each, and
+unbound gameplay keys) through KeyHook while a second thread, standing in
+for the Tk loop, flips between two profiles every --interval seconds. Fails
+if a chord shared by both profiles is ever missed, an unbound key matches,
+or modifier/held-key state is lost.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run_benchmarks import FakeKey, FakeKeyCode, make_core
+from panel_dispatch import PanelDispatcher
+from key_hook import KeyHook
+from keybind_index import MODIFIER_BITS
+
+PROFILES = {
+    "active": "vrising",
+    "profiles": {
+        "vrising": {
+            "next_step": {"modifiers": ["shift"], "key": "d"},
+            "previous_step": {"modifiers": ["shift"], "key": "s"},
+        },
+        "valheim": {
+            "next_step": {"modifiers": ["shift"], "key": "n"},
+            "previous_step": {"modifiers": ["shift"], "key": "s"},
+        },
+    },
+}
+
+
+def flood(hook, taps, done):
+    """Hold Shift and tap S, D, N and gameplay keys `taps` times"""
+    chars = {char: FakeKeyCode(char) for char in 'SDNWAE'}
+    round_keys = [chars[c] for c in 'SDNWWAE']
+    on_press = hook.on_press
+    on_release = hook.on_release
+    on_press(FakeKey.shift)
+    try:
+        for _ in range(taps):
+            for key in round_keys:
+                on_press(key)
+                on_release(key)
+    finally:
+        on_release(FakeKey.shift)
+        done.set()
+
+
+def switch_loop(core, dispatcher, interval, done, switches):
+    """Flip between the two profiles until the flood ends, recording (core, swap) seconds per switch"""
+    names = core.keybind_profiles.names()
+    while not done.is_set():
+        name = names[len(switches) % len(names)]
+        start = time.perf_counter()
+        core.switch_keybind_profile(name)
+        swap = time.perf_counter()
+        dispatcher.switch_profile(name)
+        switches.append((swap - start, time.perf_counter() - swap))
+        time.sleep(interval)
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def median(samples):
+    return sorted(samples)[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--taps', type=int, default=50000, help="rounds of keys, each with one shared chord")
+    parser.add_argument('--interval', type=float, default=0.0005, help="seconds between profile switches")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, 'keybind_config.json'), 'w', encoding='utf-8') as f:
+            json.dump(PROFILES, f)
+        core = make_core(workdir)
+        # No debounce, so every chord that matches also fires
+        core.repeat_engine.update_settings({action: {'debounce': 0} for action in ('next_step', 'previous_step')})
+        dispatcher = PanelDispatcher(core)
+        fired = {}
+
+        def on_key(name, hook_start):
+            match = dispatcher.handle_key(name)
+            if match is not None:
+                fired[match[1]] = fired.get(match[1], 0) + 1
+        hook = KeyHook(dispatcher, on_key, {FakeKey.shift: MODIFIER_BITS['shift']}, FakeKey)
+        hook.prepare([table[0] for table in dispatcher.profile_tables.values()])
+
+        done = threading.Event()
+        switches = []
+        switcher = threading.Thread(target=switch_loop, args=(core, dispatcher, args.interval, done, switches))
+        start = time.perf_counter()
+        switcher.start()
+        flood(hook, args.taps, done)
+        elapsed = time.perf_counter() - start
+        switcher.join()
+
+        rebuild = min(timed(dispatcher.rebuild) for _ in range(20))
+        state_ok = dispatcher.modifier_mask == 0 and not dispatcher._held
+        core.close()
+
+    events = args.taps * 7 * 2 + 2
+    shared = fired.get('previous_step', 0)
+    swapped = fired.get('next_step', 0)
+    print(f"{events} events in {elapsed * 1000:.0f} ms ({elapsed / events * 1e9:.0f} ns/event), "
+          f"{len(switches)} profile switches")
+    print(f"switch on the UI thread: core {median([s[0] for s in switches]) * 1e6:.1f} us, "
+          f"hook table swap {median([s[1] for s in switches]) * 1e6:.1f} us "
+          f"(full rebuild {rebuild * 1e6:.1f} us), no listener restart")
+    print(f"shared chord fired {shared}/{args.taps}, per-profile chord fired {swapped}/{args.taps}, "
+          f"other actions {sum(fired.values()) - shared - swapped}")
+    failed = False
+    if shared != args.taps:
+        print(f"FAIL: {args.taps - shared} presses of a chord bound in both profiles were lost")
+        failed = True
+    if not 0 < swapped <= 2 * args.taps or len(fired) > 2:
+        print(f"FAIL: unexpected matches {fired}")
+        failed = True
+    if not state_ok:
+        print("FAIL: modifier or held-key state left behind")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
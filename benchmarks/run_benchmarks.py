@@ -0,0 +1,568 @@
+"""Headless benchmark suite for the tracker core
+
+Usage:
+    python benchmarks/run_benchmarks.py [--quick] [--tolerance 0.75]
+    python benchmarks/run_benchmarks.py --update-baseline
+
+Every case is timed as the best of several repeats and divided by a fixed
+pure-Python calibration workload, so results are comparable across machines.
+Cases that spawn an interpreter are divided by the startup time of a bare
+interpreter instead. Scores are checked against benchmarks/baseline.json, and
+a case that looks slower by more than the tolerance is measured again before
+the run fails.
+"""
+import argparse
+import enum
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from vtask_core import TrackerCore
+from panel_dispatch import PanelDispatcher
+from key_hook import KeyHook
+from keybind_index import MODIFIER_BITS
+from binary_template import write_binary_template
+from hot_reload import TemplateReloader
+from file_writer import ChunkFeed
+from template_text import EditorLines
+from playlist import Playlist
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Slowdowns smaller than this are timer and disk noise, whatever the relative change
+MIN_SLACK_SECONDS = 1e-3
+# Times a case that looks like a regression is measured again before the run fails
+RECHECK_RUNS = 2
+# Cases dominated by process creation, scored against a bare interpreter's startup
+PROCESS_CASES = {'startup_core'}
+
+LOAD_SIZES = [1000, 10000, 100000, 500000]
+QUICK_LOAD_SIZES = [1000, 10000, 100000]
+
+
+def best_of(func, repeats=5):
+    """Return the fastest of several timed calls"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate():
+    """Time a fixed workload used as the unit for every score"""
+    def workload():
+        total = 0
+        data = {}
+        for i in range(200000):
+            total += i * i
+            data[i & 1023] = total
+        return total
+    return best_of(workload, repeats=7)
+
+
+def calibrate_process():
+    """Time a bare interpreter start, the unit for cases in PROCESS_CASES"""
+    return best_of(lambda: subprocess.run([sys.executable, '-c', 'pass'], check=True), repeats=5)
+
+
+def write_template(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"title": f"{count} steps", "steps": [f"Step {i}: go to waypoint {i} and loot the chest"
+                                                          for i in range(count)]}, f, indent=2)
+
+
+def make_core(workdir):
+    return TrackerCore(keybind_config_file=os.path.join(workdir, 'keybind_config.json'),
+                       settings_file=os.path.join(workdir, 'overlay_settings.json'),
+                       journal_file=os.path.join(workdir, 'progress.journal'),
+                       template=os.path.join(workdir, 'guide.json'),
+                       snapshot_file=os.path.join(workdir, 'startup.bin'),
+                       library_index_file=os.path.join(workdir, 'library.bin'),
+                       personal_bests_file=os.path.join(workdir, 'personal_bests.json'),
+                       bookmarks_file=os.path.join(workdir, 'bookmarks.json'))
+
+
+def bench_dispatch(workdir):
+    """Seconds for 200k keystrokes through modifier tracking and keybind matching"""
+    core = make_core(workdir)
+    keys = ['w', 'a', 's', 'd', 'space', 'e', '1', 'f1', 'q', 'r'] * 10000
+
+    def run():
+        for key in keys:
+            core.press_modifier(1)
+            core.handle_key(key)
+            core.release_key(key)
+            core.release_modifier(1)
+            core.handle_key(key)
+            core.release_key(key)
+    elapsed = best_of(run, repeats=3)
+    core.close()
+    return elapsed
+
+
+def bench_dispatch_panels(workdir, panels):
+    """Seconds for 200k keystrokes through the shared dispatcher with `panels` guide panels open"""
+    core = make_core(workdir)
+    dispatcher = PanelDispatcher(core)
+    for number in range(1, panels):
+        keybinds = {
+            "next_step": {"modifiers": ["ctrl", "alt"], "key": str(number)},
+            "previous_step": {"modifiers": ["alt", "shift"], "key": str(number)},
+        }
+        dispatcher.add_panel(TrackerCore.create_panel(core, f'panel_{number}.json', keybinds), f'panel {number}')
+    keys = ['w', 'a', 's', 'd', 'space', 'e', '1', 'f1', 'q', 'r'] * 10000
+
+    def run():
+        for key in keys:
+            dispatcher.press_modifier(1)
+            dispatcher.handle_key(key)
+            dispatcher.release_key(key)
+            dispatcher.release_modifier(1)
+            dispatcher.handle_key(key)
+            dispatcher.release_key(key)
+    elapsed = best_of(run, repeats=3)
+    for panel_core in dispatcher.cores[1:]:
+        panel_core.close()
+    core.close()
+    return elapsed
+
+
+class FakeKeyCode:
+    """Stand-in for pynput's KeyCode"""
+    __slots__ = ('char', 'vk')
+
+    def __init__(self, char=None, vk=None):
+        self.char = char
+        self.vk = vk
+
+
+FakeKey = enum.Enum('FakeKey', {name: FakeKeyCode(vk=vk) for name, vk in [
+    ('shift', 0xA0), ('ctrl', 0xA2), ('alt', 0xA4), ('space', 0x20), ('tab', 0x09),
+    ('esc', 0x1B), ('enter', 0x0D), ('f1', 0x70), ('f3', 0x72)]})
+
+
+def bench_hook(workdir):
+    """Seconds for 200k raw press/release events through the hook callbacks, mostly unbound gameplay keys"""
+    core = make_core(workdir)
+    dispatcher = PanelDispatcher(core)
+    hook = KeyHook(dispatcher, lambda name, hook_start: dispatcher.handle_key(name),
+                   {FakeKey.shift: MODIFIER_BITS['shift'], FakeKey.ctrl: MODIFIER_BITS['ctrl']}, FakeKey)
+    chars = {char: FakeKeyCode(char) for char in 'wasdeqrfcDS1234'}
+    # One second of frantic play: movement, abilities and the odd guide keybind
+    burst = [chars[c] for c in 'wwwawwdwsss'] + [FakeKey.space, chars['e'], chars['1'], chars['q'],
+                                                chars['2'], FakeKey.tab, chars['r'], FakeKey.esc, chars['f']]
+    keys = burst * (100000 // len(burst))
+    keys += [FakeKey.shift, chars['D'], chars['D'], FakeKey.shift] * ((100000 - len(keys)) // 4)
+    on_press = hook.on_press
+    on_release = hook.on_release
+
+    def run():
+        for key in keys:
+            on_press(key)
+            on_release(key)
+    elapsed = best_of(run, repeats=3)
+    core.close()
+    return elapsed
+
+
+def bench_load(workdir, count, cached):
+    """Seconds to open a template of `count` steps and render its first step"""
+    path = os.path.join(workdir, f'load_{count}.json')
+    if not os.path.exists(path):
+        write_template(path, count)
+    core = make_core(workdir)
+
+    def run():
+        if not cached:
+            core.snapshot.entries.clear()
+            try:
+                os.remove(path + '.idx')
+            except OSError:
+                pass
+        core.open_template_file(path)
+        core.current_step_text()
+    elapsed = best_of(run, repeats=3 if count > 10000 else 10)
+    core.close()
+    return elapsed
+
+
+def bench_load_binary(workdir, count):
+    """Seconds to open a binary .vtg template of `count` steps and render its first step"""
+    path = os.path.join(workdir, f'load_{count}.vtg')
+    write_binary_template(path, f"{count} steps", [f"Step {i}: go to waypoint {i} and loot the chest"
+                                                   for i in range(count)])
+    core = make_core(workdir)
+
+    def run():
+        core.open_template_file(path)
+        core.current_step_text()
+    elapsed = best_of(run, repeats=10)
+    core.close()
+    return elapsed
+
+
+def bench_playlist_switch(workdir, count, prefetched):
+    """Seconds the caller is blocked advancing to the next `count`-step playlist guide and rendering its first step"""
+    paths = [os.path.join(workdir, f'playlist_{count}_{i}.json') for i in range(2)]
+    for path in paths:
+        if not os.path.exists(path):
+            write_template(path, count)
+    core = make_core(workdir)
+    core.playlist = Playlist(paths)
+    best = float('inf')
+    for _ in range(5):
+        core.open_template_file(paths[0])
+        if prefetched:
+            core.prefetcher.wait()
+        else:
+            core.prefetcher.request([])
+        core.snapshot.entries.clear()
+        start = time.perf_counter()
+        core.next_template()
+        core.current_step_text()
+        best = min(best, time.perf_counter() - start)
+        assert core.current_template == paths[1]
+    core.close()
+    return best
+
+
+def bench_save(workdir, count):
+    """Seconds to save a template of `count` steps, until it is on disk"""
+    core = make_core(workdir)
+    core.set_steps([f"Step {i}: go to waypoint {i} and loot the chest" for i in range(count)])
+    path = os.path.join(workdir, f'save_{count}.json')
+
+    def save():
+        core.save_template_file(path)
+        core.flush_writes()
+    elapsed = best_of(save, repeats=3)
+    core.close()
+    return elapsed
+
+
+def bench_save_queue(workdir, count):
+    """Seconds the caller (the Tk thread) is blocked saving a template of `count` steps"""
+    core = make_core(workdir)
+    core.set_steps([f"Step {i}: go to waypoint {i} and loot the chest" for i in range(count)])
+    path = os.path.join(workdir, f'save_queue_{count}.json')
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        core.save_template_file(path)
+        best = min(best, time.perf_counter() - start)
+        core.flush_writes()
+    core.close()
+    return best
+
+
+def bench_save_keybinds(workdir):
+    """Seconds to save the keybind configuration, until it is on disk"""
+    core = make_core(workdir)
+
+    def save():
+        core.save_keybind_config()
+        core.flush_writes()
+    elapsed = best_of(save, repeats=10)
+    core.close()
+    return elapsed
+
+
+def bench_sections(workdir, count, sections):
+    """Seconds for 10k section moves plus counter updates in a guide of `count` steps in `sections` sections"""
+    path = os.path.join(workdir, f'sections_{count}.json')
+    per_section = count // sections
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"title": "sections", "sections": [
+            {"title": f"Chapter {i}", "sections": [
+                {"title": "Part A", "steps": [f"Step {i}.{j}" for j in range(per_section // 2)]},
+                {"title": "Part B", "steps": [f"Step {i}.{j}" for j in range(per_section // 2, per_section)]}]}
+            for i in range(sections)]}, f)
+    core = make_core(workdir)
+    core.open_template_file(path)
+
+    def run():
+        core.current_step = 0
+        for i in range(10000):
+            if i % 4 == 3:
+                core.previous_section()
+            else:
+                core.next_section()
+            core.step_counter_text()
+    elapsed = best_of(run, repeats=3)
+    core.close()
+    return elapsed
+
+
+def bench_editor(workdir, count, chunk=2000):
+    """Seconds per single-line edit in a `count`-line editor, and to stream-save it until on disk"""
+    lines = [f"# Chapter {i // 100}" if i % 100 == 0 else f"Step {i}: go to waypoint {i} and loot the chest"
+             for i in range(count)]
+    model = EditorLines()
+    model.replace(0, 1, lines)
+    edits = 10000
+
+    def edit():
+        for i in range(edits):
+            model.replace(i * 7 % count, 1, [f"Edited step {i}"])
+    edit_time = best_of(edit, repeats=3) / edits
+
+    core = make_core(workdir)
+    path = os.path.join(workdir, f'editor_{count}.json')
+
+    def save():
+        feed = ChunkFeed()
+        core.save_template_lines(path, "editor", feed)
+        for start in range(0, count, chunk):
+            feed.put(lines[start:start + chunk])
+        feed.close()
+        core.flush_writes()
+    save_time = best_of(save, repeats=3)
+    core.close()
+    return edit_time, save_time
+
+
+def bench_timer(workdir, timed):
+    """Seconds for 200k step moves, optionally with a run timed and the timer label text rebuilt every 8th move"""
+    core = make_core(workdir)
+    core.set_steps([f"Step {i}" for i in range(100000)])
+    timer = core.split_timer
+
+    def run():
+        core.current_step = 0
+        timer.reset()
+        if timed:
+            core.toggle_timer()
+        for i in range(200000):
+            if i % 4 == 3:
+                core.previous_step()
+            else:
+                core.next_step()
+            if timed and i % 8 == 0:
+                timer.text()
+        assert timed == (len(timer.times) > 1)
+    elapsed = best_of(run, repeats=3)
+    core.close()
+    return elapsed
+
+
+def bench_step_search(workdir, count):
+    """Seconds to index a `count`-step guide, and per find-next lookup once indexed"""
+    path = os.path.join(workdir, f'load_{count}.json')
+    if not os.path.exists(path):
+        write_template(path, count)
+    core = make_core(workdir)
+    core.open_template_file(path)
+
+    def build():
+        core.reset_step_index()
+        core.get_step_index().wait()
+    build_time = best_of(build, repeats=3)
+
+    queries = ['waypoint', 'loot the chest', f'waypoint {count // 2}', 'chest 123', 'missing']
+    lookups = 200
+
+    def find():
+        for i in range(lookups):
+            core.find_step(queries[i % len(queries)])
+    elapsed = best_of(find, repeats=5) / lookups
+    core.close()
+    return build_time, elapsed
+
+
+def bench_reload_append(workdir, count, appended=10):
+    """Seconds for the hot-reload diff after `appended` steps are added to a `count`-step guide"""
+    path = os.path.join(workdir, f'reload_{count}.json')
+    steps = [f"Step {i}: go to waypoint {i} and loot the chest" for i in range(count)]
+
+    def write_template_steps(extra):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"title": "reload", "steps": steps + extra}, f, indent=2)
+
+    best = float('inf')
+    for attempt in range(3):
+        write_template_steps([])
+        reloader = TemplateReloader(path)
+        reloader.prime()
+        write_template_steps([f"Appended step {attempt}-{i}" for i in range(appended)])
+        # Force a signature mismatch even on coarse mtime clocks
+        reloader.signature = (0, 0)
+        start = time.perf_counter()
+        diff = reloader.check()
+        best = min(best, time.perf_counter() - start)
+        assert diff is not None and len(diff.inserted) == appended
+        if diff.steps is not None:
+            diff.steps.close()
+    return best
+
+
+def make_library(workdir, count):
+    """Write `count` small guides into a library directory"""
+    library_dir = os.path.join(workdir, 'library')
+    if not os.path.isdir(library_dir):
+        os.makedirs(library_dir)
+        regions = ['Farbane Woods', 'Dunley Farmlands', 'Hallowed Mountains', 'Silverlight Hills', 'Cursed Forest']
+        for i in range(count):
+            with open(os.path.join(library_dir, f'guide_{i}.json'), 'w', encoding='utf-8') as f:
+                json.dump({"title": f"{regions[i % len(regions)]} route {i}",
+                           "steps": [f"Clear camp {j} near waypoint {i}-{j} and craft gear tier {j % 7}"
+                                     for j in range(40)]}, f)
+    return library_dir
+
+
+def bench_library(workdir, count):
+    """Seconds for an unchanged rescan and for a typical quick-switch search over `count` guides"""
+    core = make_core(workdir)
+    core.library.set_directories([make_library(workdir, count)])
+    core.refresh_library()
+    rescan = best_of(core.refresh_library, repeats=5)
+
+    queries = ['farbane', 'silv route 12', 'waypoint', 'tier 3', 'crsd', '']
+
+    def search():
+        for query in queries:
+            core.search_templates(query)
+    elapsed = best_of(search, repeats=10) / len(queries)
+    core.close()
+    return rescan, elapsed
+
+
+def bench_startup(workdir, interpreter):
+    """Seconds for a fresh interpreter to import the core and load a guide, beyond `interpreter` startup"""
+    write_template(os.path.join(workdir, 'guide.json'), 100)
+    code = ("import sys; sys.path.insert(0, %r); from vtask_core import TrackerCore; "
+            "c = TrackerCore(); c.start(); c.load_guide(); c.close()" % ROOT)
+
+    def run():
+        subprocess.run([sys.executable, '-c', code], cwd=workdir, check=True)
+    return max(best_of(run, repeats=5) - interpreter, 0.0)
+
+
+def suite_cases(workdir, quick, interpreter):
+    """List every case as (result names, callable returning one time per name)"""
+    cases = [
+        (('dispatch_200k_keys',), lambda: bench_dispatch(workdir)),
+        (('dispatch_200k_keys_1_panel',), lambda: bench_dispatch_panels(workdir, 1)),
+        (('dispatch_200k_keys_8_panels',), lambda: bench_dispatch_panels(workdir, 8)),
+        (('hook_200k_events',), lambda: bench_hook(workdir)),
+    ]
+    for count in (QUICK_LOAD_SIZES if quick else LOAD_SIZES):
+        cases.append(((f'load_{count}_cold',), lambda count=count: bench_load(workdir, count, cached=False)))
+        cases.append(((f'load_{count}_cached',), lambda count=count: bench_load(workdir, count, cached=True)))
+    cases += [
+        (('load_100000_binary',), lambda: bench_load_binary(workdir, 100000)),
+        (('playlist_switch_10000',), lambda: bench_playlist_switch(workdir, 10000, prefetched=False)),
+        (('playlist_switch_10000_prefetched',), lambda: bench_playlist_switch(workdir, 10000, prefetched=True)),
+        (('save_1000',), lambda: bench_save(workdir, 1000)),
+        (('save_100000',), lambda: bench_save(workdir, 100000)),
+        (('save_100000_queue',), lambda: bench_save_queue(workdir, 100000)),
+        (('save_keybinds',), lambda: bench_save_keybinds(workdir)),
+        (('search_100000_build', 'search_100000_find'), lambda: bench_step_search(workdir, 100000)),
+        (('sections_100000_navigate',), lambda: bench_sections(workdir, 100000, 1000)),
+        (('editor_100000_edit', 'editor_100000_save'), lambda: bench_editor(workdir, 100000)),
+        (('navigate_200k',), lambda: bench_timer(workdir, timed=False)),
+        (('navigate_200k_timed',), lambda: bench_timer(workdir, timed=True)),
+        (('reload_append_100000',), lambda: bench_reload_append(workdir, 100000)),
+        (('library_rescan_2000', 'library_search_2000'), lambda: bench_library(workdir, 2000)),
+        (('startup_core',), lambda: bench_startup(workdir, interpreter)),
+    ]
+    return cases
+
+
+def run_suite(cases, only=None):
+    """Run the cases, or those producing a name in `only`; returns {name: seconds}"""
+    results = {}
+    for names, func in cases:
+        if only is not None and not only.intersection(names):
+            continue
+        seconds = func()
+        if len(names) == 1:
+            seconds = (seconds,)
+        results.update(zip(names, seconds))
+    return results
+
+
+def find_regressions(results, units, baseline, tolerance):
+    """Names whose score exceeds the baseline by more than the tolerance and the absolute slack"""
+    regressions = []
+    for name, seconds in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        unit = units[name]
+        if seconds / unit > expected * (1 + tolerance) + MIN_SLACK_SECONDS / unit:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracker core benchmark suite")
+    parser.add_argument('--quick', action='store_true', help="skip the largest template sizes")
+    parser.add_argument('--tolerance', type=float, default=0.75,
+                        help="allowed slowdown against the baseline (0.75 = 75%%)")
+    parser.add_argument('--update-baseline', action='store_true', help="record these results as the baseline")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    unit = calibrate()
+    interpreter = calibrate_process()
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE) and not args.update_baseline:
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = suite_cases(workdir, args.quick, interpreter)
+        results = run_suite(cases)
+        units = {name: interpreter if name in PROCESS_CASES else unit for name in results}
+        # A one-off stall (GC, disk flush, a busy CI neighbour) should not fail the run: keep the best retry
+        for _ in range(RECHECK_RUNS):
+            regressions = find_regressions(results, units, baseline, args.tolerance)
+            if not regressions:
+                break
+            for name, seconds in run_suite(cases, set(regressions)).items():
+                results[name] = min(results[name], seconds)
+    scores = {name: seconds / units[name] for name, seconds in results.items()}
+    regressions = find_regressions(results, units, baseline, args.tolerance)
+
+    print(f"calibration unit: {unit * 1000:.2f} ms, interpreter startup: {interpreter * 1000:.2f} ms")
+    print(f"{'case':<24}{'time':>14}{'score':>12}{'baseline':>12}  status")
+    for name, seconds in results.items():
+        expected = baseline.get(name)
+        status = ''
+        if expected is not None:
+            status = 'REGRESSION' if name in regressions else 'ok'
+        if seconds < 1e-3:
+            time_text = f"{seconds * 1e6:.2f} us"
+        else:
+            time_text = f"{seconds * 1000:.2f} ms"
+        expected_text = f"{expected:.4f}" if expected is not None else '-'
+        print(f"{name:<24}{time_text:>14}{scores[name]:>12.4f}{expected_text:>12}  {status}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'unit': unit, 'interpreter': interpreter, 'seconds': results, 'scores': scores}, f, indent=2)
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({name: round(score, 6) for name, score in scores.items()}, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {BASELINE_FILE}")
+        return 0
+
+    if regressions:
+        print(f"FAIL: {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
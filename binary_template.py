@@ -0,0 +1,279 @@
+"""Compact binary template format (.vtg)
+
+Layout, all integers little-endian:
+
+    header   magic b'VTGB', version u32, step count u64, title length u64,
+             blob length u64
+    title    UTF-8, padded with zeros to a multiple of 8 bytes
+    offsets  (count + 1) u32 end offsets into the blob; step i is
+             blob[offsets[i]:offsets[i + 1]], so the blob is limited to 4 GiB
+    blob     every step's UTF-8 text, concatenated
+
+Files are memory-mapped and the offset table is used in place, so opening is
+O(1) and a step is decoded straight from the mapping when it is shown.
+
+Usage:
+    python binary_template.py guide.json guide.vtg
+    python binary_template.py guide.vtg guide.json
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections.abc import Sequence
+
+from sections import flatten_sections
+
+
+BINARY_EXTENSION = '.vtg'
+BINARY_MAGIC = b'VTGB'
+BINARY_VERSION = 1
+# magic, version, step count, title length, blob length
+BINARY_HEADER = struct.Struct('<4sIQQQ')
+
+# Offset table entries
+OFFSET_TYPE = 'I'
+OFFSET_SIZE = 4
+MAX_BLOB_SIZE = 2 ** 32 - 1
+
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+# Windows can't replace or truncate a file while a mapping of it is open, which would
+# block every save to the guide on screen, so files are read into memory there
+MAP_FILES = os.name != 'nt'
+
+
+def is_binary_template(path):
+    """Return True if path names a binary template"""
+    return path.lower().endswith(BINARY_EXTENSION)
+
+
+def map_file(f):
+    """Read-only view of an open file: a mapping, or its bytes where mappings lock the file"""
+    if MAP_FILES:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    f.seek(0)
+    return f.read()
+
+
+def release_view(data):
+    """Close a view returned by map_file"""
+    if isinstance(data, mmap.mmap):
+        try:
+            data.close()
+        except (BufferError, ValueError):
+            pass
+
+
+def _padded(length):
+    return (length + 7) & ~7
+
+
+class BinaryStepStore(Sequence):
+    """Read-only step sequence backed by a mapped .vtg file"""
+
+    def __init__(self, path, data, title, offsets, blob_start):
+        self.path = path
+        self.title = title
+        self._data = data
+        self._view = memoryview(data) if data is not None else None
+        self._offsets = offsets
+        self._blob_start = blob_start
+        self._count = max(len(offsets) - 1, 0)
+        self._refs = 1
+        self._refs_lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("step index out of range")
+        base = self._blob_start
+        return str(self._view[base + self._offsets[i]:base + self._offsets[i + 1]], 'utf-8')
+
+    def retain(self):
+        """Take another reference for a reader on another thread; returns self"""
+        with self._refs_lock:
+            self._refs += 1
+        return self
+
+    def close(self):
+        """Drop a reference, releasing the mapping once every holder has closed it"""
+        with self._refs_lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+        offsets, self._offsets = self._offsets, array(OFFSET_TYPE)
+        self._count = 0
+        if isinstance(offsets, memoryview):
+            offsets.release()
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        release_view(self._data)
+        self._data = None
+
+
+def open_binary_template(path):
+    """Map a .vtg file as a BinaryStepStore"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < BINARY_HEADER.size:
+            raise ValueError(f"{os.path.basename(path)} is not a binary template (too short)")
+        data = map_file(f)
+    offsets = None
+    try:
+        magic, version, count, title_length, blob_length = BINARY_HEADER.unpack_from(data, 0)
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"{os.path.basename(path)} is not a binary template")
+        if version != BINARY_VERSION:
+            raise ValueError(f"Unsupported binary template version {version}")
+        offsets_start = BINARY_HEADER.size + _padded(title_length)
+        blob_start = offsets_start + (count + 1) * OFFSET_SIZE
+        if blob_start + blob_length != size:
+            raise ValueError(f"{os.path.basename(path)} is truncated or corrupt")
+        title = data[BINARY_HEADER.size:BINARY_HEADER.size + title_length].decode('utf-8') or None
+        if _NATIVE_LITTLE_ENDIAN:
+            offsets = memoryview(data)[offsets_start:blob_start].cast(OFFSET_TYPE)
+        else:
+            offsets = array(OFFSET_TYPE, data[offsets_start:blob_start])
+            offsets.byteswap()
+        if offsets[-1] != blob_length:
+            raise ValueError(f"{os.path.basename(path)} has a bad offset table")
+    except Exception:
+        if isinstance(offsets, memoryview):
+            offsets.release()
+        release_view(data)
+        raise
+    return BinaryStepStore(path, data, title, offsets, blob_start)
+
+
+def encode_binary_template(title, steps):
+    """Return the .vtg bytes for a template"""
+    title_bytes = (title or '').encode('utf-8')
+    offsets = array(OFFSET_TYPE, [0])
+    chunks = []
+    end = 0
+    for step in steps:
+        if not isinstance(step, str):
+            raise ValueError(f"Steps must be strings, got {type(step).__name__}")
+        encoded = step.encode('utf-8')
+        chunks.append(encoded)
+        end += len(encoded)
+        if end > MAX_BLOB_SIZE:
+            raise ValueError("Template is too large for the binary format (4 GiB of step text)")
+        offsets.append(end)
+    if not _NATIVE_LITTLE_ENDIAN:
+        offsets.byteswap()
+    header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(chunks), len(title_bytes), end)
+    padding = bytes(_padded(len(title_bytes)) - len(title_bytes))
+    return b''.join([header, title_bytes, padding, offsets.tobytes()] + chunks)
+
+
+def write_binary_template(path, title, steps):
+    """Write steps to a .vtg file atomically"""
+    data = encode_binary_template(title, steps)
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_json_template(path, flatten=False):
+    """Return (title, steps) from a JSON template
+
+    The binary format only holds a title and flat steps. Sections, or any
+    other key, raise ValueError unless flatten is set, in which case sections
+    are flattened and other keys are dropped.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not flatten:
+        if 'sections' in data:
+            raise ValueError(f"{path} has sections, which the binary format can't keep (use --flatten)")
+        extra = sorted(set(data) - {'title', 'steps'})
+        if extra:
+            raise ValueError(f"{path} has keys the binary format can't keep: {', '.join(extra)} (use --flatten)")
+    steps, _ = flatten_sections(data)
+    return data.get('title'), steps
+
+
+def write_json_template(path, title, steps):
+    """Write a JSON template in the format the overlay saves"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"title": title, "steps": steps}, f, indent=2)
+
+
+def read_template_any(path, flatten=False):
+    """Return (title, steps as a list) from either format (see read_json_template for flatten)"""
+    if is_binary_template(path):
+        store = open_binary_template(path)
+        try:
+            return store.title, list(store)
+        finally:
+            store.close()
+    return read_json_template(path, flatten)
+
+
+def convert(source, target, verify=True, flatten=False):
+    """Convert between JSON and binary templates by extension; returns the step count
+
+    A JSON guide with sections or keys other than "title" and "steps" is
+    refused, unless flatten is set, because the binary format can't hold
+    them. With verify, the written file is read back and must give the same
+    title and steps. Without flatten, a conversion therefore either
+    round-trips exactly or fails. With flatten, only the title and the
+    flattened steps are compared.
+    """
+    title, steps = read_template_any(source, flatten)
+    if is_binary_template(target):
+        write_binary_template(target, title, steps)
+    else:
+        write_json_template(target, title, steps)
+    if verify:
+        check_title, check_steps = read_template_any(target)
+        if (check_title or None) != (title or None) or check_steps != steps:
+            raise ValueError(f"Round trip of {source} through {target} changed the template")
+    return len(steps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert templates between JSON and the binary .vtg format")
+    parser.add_argument('source', help="template to read (.json or .vtg)")
+    parser.add_argument('target', help="file to write; the format follows the extension")
+    parser.add_argument('--no-verify', action='store_true', help="skip reading the result back")
+    parser.add_argument('--flatten', action='store_true',
+                        help="convert a guide with sections or extra keys, keeping only its title and flattened steps")
+    args = parser.parse_args()
+
+    if is_binary_template(args.source) == is_binary_template(args.target):
+        parser.error("source and target must be different formats")
+    try:
+        count = convert(args.source, args.target, verify=not args.no_verify, flatten=args.flatten)
+    except Exception as e:
+        print(f"Error converting template: {e}")
+        return 1
+    source_size = os.path.getsize(args.source)
+    target_size = os.path.getsize(args.target)
+    print(f"Converted {count} steps: {source_size} -> {target_size} bytes ({target_size / max(source_size, 1):.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
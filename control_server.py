@@ -0,0 +1,428 @@
+"""Local control server for driving the overlay from scripts
+
+Line protocol (UTF-8, one command per line, replies in command order):
+
+    next [n]          move forward n steps          -> ok <step>
+    prev [n]          move back n steps             -> ok <step>
+    jump <n>          go to 1-based step n          -> ok <step>
+    undo              undo the last move            -> ok <step>
+    redo              redo an undone move           -> ok <step>
+    mark <name>       bookmark the current step     -> ok <step>
+    goto <name>       go to a bookmarked step       -> ok <step>
+    minimize          toggle the overlay            -> ok
+    load <path>       open a template file          -> ok <step>
+    state             current state                 -> ok {"template": ..., "step": ..., ...}
+    subscribe         send state changes            -> ok, then "event {...}" lines
+    unsubscribe       stop sending them             -> ok
+    ping              transport round trip          -> pong
+
+Failures reply "error <message>". Steps are 1-based. Clients may pipeline:
+every complete line already received is parsed at once and the commands
+that touch the guide go to the UI thread as a single batch.
+"""
+import asyncio
+import json
+import os
+import stat
+import sys
+import threading
+
+
+# Longest command line accepted, in bytes
+MAX_LINE = 64 * 1024
+
+# Replies a connection may have outstanding before reading pauses
+MAX_PENDING = 4096
+
+READ_SIZE = 64 * 1024
+
+# State events are skipped for a subscriber with more than this many bytes still unsent
+MAX_SUBSCRIBER_BUFFER = 256 * 1024
+
+# Commands answered by the server thread itself
+LOCAL_COMMANDS = {'ping', 'subscribe', 'unsubscribe'}
+
+
+class ControlError(Exception):
+    """A command that cannot be carried out; the message is sent to the client"""
+
+
+def core_handlers(core, on_change=None):
+    """Command handlers for a TrackerCore; on_change() runs after anything that moved
+
+    Each handler takes the rest of the command line and returns the reply
+    text. They must run on the thread that owns the core (the Tk thread in
+    the overlay).
+    """
+    def changed(moved):
+        if moved and on_change is not None:
+            on_change()
+        return f"ok {core.current_step + 1}"
+
+    def count(arg):
+        if not arg:
+            return 1
+        try:
+            value = int(arg)
+        except ValueError:
+            raise ControlError(f"not a number: {arg}")
+        if value < 1:
+            raise ControlError("count must be at least 1")
+        return value
+
+    def jump(arg):
+        if not arg:
+            raise ControlError("jump needs a step number")
+        return changed(core.jump_to_step(count(arg)))
+
+    def load(arg):
+        if not arg:
+            raise ControlError("load needs a template path")
+        if not os.path.exists(arg):
+            raise ControlError(f"template not found: {arg}")
+        try:
+            core.open_template_file(arg)
+        except Exception as e:
+            raise ControlError(f"failed to load template: {e}")
+        return changed(True)
+
+    def mark(arg):
+        if not arg:
+            raise ControlError("mark needs a bookmark name")
+        if not core.set_bookmark(arg):
+            raise ControlError("no steps loaded")
+        return changed(False)
+
+    def goto(arg):
+        if not arg:
+            raise ControlError("goto needs a bookmark name")
+        moved = core.goto_bookmark(arg)
+        if not moved and core.bookmarks.get(core.current_template, arg) is None:
+            raise ControlError(f"no bookmark named {arg}")
+        return changed(moved)
+
+    def profile(arg):
+        if arg and not core.switch_keybind_profile(arg):
+            raise ControlError(f"no usable keybind profile named {arg}")
+        return "ok " + core.keybind_profiles.active
+
+    def state(arg):
+        return "ok " + json.dumps(core_state(core))
+
+    return {
+        'next': lambda arg: changed(core.next_step(count(arg))),
+        'prev': lambda arg: changed(core.previous_step(count(arg))),
+        'jump': jump,
+        'load': load,
+        'undo': lambda arg: changed(core.undo_step()),
+        'redo': lambda arg: changed(core.redo_step()),
+        'mark': mark,
+        'goto': goto,
+        'profile': profile,
+        'state': state,
+    }
+
+
+def core_state(core):
+    """State sent for "state" and to subscribers"""
+    return {
+        "template": core.current_template,
+        "step": core.current_step + 1 if core.steps else 0,
+        "steps": len(core.steps),
+    }
+
+
+class _Connection:
+    """One client: its reply queue and whether it wants state events"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.task = asyncio.current_task()
+        self.replies = asyncio.Queue(MAX_PENDING)
+        # Task writing the replies; once it ends nothing drains the queue any more
+        self.sender = None
+        self.subscribed = False
+
+
+class ControlServer:
+    """asyncio control server on a Unix socket and/or loopback TCP, in its own thread
+
+    handlers maps command names to handler(arg) -> reply text (see
+    core_handlers). submit(callback) must arrange for callback() to run on
+    the UI thread and return False if it can't; the overlay posts it to the
+    event bus. Without submit, handlers run on the server thread, which is
+    only safe when nothing else touches the core.
+    """
+
+    def __init__(self, handlers, submit=None, unix_path=None, tcp_port=None, host='127.0.0.1'):
+        self.handlers = handlers
+        self.submit = submit
+        self.unix_path = unix_path
+        self.tcp_port = tcp_port
+        self.host = host
+        self.address = None
+        self.commands = 0
+        self.batches = 0
+        # State events skipped because a subscriber wasn't reading them
+        self.events_dropped = 0
+        # Written only by the server thread; read from the UI thread to skip publishing
+        self.subscribers = 0
+        self._connections = set()
+        self._loop = None
+        self._stopping = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+        self._last_event = None
+
+    # Lifecycle (any thread)
+
+    def start(self, timeout=5):
+        """Start serving; raises if no listener could be opened"""
+        if self.unix_path and not hasattr(asyncio, 'start_unix_server'):
+            print(f"Error starting control socket {self.unix_path}: Unix sockets are not supported on {sys.platform}")
+            self.unix_path = None
+        if not self.unix_path and self.tcp_port is None:
+            raise ValueError("control server needs a Unix socket path or a TCP port")
+        self._thread = threading.Thread(target=self._run, name="ControlServer", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def stop(self, timeout=5):
+        """Close every connection and stop the server thread"""
+        loop, self._loop = self._loop, None
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._stopping.set)
+            except RuntimeError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def publish(self, state):
+        """Send a state dict to subscribers (any thread); repeats of the last state are dropped"""
+        if state == self._last_event:
+            return
+        self._last_event = state
+        loop = self._loop
+        if loop is not None:
+            line = ("event " + json.dumps(state) + "\n").encode('utf-8')
+            try:
+                loop.call_soon_threadsafe(self._broadcast, line)
+            except RuntimeError:
+                pass
+
+    # Server thread
+
+    def _run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self._stopping = asyncio.Event()
+        servers = []
+        try:
+            if self.unix_path:
+                if os.path.exists(self.unix_path):
+                    if not stat.S_ISSOCK(os.stat(self.unix_path).st_mode):
+                        raise ValueError(f"{self.unix_path} exists and is not a socket")
+                    # Left behind by an overlay that didn't shut down cleanly
+                    os.remove(self.unix_path)
+                servers.append(await asyncio.start_unix_server(self._handle, path=self.unix_path))
+                os.chmod(self.unix_path, 0o600)
+                self.address = self.unix_path
+            if self.tcp_port is not None:
+                server = await asyncio.start_server(self._handle, self.host, self.tcp_port)
+                servers.append(server)
+                if not self.unix_path:
+                    self.address = server.sockets[0].getsockname()[:2]
+            self._loop = asyncio.get_running_loop()
+        except Exception as e:
+            self._error = e
+            for server in servers:
+                server.close()
+            return
+        finally:
+            self._ready.set()
+        try:
+            await self._stopping.wait()
+        finally:
+            for server in servers:
+                server.close()
+            connections = list(self._connections)
+            for connection in connections:
+                connection.writer.close()
+                # A sender may be waiting on a reply the stopped UI thread will never give
+                if connection.sender is not None:
+                    connection.sender.cancel()
+            # Closed transports end each handler's read loop; let them finish before the loop goes
+            await asyncio.gather(*(connection.task for connection in connections), return_exceptions=True)
+            for server in servers:
+                await server.wait_closed()
+            if self.unix_path:
+                try:
+                    os.remove(self.unix_path)
+                except OSError:
+                    pass
+
+    async def _handle(self, reader, writer):
+        connection = _Connection(writer)
+        self._connections.add(connection)
+        sender = connection.sender = asyncio.ensure_future(self._send_replies(connection))
+        buffer = b''
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                buffer += data
+                *lines, buffer = buffer.split(b'\n')
+                if len(buffer) > MAX_LINE:
+                    await self._queue_reply(connection, "error line too long")
+                    break
+                if lines:
+                    await self._dispatch(connection, lines)
+        except ConnectionError:
+            pass
+        finally:
+            try:
+                # Replies already queued are still sent after the client stops writing
+                await self._queue_reply(connection, None)
+            except ConnectionError:
+                pass
+            try:
+                await sender
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+            self._connections.discard(connection)
+            if connection.subscribed:
+                self.subscribers -= 1
+            writer.close()
+
+    async def _dispatch(self, connection, lines):
+        """Queue a reply slot per line and hand the guide commands to the UI thread in one batch
+
+        A read holding more lines than the reply queue takes is sent in
+        several batches: the commands so far are submitted before waiting for
+        room, or the sender would wait on replies that never get computed.
+        """
+        loop = asyncio.get_running_loop()
+        batch = []
+        for raw in lines:
+            line = raw.decode('utf-8', 'replace').strip()
+            if not line:
+                continue
+            name, _, arg = line.partition(' ')
+            name = name.lower()
+            arg = arg.strip()
+            if name in LOCAL_COMMANDS:
+                reply = self._local(connection, name)
+            elif name in self.handlers:
+                reply = loop.create_future()
+                batch.append((name, arg, reply))
+            else:
+                reply = f"error unknown command: {name}"
+            if connection.replies.full() and batch:
+                self._submit(loop, batch)
+                batch = []
+            await self._queue_reply(connection, reply)
+        self._submit(loop, batch)
+
+    @staticmethod
+    async def _queue_reply(connection, reply):
+        """Wait for room in the reply queue; raises ConnectionError if the sender has stopped
+
+        The sender ends when the client goes away, and a plain put() on a full
+        queue would then wait forever.
+        """
+        queue = connection.replies
+        sender = connection.sender
+        if sender.done():
+            raise ConnectionResetError("client stopped reading replies")
+        if not queue.full():
+            queue.put_nowait(reply)
+            return
+        put = asyncio.ensure_future(queue.put(reply))
+        await asyncio.wait([put, sender], return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            raise ConnectionResetError("client stopped reading replies")
+
+    def _submit(self, loop, batch):
+        """Send a batch of (name, arg, reply future) to the UI thread"""
+        self.commands += len(batch)
+        if not batch:
+            return
+        self.batches += 1
+        if self.submit is None:
+            self._execute(loop, batch)
+        elif not self.submit(lambda: self._execute(loop, batch)):
+            for _, _, reply in batch:
+                reply.set_result("error busy")
+
+    def _local(self, connection, name):
+        if name == 'ping':
+            return "pong"
+        subscribed = name == 'subscribe'
+        if subscribed != connection.subscribed:
+            connection.subscribed = subscribed
+            self.subscribers += 1 if subscribed else -1
+        return "ok"
+
+    def _execute(self, loop, batch):
+        """Run a batch of commands (on the UI thread) and pass the replies back to the server loop"""
+        results = []
+        for name, arg, _ in batch:
+            try:
+                results.append(self.handlers[name](arg))
+            except ControlError as e:
+                results.append(f"error {e}")
+            except Exception as e:
+                print(f"Error running control command {name}: {e}")
+                results.append(f"error {e}")
+        futures = [reply for _, _, reply in batch]
+        try:
+            loop.call_soon_threadsafe(_resolve, futures, results)
+        except RuntimeError:
+            # The server stopped while the batch was queued
+            pass
+
+    async def _send_replies(self, connection):
+        """Write replies in command order, flushing whenever the queue runs dry"""
+        writer = connection.writer
+        queue = connection.replies
+        out = []
+        while True:
+            reply = await queue.get()
+            if reply is None:
+                break
+            if not isinstance(reply, str):
+                reply = await reply
+            out.append(reply)
+            if queue.empty():
+                writer.write(("\n".join(out) + "\n").encode('utf-8'))
+                out.clear()
+                await writer.drain()
+        if out:
+            writer.write(("\n".join(out) + "\n").encode('utf-8'))
+            await writer.drain()
+
+    def _broadcast(self, line):
+        for connection in self._connections:
+            writer = connection.writer
+            if connection.subscribed and not writer.is_closing():
+                # A subscriber that stops reading would otherwise buffer events without limit
+                if writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                    self.events_dropped += 1
+                    continue
+                writer.write(line)
+
+
+def _resolve(futures, results):
+    for future, result in zip(futures, results):
+        if not future.done():
+            future.set_result(result)
+
@@ -0,0 +1,223 @@
+import collections
+import threading
+import time
+
+
+# Actions where a burst of identical events can be folded into a single call
+COALESCABLE_ACTIONS = {'next_step', 'previous_step', 'next_section', 'previous_section'}
+
+
+class EventBus:
+    """Channel carrying events from other threads to the Tk thread
+
+    Hook input goes through post() into a bounded queue that drops on
+    overflow, so a key flood cannot grow without limit. Results of background
+    work (saves, reloads, control commands) go through post_internal() into a
+    separate queue that never drops, since losing one would leave the UI stale.
+    """
+
+    def __init__(self, root, handler, instrumentation, maxsize=256, poll_interval_ms=8, idle_poll_interval_ms=100):
+        self.root = root
+        self.handler = handler
+        self.instrumentation = instrumentation
+        self.maxsize = maxsize
+        self.poll_interval_ms = poll_interval_ms
+        # Used while the overlay is idle: fewer wakeups, at the cost of latency on the first event
+        self.idle_poll_interval_ms = idle_poll_interval_ms
+        self.idle = False
+
+        # Several threads post (key hook, file writer, watchers, control server), so
+        # producers take _post_lock for the capacity check and the counters. The Tk
+        # thread pops without it: deque.popleft is atomic and only makes room.
+        self._queue = collections.deque()
+        self._post_lock = threading.Lock()
+        # Unbounded, and append is atomic on its own
+        self._internal = collections.deque()
+        self._after_id = None
+        self._running = False
+
+        # Statistics
+        self.max_depth = 0
+        self.dropped = 0
+        self.events_posted = 0
+        self.events_dispatched = 0
+        self.batches = 0
+        self.renders_saved = 0
+        self.polls = 0
+
+    def start(self):
+        """Start draining the queue on the Tk main loop"""
+        if not self._running:
+            self._running = True
+            self._after_id = self.root.after(self.poll_interval_ms, self._poll)
+
+    def stop(self):
+        """Stop draining the queue"""
+        self._running = False
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def post(self, action, arg=None, timestamp=None, count=1, panel=0):
+        """Queue an action from any thread (never touches Tk)
+
+        timestamp is the perf_counter value of the originating hook callback;
+        count is how many times the action fires (auto-repeat can batch steps);
+        panel is the guide panel the action applies to.
+        """
+        event = (action, arg, timestamp if timestamp is not None else time.perf_counter(), count, panel)
+        with self._post_lock:
+            depth = len(self._queue)
+            if depth >= self.maxsize:
+                self.dropped += 1
+                return False
+            self._queue.append(event)
+            self.events_posted += 1
+            if depth + 1 > self.max_depth:
+                self.max_depth = depth + 1
+        return True
+
+    def post_internal(self, action, arg=None, panel=0):
+        """Queue an action produced by background work; never dropped"""
+        self._internal.append((action, arg, panel))
+
+    def take_internal(self):
+        """Remove and return the queued background events as (action, arg, panel), e.g. to release them at exit"""
+        events = []
+        while self._internal:
+            try:
+                events.append(self._internal.popleft())
+            except IndexError:
+                break
+        return events
+
+    def set_idle(self, idle):
+        """Switch between the normal and the idle poll interval (from the next poll on)"""
+        self.idle = idle
+
+    def depth(self):
+        """Return the number of input events waiting to be dispatched"""
+        return len(self._queue)
+
+    def _poll(self):
+        """Drain pending events, then reschedule"""
+        self._after_id = None
+        if not self._running:
+            return
+        self.polls += 1
+        try:
+            if self._internal:
+                self.drain_internal()
+            if self._queue:
+                self.drain()
+        finally:
+            # Read after draining: a handler may have woken the overlay
+            interval = self.idle_poll_interval_ms if self.idle else self.poll_interval_ms
+            self._after_id = self.root.after(interval, self._poll)
+
+    def drain_internal(self):
+        """Dispatch every queued background event, in order"""
+        internal = self._internal
+        self.handler.begin_batch()
+        try:
+            while internal:
+                try:
+                    action, arg, panel = internal.popleft()
+                except IndexError:
+                    break
+                try:
+                    self.handler.dispatch_action(action, arg, 1, panel)
+                except Exception as e:
+                    print(f"Error handling {action}: {e}")
+        finally:
+            self.handler.end_batch()
+
+    def drain(self):
+        """Dispatch every queued input event, folding bursts into single handler calls"""
+        batch = []
+        queue = self._queue
+        while queue:
+            try:
+                batch.append(queue.popleft())
+            except IndexError:
+                break
+        if not batch:
+            return
+
+        # Collapse runs of the same coalescable action into (action, arg, count, panel)
+        runs = []
+        for action, arg, _, count, panel in batch:
+            if (runs and action in COALESCABLE_ACTIONS and runs[-1][0] == action and runs[-1][1] == arg
+                    and runs[-1][3] == panel):
+                runs[-1][2] += count
+            else:
+                runs.append([action, arg, count, panel])
+
+        oldest = batch[0][2]
+        self.batches += 1
+        self.events_dispatched += len(batch)
+        self.renders_saved += len(batch) - 1
+
+        # Sampled once: a handler in this batch may toggle instrumentation
+        instrumentation = self.instrumentation
+        timed = instrumentation.enabled
+        if timed:
+            dispatch_start = time.perf_counter()
+            instrumentation.record('queue', dispatch_start - oldest)
+
+        self.handler.begin_batch()
+        try:
+            for action, arg, count, panel in runs:
+                # One failing handler must not lose the rest of the batch
+                try:
+                    self.handler.dispatch_action(action, arg, count, panel)
+                except Exception as e:
+                    print(f"Error handling {action}: {e}")
+        finally:
+            self.handler.end_batch()
+
+        if timed:
+            actions_done = time.perf_counter()
+            instrumentation.record('action', actions_done - dispatch_start)
+            # Idle callbacks run after the redraw queued by the label configure calls,
+            # so this measures keypress-to-pixel rather than keypress-to-configure
+            try:
+                self.root.after_idle(self._record_render, oldest, actions_done)
+            except Exception:
+                pass
+
+    def _record_render(self, posted_at, actions_done):
+        """Record render and hook-to-render latency for a batch"""
+        now = time.perf_counter()
+        self.instrumentation.record('render', now - actions_done)
+        self.instrumentation.record('total', now - posted_at)
+
+    def stats(self):
+        """Return a snapshot of queue and latency statistics"""
+        total = self.instrumentation.histograms['total']
+        p50 = total.percentile(0.5)
+        p99 = total.percentile(0.99)
+        worst = total.max
+        return {
+            'depth': len(self._queue),
+            'max_depth': self.max_depth,
+            'dropped': self.dropped,
+            'posted': self.events_posted,
+            'dispatched': self.events_dispatched,
+            'batches': self.batches,
+            'renders_saved': self.renders_saved,
+            'latency_p50_ms': p50 * 1000,
+            'latency_p99_ms': p99 * 1000,
+            'latency_max_ms': worst * 1000,
+        }
+
+    def format_stats(self):
+        """Format statistics as a single line"""
+        s = self.stats()
+        return (f"queue {s['depth']}/{self.maxsize} (max {s['max_depth']}, dropped {s['dropped']}) | "
+                f"events {s['dispatched']} in {s['batches']} batches | "
+                f"latency p50 {s['latency_p50_ms']:.1f}ms p99 {s['latency_p99_ms']:.1f}ms "
+                f"max {s['latency_max_ms']:.1f}ms")
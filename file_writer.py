@@ -0,0 +1,168 @@
+import os
+import queue
+import threading
+
+
+class ChunkFeed:
+    """Iterable of chunks handed over from another thread
+
+    The producer put()s chunks as it has them and close()s the feed at the
+    end, or abort()s it; the writer thread iterates it as a streamed payload,
+    blocking until the next chunk arrives. An aborted feed raises in the
+    consumer, so the write fails and the target file is left untouched.
+    """
+
+    _END = object()
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self.error = None
+
+    def put(self, chunk):
+        """Add a chunk"""
+        self._queue.put(chunk)
+
+    def close(self):
+        """Mark the end of the feed"""
+        self._queue.put(self._END)
+
+    def abort(self, error):
+        """End the feed with an error"""
+        self.error = error
+        self._queue.put(self._END)
+
+    def __iter__(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is self._END:
+                if self.error is not None:
+                    raise self.error
+                return
+            yield chunk
+
+
+class FileWriter:
+    """Background thread that performs every file save
+
+    write(path, payload) returns immediately. The payload is bytes, str, an
+    iterable of bytes/str chunks (written as they are produced, so a huge
+    template never has to exist as one string), or a zero-argument callable
+    returning any of those, which is called on the writer thread so
+    serializing a large guide doesn't block the UI. Each file is
+    written to a temp file next to it, fsynced and renamed over the target,
+    so a crash leaves either the old or the new contents. A path written
+    again before its previous write started is only written once, with the
+    latest payload.
+
+    on_done(error) callbacks (error is None on success) are handed to
+    `dispatch`, which runs them on the writer thread unless the UI replaces it
+    with something that marshals them onto its own thread.
+    """
+
+    def __init__(self, fsync=True):
+        self.fsync = fsync
+        self.dispatch = lambda callback: callback()
+        self.last_error = None
+        self.writes = 0
+        self.coalesced = 0
+        self._pending = {}
+        self._order = []
+        self._busy = False
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        """Start the writer thread (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="FileWriter", daemon=True)
+                self._thread.start()
+        return self
+
+    def write(self, path, payload, on_done=None):
+        """Queue an atomic write of payload to path"""
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            entry = self._pending.get(path)
+            if entry is None:
+                self._pending[path] = [payload, [on_done] if on_done else []]
+                self._order.append(path)
+            else:
+                entry[0] = payload
+                if on_done:
+                    entry[1].append(on_done)
+                self.coalesced += 1
+            self._changed.notify_all()
+
+    def pending(self):
+        """Return the number of writes not yet finished"""
+        with self._lock:
+            return len(self._pending) + (1 if self._busy else 0)
+
+    def flush(self, timeout=None):
+        """Wait until every queued write has finished; returns False on timeout"""
+        with self._lock:
+            return self._changed.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self, timeout=None):
+        """Flush outstanding writes and stop the thread"""
+        flushed = self.flush(timeout)
+        with self._lock:
+            self._stopping = True
+            self._changed.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return flushed
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._changed.wait_for(lambda: self._order or self._stopping)
+                if not self._order:
+                    return
+                path = self._order.pop(0)
+                payload, callbacks = self._pending.pop(path)
+                self._busy = True
+            error = None
+            try:
+                self._write(path, payload)
+                self.writes += 1
+            except Exception as e:
+                error = e
+                self.last_error = e
+                print(f"Error writing {path}: {e}")
+            with self._lock:
+                self._busy = False
+                self._changed.notify_all()
+            for callback in callbacks:
+                try:
+                    self.dispatch(lambda callback=callback: callback(error))
+                except Exception as e:
+                    print(f"Error delivering save result for {path}: {e}")
+
+    def _write(self, path, payload):
+        """Write payload to path through a temp file and an atomic rename"""
+        if callable(payload):
+            payload = payload()
+        if isinstance(payload, (bytes, bytearray, memoryview, str)):
+            payload = (payload,)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in payload:
+                    f.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
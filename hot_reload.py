@@ -0,0 +1,498 @@
+import os
+import select
+import struct
+import sys
+import threading
+from array import array
+
+from binary_template import is_binary_template, map_file, open_binary_template, release_view
+from sections import SectionOutline
+from startup_snapshot import file_signature
+from step_store import (MMAP_THRESHOLD, INDEX_SUFFIX, MmapStepStore, close_steps, decode_string, scan_step_range,
+                        scan_template, write_index)
+
+
+# Bytes per fingerprint block when locating the changed byte range
+FINGERPRINT_BLOCK = 16 * 1024
+# Changed regions up to this many steps are matched step by step to map the position
+MAX_REGION_DIFF = 5000
+
+
+def block_hashes(content, from_end=False):
+    """Hash content in FINGERPRINT_BLOCK slices aligned to its start, or to its end
+
+    hash() is salted per process, which is fine: fingerprints are only ever
+    compared within one run.
+    """
+    size = len(content)
+    if from_end:
+        return array('q', [hash(content[max(end - FINGERPRINT_BLOCK, 0):end])
+                           for end in range(size, 0, -FINGERPRINT_BLOCK)])
+    return array('q', [hash(content[start:start + FINGERPRINT_BLOCK]) for start in range(0, size, FINGERPRINT_BLOCK)])
+
+
+def shared_blocks(old, new):
+    """Number of leading entries two block hash arrays have in common"""
+    count = 0
+    for a, b in zip(old, new):
+        if a != b:
+            break
+        count += 1
+    return count
+
+
+def step_keys(content, offsets):
+    """Hash each raw step literal, so unchanged steps can be recognized without the old bytes"""
+    return array('q', [hash(content[offsets[k]:offsets[k + 1]]) for k in range(0, len(offsets), 2)])
+
+
+class TemplateDiff:
+    """Change to the active template: steps[start:start + removed] became `inserted`
+
+    `steps` is set when the step container itself is replaced (a large guide
+    gets a new mapped store); otherwise the change is spliced into the loaded
+    list in place. `old_keys` and `new_keys` hold step_keys of the replaced
+    and inserted steps when the region is small enough to match for position
+    mapping. `outline` is the new SectionOutline of a sectioned guide, None
+    for a flat one.
+    """
+
+    __slots__ = ('path', 'title', 'old_count', 'start', 'removed', 'inserted', 'old_keys', 'new_keys', 'steps',
+                 'outline')
+
+    def __init__(self, path, title, old_count, start, removed, inserted, old_keys=None, new_keys=None, steps=None,
+                 outline=None):
+        self.path = path
+        self.title = title
+        self.old_count = old_count
+        self.start = start
+        self.removed = removed
+        self.inserted = inserted
+        self.old_keys = old_keys
+        self.new_keys = new_keys
+        self.steps = steps
+        self.outline = outline
+
+    @property
+    def new_count(self):
+        return self.old_count - self.removed + len(self.inserted)
+
+    def discard(self):
+        """Release the step store of a diff that will not be applied"""
+        close_steps(self.steps)
+        self.steps = None
+
+    def map_position(self, position):
+        """Map a step number in the old guide to the same step in the new one"""
+        end = self.start + self.removed
+        if position < self.start:
+            mapped = position
+        elif position >= end:
+            mapped = position - self.removed + len(self.inserted)
+        else:
+            offset = position - self.start
+            if self.old_keys is not None:
+                mapped = self.start + self._map_in_region(offset)
+            else:
+                mapped = self.start + min(offset, max(len(self.inserted) - 1, 0))
+        return max(0, min(mapped, self.new_count - 1))
+
+    def _map_in_region(self, offset):
+        """Map a step inside the replaced region by step text (compared by hash), in linear time
+
+        The n-th copy of a text in the old region maps to the n-th copy in the
+        new one. A step whose text is gone is placed as far past the nearest
+        matched step before it as it was, but no further than the next matched
+        step after it: an edited step stays put, a deleted one lands on what
+        follows.
+        """
+        old, new = self.old_keys, self.new_keys
+        positions = {}
+        for i, key in enumerate(new):
+            positions.setdefault(key, []).append(i)
+        seen = {}
+        matched = []
+        for key in old:
+            rank = seen.get(key, 0)
+            seen[key] = rank + 1
+            candidates = positions.get(key)
+            matched.append(candidates[rank] if candidates is not None and rank < len(candidates) else None)
+        if matched[offset] is not None:
+            return matched[offset]
+        before, anchor = -1, -1
+        for k in range(offset - 1, -1, -1):
+            if matched[k] is not None:
+                before, anchor = k, matched[k]
+                break
+        after = len(new)
+        for k in range(offset + 1, len(old)):
+            if matched[k] is not None and matched[k] > anchor:
+                after = matched[k]
+                break
+        return min(anchor + offset - before, after)
+
+
+class TemplateReloader:
+    """Fingerprints the last-seen JSON template and turns edits into TemplateDiffs
+
+    No copy or mapping of the old file is kept: a large guide would cost its
+    size again in memory, an editor that rewrites the file in place would
+    change (or, by shrinking it, fault) a mapping under us, and on Windows
+    an open mapping stops the file being replaced at all. Instead the
+    reloader keeps hashes of FINGERPRINT_BLOCK-sized slices aligned to the
+    start and to the end of the file, the bytes before the steps array and
+    a hash of every step literal.
+
+    A reload hashes the new file the same way. The leading and trailing
+    blocks that still match bound the changed byte range to within a block,
+    only the step literals inside it are scanned, and the step hashes trim
+    the unchanged steps at its edges. Steps before and after keep their
+    offsets (the tail shifted by the size change), so appending to a long
+    guide costs O(appended steps) beyond hashing the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+        self.size = 0
+        self.head_blocks = array('q')
+        self.tail_blocks = array('q')
+        # Bytes before the first step of a flat guide, to anchor edits near the start
+        self.header = b''
+        self.keys = array('q')
+        self.offsets = None
+        self.title_span = (0, 0)
+        self.count = 0
+        # Sectioned guides are always rescanned whole so the outline is rebuilt
+        self.sectioned = False
+
+    def _read(self):
+        """Return (content, stat): bytes for a small file, a map_file view for a large one"""
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size >= MMAP_THRESHOLD:
+                return map_file(f), stat
+            return f.read(), stat
+
+    def _remember(self, content, stat, head_blocks, tail_blocks, title_span, offsets, keys, sectioned):
+        """Keep the fingerprints of content as the last-seen file"""
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.size = len(content)
+        self.head_blocks = head_blocks
+        self.tail_blocks = tail_blocks
+        self.title_span = title_span
+        self.offsets = offsets
+        self.keys = keys
+        self.count = len(offsets) // 2
+        self.sectioned = sectioned
+        self.header = b''
+        if self.count and not sectioned:
+            self.header = content[:content.rfind(b'[', 0, offsets[0]) + 1]
+
+    def prime(self):
+        """Remember the file as it is now"""
+        if is_binary_template(self.path):
+            self.signature = file_signature(self.path)
+            store = open_binary_template(self.path)
+            self.count = len(store)
+            store.close()
+            return
+        content, stat = self._read()
+        try:
+            outline = []
+            title_span, offsets = scan_template(content, outline)
+            self._remember(content, stat, block_hashes(content), block_hashes(content, from_end=True),
+                           title_span, offsets, step_keys(content, offsets), bool(outline))
+        finally:
+            release_view(content)
+
+    def _title(self, content, title_span):
+        start, end = title_span
+        return decode_string(content[start:end]) if end > start else None
+
+    def check(self):
+        """Return a TemplateDiff if the file changed since the last check, else None
+
+        Raises ValueError if the file is not a valid template right now (an
+        editor may be half way through writing it); the old state is kept.
+        """
+        if self.signature is None:
+            self.prime()
+            return None
+        if file_signature(self.path) == self.signature:
+            return None
+        if is_binary_template(self.path):
+            return self._check_binary()
+
+        content, stat = self._read()
+        diff = None
+        try:
+            diff = self._diff(content, stat)
+        finally:
+            # A new step store owns the view it reads from
+            if diff is None or diff.steps is None:
+                release_view(content)
+        return diff
+
+    def _diff(self, content, stat):
+        head_blocks = block_hashes(content)
+        if len(content) == self.size and head_blocks == self.head_blocks:
+            self.signature = (stat.st_mtime_ns, stat.st_size)
+            return None
+        tail_blocks = block_hashes(content, from_end=True)
+        try:
+            title_span, offsets, keys, start, end, new_end = self._diff_incremental(content, head_blocks, tail_blocks)
+            outline = None
+        except ValueError:
+            title_span, offsets, keys, start, end, new_end, outline = self._diff_full(content)
+
+        inserted = [decode_string(content[offsets[2 * k]:offsets[2 * k + 1]]) for k in range(start, new_end)]
+        old_keys = new_keys = None
+        if end - start <= MAX_REGION_DIFF:
+            old_keys, new_keys = self.keys[start:end], keys[start:new_end]
+        old_count = self.count
+
+        steps = None
+        if stat.st_size >= MMAP_THRESHOLD:
+            if outline is None:
+                write_index(self.path + INDEX_SUFFIX, stat, offsets, title_span)
+            steps = MmapStepStore(self.path, content, offsets, title_span, outline=outline)
+
+        self._remember(content, stat, head_blocks, tail_blocks, title_span, offsets, keys, outline is not None)
+        return TemplateDiff(self.path, self._title(content, title_span), old_count, start, end - start,
+                            inserted, old_keys, new_keys, steps, outline)
+
+    def _check_binary(self):
+        """Binary guides are regenerated rather than edited, so swap in the new store whole"""
+        store = open_binary_template(self.path)
+        old_count = self.count
+        self.count = len(store)
+        self.signature = file_signature(self.path)
+        return TemplateDiff(self.path, store.title, old_count, 0, old_count, [], steps=store)
+
+    def _diff_incremental(self, content, head_blocks, tail_blocks):
+        """Rescan only the changed byte range; raises ValueError when that is not possible
+
+        Returns (title span, offsets, step keys, start, end, new end): new
+        steps [start, new end) replace old steps [start, end).
+        """
+        old_offsets = self.offsets
+        count = self.count
+        if not count:
+            raise ValueError("No steps to anchor an incremental scan")
+        if self.sectioned:
+            raise ValueError("Sectioned guides are rescanned whole")
+        old_size, size = self.size, len(content)
+        limit = min(old_size, size)
+        # Whole matching blocks: at most a block short of the real common prefix and suffix
+        prefix = min(shared_blocks(self.head_blocks, head_blocks) * FINGERPRINT_BLOCK, limit)
+        header = self.header
+        if prefix < len(header) and content[:len(header)] == header:
+            prefix = len(header)
+        suffix = min(shared_blocks(self.tail_blocks, tail_blocks) * FINGERPRINT_BLOCK, limit - prefix)
+        changed_end = old_size - suffix
+        if b'"sections"' in content[prefix:size - suffix]:
+            raise ValueError("Sections added")
+        delta = size - old_size
+
+        title_start, title_end = self.title_span
+        if title_end > title_start and title_start < changed_end and title_end > prefix:
+            raise ValueError("Title changed")
+        title_span = self.title_span if title_end <= prefix else (title_start + delta, title_end + delta)
+
+        # Steps wholly before the change, and the first step wholly after it
+        start = self._bisect(lambda k: old_offsets[2 * k + 1], prefix, right=True)
+        end = max(self._bisect(lambda k: old_offsets[2 * k], changed_end, right=False), start)
+
+        if start:
+            scan_from = old_offsets[2 * start - 1]
+        else:
+            scan_from = len(header)
+            if scan_from > prefix:
+                raise ValueError("Change before the steps array")
+        stop = old_offsets[2 * end] + delta if end < count else None
+        region, closed = scan_step_range(content, scan_from, start > 0, stop)
+        if stop is not None and closed:
+            raise ValueError("Steps array ended before the unchanged tail")
+
+        region_keys = step_keys(content, region)
+        offsets = old_offsets[:2 * start]
+        offsets.extend(region)
+        offsets.extend(offset + delta for offset in old_offsets[2 * end:])
+        keys = self.keys[:start]
+        keys.extend(region_keys)
+        keys.extend(self.keys[end:])
+
+        # The block bounds may take in unchanged steps at either edge
+        new_end = start + len(region_keys)
+        while start < end and start < new_end and keys[start] == self.keys[start]:
+            start += 1
+        while end > start and new_end > start and keys[new_end - 1] == self.keys[end - 1]:
+            end -= 1
+            new_end -= 1
+        return title_span, offsets, keys, start, end, new_end
+
+    def _diff_full(self, content):
+        """Rescan the whole file, then narrow the change by comparing step hashes from both ends"""
+        outline = []
+        title_span, offsets = scan_template(content, outline)
+        keys = step_keys(content, offsets)
+        old_keys = self.keys
+        old_count, new_count = self.count, len(keys)
+
+        start = 0
+        while start < min(old_count, new_count) and old_keys[start] == keys[start]:
+            start += 1
+        tail = 0
+        while tail < min(old_count, new_count) - start and old_keys[old_count - 1 - tail] == keys[new_count - 1 - tail]:
+            tail += 1
+        return (title_span, offsets, keys, start, old_count - tail, new_count - tail,
+                SectionOutline(outline) if outline else None)
+
+    def _bisect(self, key, value, right):
+        """Binary search over step numbers by a per-step key (starts or ends are ascending)"""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if key(mid) < value or (right and key(mid) == value):
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+
+class _Inotify:
+    """Minimal inotify binding (Linux) watching one directory"""
+
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, directory):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_MODIFY | self.IN_ATTRIB | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+        # Written by wake() so wait() can block without a timeout
+        self._wake_r, self._wake_w = os.pipe()
+
+    def wait(self, name, timeout=None):
+        """Wait up to timeout seconds (forever if None) or until wake(); returns True if an event touched `name`"""
+        ready, _, _ = select.select([self.fd, self._wake_r], [], [], timeout)
+        if self.fd not in ready:
+            return False
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        pos = 0
+        touched = False
+        while pos + self.EVENT.size <= len(buf):
+            _, _, _, length = self.EVENT.unpack_from(buf, pos)
+            pos += self.EVENT.size
+            if buf[pos:pos + length].rstrip(b'\0') == name:
+                touched = True
+            pos += length
+        return touched
+
+    def wake(self):
+        """Interrupt a wait() in progress"""
+        os.write(self._wake_w, b'\0')
+
+    def close(self):
+        for fd in (self.fd, self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+class TemplateWatcher:
+    """Background thread that reports changes to one template file
+
+    Uses inotify on the file's directory where available (so editors that
+    save by renaming a temp file are caught too) and stat polling otherwise.
+    on_start() and on_change() run on the watcher thread, on_change once the
+    file's (mtime, size) has changed and stayed put for `settle` seconds.
+    """
+
+    def __init__(self, path, on_change, on_start=None, poll_interval=0.5, settle=0.05):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.on_start = on_start
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.backend = None
+        # Guards the backend between stop() waking it and the thread closing it
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="TemplateWatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        """Stop watching, optionally waiting for the thread to exit"""
+        self._stop.set()
+        with self._lock:
+            if self.backend is not None:
+                self.backend.wake()
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _open_backend(self):
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            return _Inotify(os.path.dirname(self.path) or '.')
+        except (OSError, AttributeError):
+            return None
+
+    def _run(self):
+        backend = self._open_backend()
+        with self._lock:
+            self.backend = backend
+        name = os.fsencode(os.path.basename(self.path))
+        last = file_signature(self.path)
+        if self.on_start is not None:
+            try:
+                self.on_start()
+            except Exception as e:
+                print(f"Error reading template for hot reload: {e}")
+        try:
+            while not self._stop.is_set():
+                if self.backend is not None:
+                    # Blocks until the directory changes or stop() wakes it, so an idle watcher never wakes up
+                    if not self.backend.wait(name):
+                        continue
+                elif self._stop.wait(self.poll_interval):
+                    break
+                # Let the writer finish before reading
+                signature = file_signature(self.path)
+                while not self._stop.wait(self.settle):
+                    settled = file_signature(self.path)
+                    if settled == signature:
+                        break
+                    signature = settled
+                if signature is None or signature == last:
+                    continue
+                last = signature
+                try:
+                    self.on_change()
+                except Exception as e:
+                    print(f"Error reloading template: {e}")
+        finally:
+            with self._lock:
+                if self.backend is not None:
+                    self.backend.close()
+                    self.backend = None
@@ -0,0 +1,62 @@
+import glob
+import time
+
+
+def context_switches():
+    """Total context switches of every thread in this process, or None where /proc isn't available
+
+    Each one is a thread going to sleep or being woken, so the rate is a
+    good stand-in for wakeups per second.
+    """
+    total = 0
+    paths = glob.glob('/proc/self/task/*/status')
+    if not paths:
+        return None
+    for path in paths:
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    if line.startswith(('voluntary_ctxt_switches', 'nonvoluntary_ctxt_switches')):
+                        total += int(line.split(':')[1])
+        except (OSError, ValueError):
+            # The thread exited while we were reading
+            continue
+    return total
+
+
+class PowerSample:
+    """CPU time, process wakeups and event bus polls over one measured interval"""
+
+    def __init__(self, event_bus):
+        self.event_bus = event_bus
+        self.start()
+
+    def start(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.switches = context_switches()
+        self.polls = self.event_bus.polls
+
+    def finish(self):
+        """Return {seconds, cpu_percent, wakeups_per_sec (None if unknown), polls_per_sec}"""
+        seconds = max(time.perf_counter() - self.wall, 1e-9)
+        switches = context_switches()
+        wakeups = None
+        if switches is not None and self.switches is not None:
+            wakeups = (switches - self.switches) / seconds
+        return {
+            'seconds': seconds,
+            'cpu_percent': (time.process_time() - self.cpu) / seconds * 100,
+            'wakeups_per_sec': wakeups,
+            'polls_per_sec': (self.event_bus.polls - self.polls) / seconds,
+        }
+
+
+def format_power_report(rows):
+    """Format [(state, sample dict)] as a table"""
+    lines = [f"{'state':<10}{'CPU %':>8}{'wakeups/s':>12}{'polls/s':>10}"]
+    for state, sample in rows:
+        wakeups = sample['wakeups_per_sec']
+        wakeups_text = f"{wakeups:>12.1f}" if wakeups is not None else f"{'n/a':>12}"
+        lines.append(f"{state:<10}{sample['cpu_percent']:>8.2f}{wakeups_text}{sample['polls_per_sec']:>10.1f}")
+    return '\n'.join(lines)
@@ -0,0 +1,121 @@
+import json
+import math
+import time
+from array import array
+
+
+class Histogram:
+    """Fixed-size log-bucketed latency histogram (about 5% resolution, 1 us to ~100 s)"""
+
+    GROWTH = 1.05
+    MIN_VALUE = 1e-6
+    BUCKETS = 380
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    _LOG_GROWTH = math.log(GROWTH)
+
+    def __init__(self):
+        self.counts = array('L', bytes(array('L').itemsize * self.BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        """Add one sample"""
+        if seconds <= self.MIN_VALUE:
+            bucket = 0
+        else:
+            bucket = min(int(math.log(seconds / self.MIN_VALUE) / self._LOG_GROWTH) + 1, self.BUCKETS - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def bucket_upper(self, bucket):
+        """Return the upper bound of a bucket in seconds"""
+        return self.MIN_VALUE * self.GROWTH ** bucket
+
+    def percentile(self, fraction):
+        """Return the approximate value below which `fraction` of samples fall"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * fraction))
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self.bucket_upper(bucket), self.max)
+        return self.max
+
+    def summary(self):
+        """Return count, mean, p50, p99 and max in seconds"""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+
+class Instrumentation:
+    """Hot-path timing from hook callback to render completion
+
+    Stages (all perf_counter based):
+      hook    time spent inside the listener callback
+      queue   hook callback to the start of dispatch on the Tk thread
+      action  dispatch start to action handlers done
+      render  handlers done to the redraw having run (after_idle)
+      total   hook callback to render completion
+
+    Callers check `enabled` before taking timestamps, so a disabled instance
+    costs one attribute lookup per event.
+    """
+
+    STAGES = ('hook', 'queue', 'action', 'render', 'total')
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self.histograms = {stage: Histogram() for stage in self.STAGES}
+
+    def record(self, stage, seconds):
+        """Add a sample to a stage histogram"""
+        self.histograms[stage].record(seconds)
+
+    def reset(self):
+        """Clear every histogram"""
+        self.started_at = time.time()
+        self.histograms = {stage: Histogram() for stage in self.STAGES}
+
+    def summary(self):
+        """Return per-stage summaries"""
+        return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def summary_line(self):
+        """Format a compact one-line summary for the HUD"""
+        total = self.histograms['total']
+        hook = self.histograms['hook']
+        if not total.count:
+            return "perf: waiting for input"
+        return (f"key->px p50 {total.percentile(0.5) * 1000:.1f}ms "
+                f"p99 {total.percentile(0.99) * 1000:.1f}ms | "
+                f"hook p99 {hook.percentile(0.99) * 1e6:.0f}us | n={total.count}")
+
+    def dump(self, path):
+        """Write summaries and raw bucket counts as JSON for offline analysis"""
+        data = {
+            'started_at': self.started_at,
+            'dumped_at': time.time(),
+            'bucket_min_seconds': Histogram.MIN_VALUE,
+            'bucket_growth': Histogram.GROWTH,
+            'stages': {
+                stage: dict(histogram.summary(), buckets=list(histogram.counts))
+                for stage, histogram in self.histograms.items()
+            },
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        return path
@@ -0,0 +1,179 @@
+import time
+import weakref
+
+from keybind_index import normalize_char
+
+
+# Windows low-level keyboard hook messages
+WM_KEYDOWN = 0x100
+WM_KEYUP = 0x101
+WM_SYSKEYDOWN = 0x104
+WM_SYSKEYUP = 0x105
+
+
+class KeyFilter:
+    """Lookup tables from raw hook keys to the key names bindings use
+
+    Only keys that some binding uses (see KeybindIndex.bound_keys) are in the
+    tables, so an unbound keystroke is dropped after one attribute read and
+    one dict miss, before any string work:
+
+    - chars: typed character -> key name, covering upper case and the control
+      characters Ctrl+letter produces on some platforms
+    - special: pynput Key member (F-keys, Enter, ...) -> key name
+    - vks: Windows virtual-key code -> key name, for the suppression filter
+    """
+
+    def __init__(self, bound_keys, special_keys=None):
+        self.bound_keys = bound_keys
+        self.chars = {}
+        self.special = {}
+        self.vks = {}
+        for name in bound_keys:
+            if len(name) == 1:
+                candidates = {name, name.upper()}
+                if 96 <= ord(name) < 128:
+                    candidates.add(chr(ord(name) - 96))
+                for char in candidates:
+                    if normalize_char(char) == name:
+                        self.chars[char] = name
+                if name.isascii() and name.isalnum():
+                    # Letter and digit virtual-key codes are their upper-case ASCII codes
+                    self.vks[ord(name.upper())] = name
+            elif special_keys is not None:
+                key = getattr(special_keys, name, None)
+                if key is None:
+                    continue
+                self.special[key] = name
+                vk = getattr(key.value, 'vk', None)
+                if vk is not None:
+                    self.vks[vk] = name
+
+
+class KeyHook:
+    """The global keyboard hook's callbacks, kept free of Tk and pynput
+
+    The listener reports every keystroke on the system. on_press/on_release
+    track modifiers, drop unbound keys through a KeyFilter and hand bound key
+    names to on_key(name, hook_start) (normally VTaskTracker.check_keybind).
+    The filter is swapped whenever the dispatcher swaps in a new index; filters
+    are cached per index, so flipping between keybind profiles reuses them.
+
+    With suppression on (Windows only), win32_event_filter handles bound
+    chords itself and stops them reaching the game; every other key,
+    modifiers included, passes through untouched.
+    """
+
+    def __init__(self, dispatcher, on_key, modifier_keys, special_keys=None, instrumentation=None):
+        self.dispatcher = dispatcher
+        self.on_key = on_key
+        self.modifier_keys = modifier_keys
+        self.special_keys = special_keys
+        self.instrumentation = instrumentation
+        self.listener = None
+        self.suppressed = 0
+        # Virtual-key codes whose key-down was swallowed, so the key-up is too
+        self._swallowed = {}
+        self._index = None
+        self.key_filter = None
+        # KeybindIndex -> KeyFilter, dropped with the index
+        self._filters = weakref.WeakKeyDictionary()
+        self.refresh()
+
+    def filter_for(self, index):
+        """Return the KeyFilter for an index, building it on first use"""
+        key_filter = self._filters.get(index)
+        if key_filter is None:
+            key_filter = self._filters[index] = KeyFilter(index.bound_keys, self.special_keys)
+        return key_filter
+
+    def prepare(self, indexes):
+        """Build filters for indexes that may be swapped in later, off the hook thread"""
+        for index in indexes:
+            self.filter_for(index)
+
+    def refresh(self):
+        """Swap filters if the dispatcher's index changed"""
+        index = self.dispatcher.matcher.index
+        if index is not self._index:
+            self.key_filter = self.filter_for(index)
+            self._index = index
+
+    def on_press(self, key):
+        """pynput on_press callback"""
+        instrumentation = self.instrumentation
+        if instrumentation is None or not instrumentation.enabled:
+            self.press(key, None)
+            return
+        hook_start = time.perf_counter()
+        try:
+            self.press(key, hook_start)
+        finally:
+            instrumentation.record('hook', time.perf_counter() - hook_start)
+
+    def press(self, key, hook_start):
+        """Handle a key press; unbound keys are rejected before any string work"""
+        if self.dispatcher.matcher.index is not self._index:
+            self.refresh()
+        try:
+            char = getattr(key, 'char', None)
+            if char is not None:
+                name = self.key_filter.chars.get(char)
+            else:
+                # Modifiers are never debounced, or combos go missing
+                bit = self.modifier_keys.get(key)
+                if bit is not None:
+                    self.dispatcher.press_modifier(bit)
+                    return
+                name = self.key_filter.special.get(key)
+            if name is None:
+                # An unrelated key still breaks off a half-typed sequence
+                self.dispatcher.matcher.interrupt()
+                return
+            self.on_key(name, hook_start)
+        except (AttributeError, TypeError):
+            pass
+
+    def on_release(self, key):
+        """pynput on_release callback"""
+        try:
+            char = getattr(key, 'char', None)
+            if char is not None:
+                name = self.key_filter.chars.get(char)
+            else:
+                bit = self.modifier_keys.get(key)
+                if bit is not None:
+                    self.dispatcher.release_modifier(bit)
+                    return
+                name = self.key_filter.special.get(key)
+            if name is not None:
+                self.dispatcher.release_key(name)
+        except (AttributeError, TypeError):
+            pass
+
+    def win32_event_filter(self, msg, data):
+        """pynput win32_event_filter: swallow bound chords before the game sees them
+
+        A suppressed event never reaches on_press/on_release, so it is
+        dispatched from here instead.
+        """
+        vk = data.vkCode
+        if msg == WM_KEYDOWN or msg == WM_SYSKEYDOWN:
+            if self.dispatcher.matcher.index is not self._index:
+                self.refresh()
+            name = self.key_filter.vks.get(vk)
+            if name is None or not self.dispatcher.accepts(name):
+                return True
+            self._swallowed[vk] = name
+            self.suppressed += 1
+            instrumentation = self.instrumentation
+            enabled = instrumentation is not None and instrumentation.enabled
+            self.on_key(name, time.perf_counter() if enabled else None)
+        elif msg == WM_KEYUP or msg == WM_SYSKEYUP:
+            name = self._swallowed.pop(vk, None)
+            if name is None:
+                return True
+            self.dispatcher.release_key(name)
+        else:
+            return True
+        self.listener.suppress_event()
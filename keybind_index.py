@@ -0,0 +1,183 @@
+import time
+
+
+MODIFIER_BITS = {'shift': 1, 'ctrl': 2, 'alt': 4}
+
+# How long a partially typed sequence stays alive between keystrokes
+SEQUENCE_TIMEOUT = 1.5
+
+ARGUMENT_COMMIT_KEYS = {'enter'}
+ARGUMENT_KEYS = frozenset('0123456789') | ARGUMENT_COMMIT_KEYS
+
+
+class KeybindConflict(ValueError):
+    """Raised when two keybinds cannot both be resolved"""
+
+
+def modifier_mask(modifiers):
+    """Convert a list of modifier names into a bitmask"""
+    mask = 0
+    for modifier in modifiers:
+        mask |= MODIFIER_BITS.get(modifier, 0)
+    return mask
+
+
+def normalize_char(char):
+    """Normalize a typed character into a keybind key name"""
+    # Ctrl+letter arrives as a control character on some platforms
+    if len(char) == 1 and ord(char) < 32:
+        char = chr(ord(char) + 96)
+    return char.lower()
+
+
+def format_chord(mask, key):
+    """Format a (mask, key) chord for messages"""
+    names = [name for name, bit in MODIFIER_BITS.items() if mask & bit]
+    return '+'.join(names + [key])
+
+
+class _Node:
+    """Trie node; `action` is set on terminal nodes, `children` on prefixes"""
+    __slots__ = ('children', 'action', 'argument')
+
+    def __init__(self):
+        self.children = {}
+        self.action = None
+        self.argument = None
+
+
+class KeybindIndex:
+    """Frozen lookup table from (modifier mask, key) chords to actions
+
+    A binding is the existing {"modifiers": [...], "key": "x"} dict, optionally
+    extended with "then": [chord, ...] for multi-key sequences and
+    "argument": "number" to collect digits after the chord (committed with Enter).
+    """
+
+    def __init__(self, keybinds):
+        self.root = _Node()
+        # Every key name a keystroke can carry and still matter to some binding
+        self.bound_keys = set()
+        for action, config in keybinds.items():
+            self._insert(action, config)
+        self.bound_keys = frozenset(self.bound_keys)
+
+    def _insert(self, action, config):
+        """Add one binding to the trie"""
+        chords = [config] + list(config.get('then', []))
+        node = self.root
+        path = []
+        for i, chord in enumerate(chords):
+            key = str(chord.get('key', '')).lower()
+            if not key:
+                raise KeybindConflict(f"No key specified for {action}")
+            chord_id = (modifier_mask(chord.get('modifiers', [])), key)
+            path.append(format_chord(*chord_id))
+            self.bound_keys.add(key)
+            child = node.children.get(chord_id)
+            if child is None:
+                child = node.children[chord_id] = _Node()
+            if child.action is not None:
+                raise KeybindConflict(f"Duplicate keybind detected: {' '.join(path)} ({child.action} / {action})")
+            node = child
+        if node.children:
+            raise KeybindConflict(f"Keybind {' '.join(path)} for {action} is a prefix of another keybind")
+        node.action = action
+        node.argument = config.get('argument')
+        if node.argument:
+            self.bound_keys.update(ARGUMENT_KEYS)
+
+    def lookup(self, mask, key):
+        """Resolve a single chord from the top level"""
+        node = self.root.children.get((mask, key))
+        return node.action if node is not None else None
+
+
+class KeySequenceMatcher:
+    """Walks a KeybindIndex one keystroke at a time"""
+
+    def __init__(self, index, timeout=SEQUENCE_TIMEOUT):
+        self.index = index
+        # Index the partial sequence in _node was walked in
+        self._fed_index = index
+        self.timeout = timeout
+        self.reset()
+
+    def reset(self):
+        """Drop any partially typed sequence or argument"""
+        self._node = None
+        self._digits = None
+        self._last_time = 0.0
+
+    def set_index(self, index):
+        """Swap in a rebuilt index
+
+        Safe while another thread is feeding keys: the swap is a single
+        attribute store, and the feeding thread drops any sequence begun in
+        the old index on its next keystroke, so no key is matched against a
+        mix of the two.
+        """
+        self.index = index
+
+    def interrupt(self):
+        """Abandon a partly typed sequence or argument because an unbound key was pressed"""
+        if self._node is not None:
+            self.reset()
+
+    def accepts(self, mask, key):
+        """Return True if a keystroke would advance or complete a binding, without feeding it"""
+        index = self.index
+        if index is self._fed_index:
+            if self._digits is not None and ((mask == 0 and key.isdigit()) or key in ARGUMENT_COMMIT_KEYS):
+                return True
+            if self._node is not None and (mask, key) in self._node.children:
+                return True
+        return (mask, key) in index.root.children
+
+    def feed(self, mask, key, now=None):
+        """Feed one keystroke; return (action, argument) when a binding completes"""
+        if now is None:
+            now = time.monotonic()
+        index = self.index
+        if index is not self._fed_index:
+            # The index was swapped since the last keystroke
+            self.reset()
+            self._fed_index = index
+        elif self._node is not None and now - self._last_time > self.timeout:
+            self.reset()
+
+        # Collecting a numeric argument
+        if self._digits is not None:
+            if mask == 0 and key.isdigit() and len(key) == 1:
+                self._digits += key
+                self._last_time = now
+                return None
+            if key in ARGUMENT_COMMIT_KEYS and self._digits:
+                action = self._node.action
+                value = int(self._digits)
+                self.reset()
+                return action, value
+            # Anything else abandons the argument and is treated as a fresh keystroke
+            self.reset()
+
+        root = index.root
+        start = self._node if self._node is not None else root
+        node = start.children.get((mask, key))
+        if node is None and start is not root:
+            # Broken sequence: retry the key from the top level
+            self.reset()
+            node = root.children.get((mask, key))
+        if node is None:
+            return None
+
+        if node.action is None:
+            self._node = node
+            self._last_time = now
+            return None
+        if node.argument == 'number':
+            self._node = node
+            self._digits = ''
+            self._last_time = now
+            return None
+        self.reset()
+        return node.action, None
@@ -0,0 +1,62 @@
+import json
+
+
+# Name given to the bindings of a keybind_config.json written before profiles existed
+DEFAULT_PROFILE = 'default'
+
+
+class KeybindProfiles:
+    """Named keybind sets (e.g. one per game) kept together in keybind_config.json
+
+    The file holds {"active": name, "profiles": {name: {action: binding}}}.
+    A file in the older flat {action: binding} form is read as a single
+    "default" profile and written back in the new form on the next save.
+    """
+
+    def __init__(self, profiles=None, active=DEFAULT_PROFILE):
+        self.profiles = dict(profiles) if profiles else {DEFAULT_PROFILE: {}}
+        self.active = active if active in self.profiles else next(iter(self.profiles))
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from the parsed contents of keybind_config.json, in either form"""
+        profiles = config.get('profiles')
+        if isinstance(profiles, dict) and profiles:
+            return cls(profiles, config.get('active'))
+        return cls({DEFAULT_PROFILE: config})
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def __contains__(self, name):
+        return name in self.profiles
+
+    def names(self):
+        """Return the profile names in file order"""
+        return list(self.profiles)
+
+    def get(self, name):
+        """Return the stored {action: binding} of a profile, or None"""
+        return self.profiles.get(name)
+
+    def set(self, name, keybinds):
+        """Store keybinds as profile name, adding it if it is new"""
+        self.profiles[name] = dict(keybinds)
+
+    def neighbour(self, offset):
+        """Return the profile `offset` places after the active one, wrapping around"""
+        names = self.names()
+        return names[(names.index(self.active) + offset) % len(names)]
+
+    def dumps(self):
+        """JSON text for keybind_config.json"""
+        return json.dumps({"active": self.active, "profiles": self.profiles}, indent=2)
+
+    def snapshot(self):
+        """Return a callable producing dumps() as of now, for serializing on another thread
+
+        set() replaces a profile's dict rather than editing it, so copying
+        the top-level dict is enough.
+        """
+        profiles, active = dict(self.profiles), self.active
+        return lambda: json.dumps({"active": active, "profiles": profiles}, indent=2)
@@ -0,0 +1,107 @@
+import json
+import os
+from array import array
+
+from progress_journal import ProgressJournal
+
+
+# Positions kept for undo/redo per guide
+HISTORY_SIZE = 256
+
+
+class NavigationHistory:
+    """Ring buffer of visited steps with undo and redo
+
+    Positions live in one preallocated array('I'), so memory stays the same
+    however long the session or large the guide; once it is full each new
+    move overwrites the oldest. Entries are numbered by a running counter and
+    stored at counter % capacity. `_head` is the entry for the current
+    position: undo steps it back, redo forward, and a new move drops
+    everything after it.
+    """
+
+    def __init__(self, capacity=HISTORY_SIZE):
+        self.capacity = capacity
+        self._steps = array('I', [0]) * capacity
+        self.clear()
+
+    def clear(self):
+        """Forget every position"""
+        self._oldest = 0
+        self._head = -1
+        self._newest = -1
+
+    def __len__(self):
+        return self._newest - self._oldest + 1
+
+    def record(self, previous, step):
+        """Record a move from previous to step (on every navigation, so kept to a few array operations)"""
+        steps = self._steps
+        capacity = self.capacity
+        head = self._head
+        # The position may have changed without a recorded move (e.g. a reload)
+        if head < self._oldest or steps[head % capacity] != previous:
+            head += 1
+            steps[head % capacity] = previous
+        head += 1
+        steps[head % capacity] = step
+        self._head = self._newest = head
+        if head - self._oldest >= capacity:
+            self._oldest = head - capacity + 1
+
+    def undo(self):
+        """Return the position before the current one, or None at the oldest"""
+        if self._head <= self._oldest:
+            return None
+        self._head -= 1
+        return self._steps[self._head % self.capacity]
+
+    def redo(self):
+        """Return the position undone last, or None when nothing was undone"""
+        if self._head >= self._newest:
+            return None
+        self._head += 1
+        return self._steps[self._head % self.capacity]
+
+
+class Bookmarks:
+    """Named steps per template, kept in a small JSON file
+
+    The file maps each template (keyed like the progress journal) to
+    {name: 0-based step}.
+    """
+
+    template_key = staticmethod(ProgressJournal.template_key)
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self.loaded = False
+
+    def load(self):
+        """Read the file; a missing or unreadable file means no bookmarks yet"""
+        self.records = {}
+        self.loaded = True
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.records = json.load(f)
+            except Exception as e:
+                print(f"Error loading bookmarks: {e}")
+        return self
+
+    def get(self, template, name):
+        """Return the step bookmarked as name in template, or None"""
+        return self.records.get(self.template_key(template), {}).get(name)
+
+    def set(self, template, name, step):
+        """Bookmark step in template as name, replacing any bookmark of that name"""
+        self.records.setdefault(self.template_key(template), {})[name] = step
+
+    def names(self, template):
+        """Return {name: step} for template"""
+        return dict(self.records.get(self.template_key(template), {}))
+
+    def dumps(self):
+        """JSON text of every bookmark"""
+        return json.dumps(self.records, indent=2)
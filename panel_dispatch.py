@@ -0,0 +1,197 @@
+from keybind_index import KeybindIndex, KeybindConflict, KeySequenceMatcher
+
+
+class PanelDispatcher:
+    """One keybind index and modifier state shared by every guide panel
+
+    The primary panel's actions keep their own names; every other panel's are
+    compiled into the same trie as "<panel name>:<action>" and mapped back to
+    (panel number, action) through a route table. A keystroke therefore costs
+    one trie lookup however many panels are open, and a chord bound in two
+    panels is reported as a conflict instead of firing in both.
+
+    Debounce and auto-repeat still use each panel's own RepeatEngine.
+
+    Every keybind profile of the main guide is compiled up front into its own
+    (index, routes, disabled) table, so switching profiles is a reference
+    swap on the running hook rather than a rebuild or a listener restart.
+    """
+
+    def __init__(self, primary):
+        self.cores = [primary]
+        self.names = ['']
+        self.disabled = []
+        self.routes = {}
+        self.modifier_mask = 0
+        # Key -> panel whose repeat engine saw the press
+        self._held = {}
+        self.matcher = KeySequenceMatcher(KeybindIndex({}))
+        # Full index for every panel, and the one-chord index used while idle (see set_idle)
+        self.index = None
+        self.idle = False
+        # Profile name -> precompiled (index, routes, disabled)
+        self.profile_tables = {}
+        self.rebuild()
+
+    def __len__(self):
+        return len(self.cores)
+
+    def add_panel(self, core, name):
+        """Add a panel's core; returns its panel number"""
+        base, suffix = name or 'panel', 2
+        while name in self.names or not name:
+            name = f"{base} {suffix}"
+            suffix += 1
+        self.cores.append(core)
+        self.names.append(name)
+        self.rebuild()
+        return len(self.cores) - 1
+
+    def _entries(self, panel, keybinds):
+        """Namespaced {name: config} and {name: (panel, action)} for one panel's keybinds"""
+        if panel == 0:
+            return dict(keybinds), {action: (0, action) for action in keybinds}
+        prefix = self.names[panel] + ':'
+        return ({prefix + action: config for action, config in keybinds.items()},
+                {prefix + action: (panel, action) for action in keybinds})
+
+    def _compile(self, replace=None):
+        """Return (keybinds, routes, disabled) for every panel, optionally with one panel's keybinds replaced"""
+        keybinds = {}
+        routes = {}
+        disabled = []
+        for panel, core in enumerate(self.cores):
+            panel_keybinds = core.keybinds
+            if replace is not None and replace[0] == panel:
+                panel_keybinds = replace[1]
+            entries, panel_routes = self._entries(panel, panel_keybinds)
+            try:
+                KeybindIndex({**keybinds, **entries})
+            except KeybindConflict as e:
+                disabled.append((panel, e))
+                continue
+            keybinds.update(entries)
+            routes.update(panel_routes)
+        return keybinds, routes, disabled
+
+    def _compile_profiles(self):
+        """Return {profile: (index, routes, disabled)} for every usable keybind profile of the main guide
+
+        With no extra panels a profile's table is the core's own compiled
+        index, so the core and the hook share one object per profile.
+        """
+        primary = self.cores[0]
+        tables = {}
+        for name in primary.keybind_profiles.names():
+            try:
+                # The active profile may have fallen back to defaults if it failed to compile
+                keybinds, index = primary.compiled_profile(name)
+            except KeybindConflict:
+                # switch_keybind_profile refuses it too
+                continue
+            if len(self.cores) == 1:
+                tables[name] = (index, {action: (0, action) for action in keybinds}, [])
+                continue
+            keybinds, routes, disabled = self._compile(replace=(0, keybinds))
+            tables[name] = (KeybindIndex(keybinds), routes, disabled)
+        return tables
+
+    def _install(self, table):
+        """Make a compiled (index, routes, disabled) table the live one"""
+        index, routes, disabled = table
+        for panel, error in disabled:
+            print(f"Error in keybinds for panel {self.names[panel] or 'main'}, its keys are disabled: {error}")
+        self.disabled = [panel for panel, _ in disabled]
+        # Routes first: the hook thread may resolve a name from the new index straight away
+        self.routes = {**self.routes, **routes}
+        self.index = index
+        if self.idle:
+            self.set_idle(True)
+        else:
+            self.matcher.set_index(index)
+
+    def rebuild(self):
+        """Recompile the shared index after any panel's keybinds change
+
+        A panel whose keybinds clash with an earlier panel's is left without
+        bindings and reported, so one bad panel can't take down the others.
+        """
+        self.profile_tables = self._compile_profiles()
+        table = self.profile_tables[self.cores[0].keybind_profiles.active]
+        self._install(table)
+        self.routes = table[1]
+
+    def switch_profile(self, name):
+        """Install the precompiled table for the main guide's now-active profile
+
+        Call after TrackerCore.switch_keybind_profile. Routes of the previous
+        profile are kept, so a key the hook thread matched against the old
+        index a moment earlier still reaches its action. Modifier and held-key
+        state live here, not in the index, so they carry over.
+        """
+        table = self.profile_tables.get(name)
+        if table is None:
+            self.rebuild()
+            return
+        self._install(table)
+
+    def set_idle(self, idle):
+        """Match only the main guide's restore chord (minimize_toggle) while idle
+
+        The hook rebuilds its key filter from the swapped-in index, so every
+        other key is dropped after one dict miss.
+        """
+        self.idle = idle
+        if not idle:
+            self.matcher.set_index(self.index)
+            return
+        restore = self.cores[0].keybinds.get('minimize_toggle')
+        try:
+            index = KeybindIndex({'minimize_toggle': restore} if restore else {})
+        except KeybindConflict:
+            index = self.index
+        self.matcher.set_index(index)
+
+    def check_keybinds(self, panel, keybinds):
+        """Raise KeybindConflict if a panel's new keybinds clash with themselves or another panel"""
+        KeybindIndex(keybinds)
+        _, _, disabled = self._compile(replace=(panel, keybinds))
+        for other, error in disabled:
+            if other not in self.disabled:
+                raise error
+
+    # Keystrokes, called from the hook thread
+
+    def press_modifier(self, bit):
+        """Record a modifier key going down"""
+        self.modifier_mask |= bit
+
+    def release_modifier(self, bit):
+        """Record a modifier key going up"""
+        self.modifier_mask &= ~bit
+
+    def accepts(self, key):
+        """Return True if a key press would advance or complete any panel's binding"""
+        return self.matcher.accepts(self.modifier_mask, key)
+
+    def handle_key(self, key, now=None):
+        """Match a key press; returns (panel, action, argument, count) or None"""
+        match = self.matcher.feed(self.modifier_mask, key, now)
+        if match is None:
+            return None
+        name, arg = match
+        route = self.routes.get(name)
+        if route is None:
+            return None
+        panel, action = route
+        self._held[key] = panel
+        count = self.cores[panel].repeat_engine.press(action, key, now)
+        if not count:
+            return None
+        return panel, action, arg, count
+
+    def release_key(self, key):
+        """Record a non-modifier key going up (ends auto-repeat in the panel that saw it)"""
+        panel = self._held.pop(key, None)
+        if panel is not None:
+            self.cores[panel].repeat_engine.release(key)
@@ -0,0 +1,153 @@
+import os
+import threading
+from collections import OrderedDict
+from step_store import load_template, close_steps
+from startup_snapshot import file_signature
+
+
+# Templates after the current one that are kept parsed and ready
+PREFETCH_AHEAD = 2
+
+
+class Playlist:
+    """Ordered list of templates that are run back to back"""
+
+    def __init__(self, paths=()):
+        self.paths = list(paths)
+        self._positions = {os.path.abspath(path): i for i, path in enumerate(self.paths)}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def position(self, template):
+        """Return the index of template in the playlist, or None if it isn't in it"""
+        return self._positions.get(os.path.abspath(template))
+
+    def neighbour(self, template, offset):
+        """Return the template `offset` entries away from template, or None past either end"""
+        position = self.position(template)
+        if position is None:
+            return None
+        position += offset
+        if 0 <= position < len(self.paths):
+            return self.paths[position]
+        return None
+
+    def upcoming(self, template, count=PREFETCH_AHEAD):
+        """Return the templates that follow template; the playlist start when it isn't in it"""
+        position = self.position(template)
+        start = 0 if position is None else position + 1
+        return self.paths[start:start + count]
+
+
+class TemplatePrefetcher:
+    """Background thread that parses templates into a small bounded cache
+
+    request(paths) replaces the set of wanted templates; the thread parses
+    each one in order, so opening it later is a dictionary lookup instead of
+    disk I/O and json.load on the UI thread. take(path) hands a parsed
+    template over and forgets it. Templates no longer wanted are evicted and
+    their step stores closed. A template whose file changed after it was
+    parsed is dropped on take, so the caller reads it again.
+    """
+
+    def __init__(self, capacity=PREFETCH_AHEAD):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        # path -> (file signature, (title, steps, outline))
+        self._cache = OrderedDict()
+        self._wanted = []
+        # Wanted paths already parsed (or failed) since the last request
+        self._attempted = set()
+        self._loading = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stopping = False
+        self._thread = None
+
+    def request(self, paths):
+        """Parse these templates in the background, dropping any other cached ones"""
+        paths = [os.path.abspath(path) for path in paths][:self.capacity]
+        with self._lock:
+            self._wanted = paths
+            self._attempted &= set(paths)
+            evicted = [self._cache.pop(path) for path in list(self._cache) if path not in paths]
+            if self._thread is None and not self._stopping:
+                self._thread = threading.Thread(target=self._run, name="TemplatePrefetcher", daemon=True)
+                self._thread.start()
+            self._changed.notify_all()
+        for _, template in evicted:
+            close_steps(template[1])
+
+    def take(self, path):
+        """Return the prefetched (title, steps, outline) for path, or None if it isn't ready"""
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._cache.pop(path, None)
+            # Parse it again if it is still wanted after this
+            self._attempted.discard(path)
+        if entry is not None:
+            signature, template = entry
+            if signature == file_signature(path):
+                self.hits += 1
+                return template
+            close_steps(template[1])
+        self.misses += 1
+        return None
+
+    def ready(self, path):
+        """Return True if path is parsed and waiting in the cache"""
+        with self._lock:
+            return os.path.abspath(path) in self._cache
+
+    def wait(self, timeout=None):
+        """Block until every wanted template has been tried; returns False on timeout"""
+        with self._lock:
+            return self._changed.wait_for(lambda: self._next_wanted() is None and self._loading is None, timeout)
+
+    def close(self, timeout=None):
+        """Stop the thread and release every cached template"""
+        with self._lock:
+            self._stopping = True
+            self._changed.notify_all()
+            thread, self._thread = self._thread, None
+            evicted = list(self._cache.values())
+            self._cache.clear()
+        if thread is not None:
+            thread.join(timeout)
+        for _, template in evicted:
+            close_steps(template[1])
+
+    def _next_wanted(self):
+        for path in self._wanted:
+            if path not in self._attempted and path not in self._cache:
+                return path
+        return None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._changed.wait_for(lambda: self._stopping or self._next_wanted() is not None)
+                if self._stopping:
+                    return
+                path = self._loading = self._next_wanted()
+                self._attempted.add(path)
+            # Taken before parsing, so an edit made meanwhile shows up as a mismatch on take
+            signature = file_signature(path)
+            template = None
+            if signature is not None:
+                try:
+                    template = load_template(path)
+                    self.loads += 1
+                except Exception as e:
+                    print(f"Error prefetching {path}: {e}")
+            with self._lock:
+                self._loading = None
+                if template is not None and path in self._wanted and not self._stopping:
+                    self._cache[path] = (signature, template)
+                    template = None
+                self._changed.notify_all()
+            if template is not None:
+                close_steps(template[1])
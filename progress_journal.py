@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+
+
+class ProgressJournal:
+    """Append-only journal of the current step per template, written by a background thread
+
+    Each record is a JSON line ["<template path>", <step>]. The last record for
+    a template wins on replay; a torn final line from a crash is ignored.
+    """
+
+    def __init__(self, path, flush_interval=0.25, fsync_interval=2.0, compact_ratio=4, compact_min_records=1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+
+        self.positions = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self._record_count = 0
+        self._last_fsync = 0.0
+        self._unsynced = False
+        self._torn_tail = False
+
+    @staticmethod
+    def template_key(template):
+        """Normalize a template path so relative and absolute paths share a record"""
+        return os.path.normcase(os.path.abspath(template))
+
+    def load(self):
+        """Replay the journal into memory, compacting it when it has grown large"""
+        self.positions = {}
+        self._record_count = 0
+        self._torn_tail = False
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        self._torn_tail = not line.endswith('\n')
+                        try:
+                            template, step = json.loads(line)
+                        except (ValueError, TypeError):
+                            # Torn write from a crash; later lines may still be valid
+                            continue
+                        self.positions[template] = step
+                        self._record_count += 1
+            except Exception as e:
+                print(f"Error reading progress journal: {e}")
+        if self._record_count > max(self.compact_min_records, self.compact_ratio * len(self.positions)):
+            self.compact()
+        return self.positions
+
+    def compact(self):
+        """Rewrite the journal with one record per template"""
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for template, step in self.positions.items():
+                    f.write(json.dumps([template, step]) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._record_count = len(self.positions)
+            self._torn_tail = False
+        except Exception as e:
+            print(f"Error compacting progress journal: {e}")
+
+    def start(self):
+        """Start the background writer"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ProgressJournal", daemon=True)
+            self._thread.start()
+
+    def get(self, template, default=0):
+        """Return the last recorded step for a template"""
+        return self.positions.get(self.template_key(template), default)
+
+    def record(self, template, step):
+        """Queue a position update; never touches the disk on the calling thread"""
+        key = self.template_key(template)
+        if self.positions.get(key) == step:
+            return
+        self.positions[key] = step
+        with self._lock:
+            self._pending[key] = step
+        self._wakeup.set()
+
+    def _run(self):
+        """Writer loop: batch pending records, flush them, fsync periodically"""
+        while True:
+            # With unsynced data, wake up again in time for the periodic fsync
+            woken = self._wakeup.wait(self.fsync_interval if self._unsynced else None)
+            if woken:
+                # Give a burst of navigation time to settle into one batch
+                self._stop.wait(self.flush_interval)
+            self._wakeup.clear()
+            stopping = self._stop.is_set()
+            self._write_pending(force_fsync=stopping)
+            if stopping:
+                break
+
+    def _write_pending(self, force_fsync=False):
+        """Append the pending batch to the journal"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch and not force_fsync and not self._unsynced:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if self._torn_tail:
+                    # Terminate the torn record so the next one starts on its own line
+                    self._file.write('\n')
+                    self._torn_tail = False
+            if batch:
+                self._file.write(''.join(json.dumps([template, step]) + '\n' for template, step in batch.items()))
+                self._file.flush()
+                self._record_count += len(batch)
+                self._unsynced = True
+            now = time.monotonic()
+            if self._unsynced and (force_fsync or now - self._last_fsync >= self.fsync_interval):
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+                self._unsynced = False
+        except Exception as e:
+            print(f"Error writing progress journal: {e}")
+
+    def close(self):
+        """Flush outstanding records, fsync and stop the writer"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wakeup.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+        else:
+            self._write_pending(force_fsync=True)
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
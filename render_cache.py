@@ -0,0 +1,143 @@
+from collections import OrderedDict
+import tkinter.font as tkfont
+
+
+class LayoutCache:
+    """Small LRU of step text pre-wrapped to a pixel width"""
+
+    def __init__(self, font, width, capacity=32):
+        self.font = font
+        self.width = width
+        self.capacity = capacity
+        self._layouts = OrderedDict()
+        self._word_widths = {}
+        self.space_width = font.measure(' ')
+        self.line_height = font.metrics('linespace')
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        """Return the wrapped layout for text, computing it on a miss"""
+        layout = self._layouts.get(text)
+        if layout is not None:
+            self._layouts.move_to_end(text)
+            self.hits += 1
+            return layout
+        self.misses += 1
+        return self.put(text)
+
+    def put(self, text):
+        """Compute and cache the layout for text"""
+        layout = self.wrap(text)
+        self._layouts[text] = layout
+        self._layouts.move_to_end(text)
+        while len(self._layouts) > self.capacity:
+            self._layouts.popitem(last=False)
+        return layout
+
+    def __contains__(self, text):
+        return text in self._layouts
+
+    def clear(self):
+        """Drop every cached layout and word measurement"""
+        self._layouts.clear()
+        self._word_widths.clear()
+
+    def measure(self, word):
+        """Return the pixel width of a word, memoized"""
+        width = self._word_widths.get(word)
+        if width is None:
+            width = self._word_widths[word] = self.font.measure(word)
+            if len(self._word_widths) > 4096:
+                self._word_widths.clear()
+        return width
+
+    def wrap(self, text):
+        """Greedy word wrap matching Tk's label wrapping; returns the wrapped string"""
+        lines = []
+        for paragraph in text.split('\n'):
+            line = []
+            line_width = 0
+            for word in paragraph.split(' '):
+                word_width = self.measure(word)
+                if line and line_width + self.space_width + word_width > self.width:
+                    lines.append(' '.join(line))
+                    line = []
+                    line_width = 0
+                if not line and word_width > self.width:
+                    # Break words that cannot fit on a line by themselves
+                    lines.extend(self._break_word(word))
+                    continue
+                line_width += word_width + (self.space_width if line else 0)
+                line.append(word)
+            lines.append(' '.join(line))
+        return '\n'.join(lines)
+
+    def _break_word(self, word):
+        """Split an over-long word into chunks that fit the width"""
+        chunks = []
+        start = 0
+        for end in range(1, len(word) + 1):
+            if end - start > 1 and self.font.measure(word[start:end]) > self.width:
+                chunks.append(word[start:end - 1])
+                start = end - 1
+        chunks.append(word[start:])
+        return chunks
+
+
+class StepRenderer:
+    """Renders the step counter and text, skipping configures that would not change the screen"""
+
+    def __init__(self, root, counter_label, step_label, width, prefetch_radius=2):
+        self.root = root
+        self.counter_label = counter_label
+        self.step_label = step_label
+        self.prefetch_radius = prefetch_radius
+        self.layouts = LayoutCache(tkfont.Font(font=step_label.cget('font')), width)
+        # Text is wrapped here, so the label must not wrap it again
+        step_label.config(wraplength=0)
+        self._shown = {}
+        self._prefetch_id = None
+        self.configures = 0
+        self.skipped = 0
+
+    def _set(self, label, text):
+        if self._shown.get(label) == text:
+            self.skipped += 1
+            return
+        label.config(text=text)
+        self._shown[label] = text
+        self.configures += 1
+
+    def show(self, counter_text, step_text):
+        """Update the labels; None leaves a label as it is"""
+        if counter_text is not None:
+            self._set(self.counter_label, counter_text)
+        if step_text is not None:
+            self._set(self.step_label, self.layouts.get(step_text))
+
+    def prefetch(self, steps, index):
+        """Lay out the neighbours of index in idle time"""
+        self.cancel_prefetch()
+        self._prefetch_id = self.root.after_idle(self._prefetch, steps, index)
+
+    def _prefetch(self, steps, index):
+        self._prefetch_id = None
+        for offset in range(1, self.prefetch_radius + 1):
+            for neighbour in (index + offset, index - offset):
+                if 0 <= neighbour < len(steps):
+                    text = steps[neighbour]
+                    if text not in self.layouts:
+                        self.layouts.put(text)
+
+    def cancel_prefetch(self):
+        """Drop a pending prefetch (e.g. when the steps it refers to are replaced)"""
+        if self._prefetch_id is not None:
+            self.root.after_cancel(self._prefetch_id)
+            self._prefetch_id = None
+
+    def invalidate(self):
+        """Forget what is on screen and every cached layout"""
+        self.cancel_prefetch()
+        self._shown.clear()
+        self.layouts.clear()
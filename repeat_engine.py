@@ -0,0 +1,107 @@
+import time
+
+
+# Settings keys, all times in seconds
+REPEAT_FIELDS = ('debounce', 'auto_repeat', 'delay', 'interval', 'acceleration', 'min_interval')
+
+NAVIGATION_REPEAT = {
+    'debounce': 0.03,
+    'auto_repeat': True,
+    'delay': 0.35,
+    'interval': 0.12,
+    'acceleration': 0.85,
+    'min_interval': 0.002,
+}
+
+SINGLE_SHOT = {
+    'debounce': 0.3,
+    'auto_repeat': False,
+    'delay': 0.5,
+    'interval': 0.1,
+    'acceleration': 1.0,
+    'min_interval': 0.1,
+}
+
+DEFAULT_REPEAT_SETTINGS = {
+    'next_step': dict(NAVIGATION_REPEAT),
+    'previous_step': dict(NAVIGATION_REPEAT),
+}
+
+# Upper bound on steps produced by one repeat event
+MAX_REPEAT_COUNT = 1000
+
+
+class _Hold:
+    __slots__ = ('action', 'next_fire', 'interval', 'last_fire')
+
+    def __init__(self, action, next_fire, interval, last_fire):
+        self.action = action
+        self.next_fire = next_fire
+        self.interval = interval
+        self.last_fire = last_fire
+
+
+class RepeatEngine:
+    """Per-action debounce and accelerating auto-repeat on a monotonic clock
+
+    A fresh press fires once unless it comes within the action's debounce of
+    the previous firing. Holding the key (the OS keeps sending presses without
+    a release) fires again after `delay`, then every `interval`, shrinking by
+    `acceleration` per repeat down to `min_interval`. Once the interval is
+    shorter than the OS repeat rate, one event fires several steps at once.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = {}
+        self.update_settings(settings or {})
+        self._held = {}
+        self._last_fire = {}
+
+    def update_settings(self, settings):
+        """Replace per-action settings, filling gaps from the defaults"""
+        merged = {action: dict(values) for action, values in DEFAULT_REPEAT_SETTINGS.items()}
+        for action, values in settings.items():
+            base = merged.get(action, dict(SINGLE_SHOT))
+            base.update({k: v for k, v in values.items() if k in REPEAT_FIELDS})
+            merged[action] = base
+        self.settings = merged
+
+    def settings_for(self, action):
+        return self.settings.get(action, SINGLE_SHOT)
+
+    def press(self, action, key, now=None):
+        """Handle a press of `key` bound to `action`; return how many times to fire (0 = drop)"""
+        if now is None:
+            now = time.monotonic()
+        config = self.settings_for(action)
+        hold = self._held.get(key)
+
+        if hold is None or hold.action != action:
+            # Fresh press
+            self._held[key] = _Hold(action, now + config['delay'], config['interval'], now)
+            last = self._last_fire.get(action)
+            if last is not None and now - last < config['debounce']:
+                return 0
+            self._last_fire[action] = now
+            return 1
+
+        # OS auto-repeat while held
+        if not config['auto_repeat'] or now < hold.next_fire:
+            return 0
+        # Catch up on every firing that fell due since the scheduled one
+        count = 1
+        if hold.interval > 0:
+            count = min(1 + int((now - hold.next_fire) / hold.interval), MAX_REPEAT_COUNT)
+        hold.interval = max(config['min_interval'], hold.interval * config['acceleration'])
+        hold.next_fire = now + hold.interval
+        hold.last_fire = now
+        self._last_fire[action] = now
+        return count
+
+    def release(self, key):
+        """Handle a key release; ends any hold on that key"""
+        self._held.pop(key, None)
+
+    def reset(self):
+        """Forget all held keys"""
+        self._held.clear()
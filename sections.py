@@ -0,0 +1,110 @@
+import bisect
+from array import array
+
+
+class SectionOutline:
+    """Section tree of a guide, laid over its flattened step list
+
+    A template may group steps into nested "sections". Navigation, search and
+    the progress journal keep working on the flat list (top-level steps first,
+    then each section's own steps followed by its sub-sections), and the
+    outline records where each section sits in it. Sections are stored in
+    document order as parallel arrays; a section's start is the prefix sum of
+    the step counts before it, so it covers steps [start, end).
+
+    Starts never decrease in document order, so the section holding a step is
+    one bisect plus a walk up at most `depth` parents, and next/previous
+    section bisect the sorted distinct starts of non-empty sections.
+    """
+
+    def __init__(self, entries):
+        """entries are [title, start, end, depth, parent] in document order (parent -1 at top level)"""
+        self.entries = [list(entry) for entry in entries]
+        self.titles = [str(entry[0]) if entry[0] is not None else '' for entry in entries]
+        self.starts = array('I', (entry[1] for entry in entries))
+        self.ends = array('I', (entry[2] for entry in entries))
+        self.depths = array('I', (entry[3] for entry in entries))
+        self.parents = array('i', (entry[4] for entry in entries))
+        self.stops = array('I', sorted({entry[1] for entry in entries if entry[2] > entry[1]}))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def section_at(self, step):
+        """Index of the innermost section containing step, or None"""
+        i = bisect.bisect_right(self.starts, step) - 1
+        while i >= 0 and self.ends[i] <= step:
+            i = self.parents[i]
+        return i if i >= 0 else None
+
+    def path(self, step):
+        """Titles of the sections containing step, outermost first"""
+        titles = []
+        i = self.section_at(step)
+        while i is not None and i >= 0:
+            titles.append(self.titles[i])
+            i = self.parents[i]
+        titles.reverse()
+        return titles
+
+    def context(self, step):
+        """Return (titles, 1-based position in the innermost section, its step count) or None"""
+        i = self.section_at(step)
+        if i is None:
+            return None
+        return self.path(step), step - self.starts[i] + 1, self.ends[i] - self.starts[i]
+
+    def next_section(self, step):
+        """First step of the next section starting after step, or None"""
+        j = bisect.bisect_right(self.stops, step)
+        return self.stops[j] if j < len(self.stops) else None
+
+    def previous_section(self, step):
+        """Start of the section step is in, or of the one before when already at its start; None if none"""
+        j = bisect.bisect_left(self.stops, step)
+        return self.stops[j - 1] if j else None
+
+    def nest(self, steps):
+        """Rebuild the template's top-level "steps" and "sections" around the flattened steps"""
+        nodes = []
+        sections = []
+        own_end = []
+        for title, start, end, depth, parent in self.entries:
+            node = {"title": title, "steps": []}
+            nodes.append(node)
+            own_end.append(end)
+            if parent < 0:
+                sections.append(node)
+            else:
+                node_parent = nodes[parent]
+                if 'sections' not in node_parent:
+                    node_parent['sections'] = []
+                    # A section's own steps stop where its first sub-section begins
+                    own_end[parent] = start
+                node_parent['sections'].append(node)
+        for node, start, end in zip(nodes, self.starts, own_end):
+            node['steps'] = list(steps[start:end])
+        leading = list(steps[:self.starts[0]]) if self.entries else list(steps)
+        return leading, sections
+
+
+def flatten_sections(data):
+    """Return (steps, outline) for a parsed template; outline is None for a flat guide"""
+    sections = data.get('sections')
+    if not sections:
+        return data.get('steps', []), None
+    steps = list(data.get('steps', []))
+    entries = []
+
+    def visit(section_list, depth, parent):
+        for section in section_list:
+            if not isinstance(section, dict):
+                raise ValueError("Sections must be objects")
+            index = len(entries)
+            entry = [section.get('title'), len(steps), 0, depth, parent]
+            entries.append(entry)
+            steps.extend(section.get('steps', []))
+            visit(section.get('sections', []), depth + 1, index)
+            entry[2] = len(steps)
+    visit(sections, 0, -1)
+    return steps, SectionOutline(entries)
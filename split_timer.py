@@ -0,0 +1,185 @@
+import json
+import math
+import os
+import time
+from array import array
+
+from progress_journal import ProgressJournal
+
+
+# Timer states
+IDLE = 0
+RUNNING = 1
+FINISHED = 2
+
+_NAN = float('nan')
+
+
+def format_time(seconds, signed=False):
+    """Format seconds as m:ss.cc (h:mm:ss.cc past an hour), with a sign for deltas"""
+    sign = ''
+    if signed:
+        sign = '-' if seconds < 0 else '+'
+    seconds = abs(seconds)
+    # The epsilon keeps float noise like 0.7999999 from showing as 0.79
+    centis = int(seconds * 100 + 1e-6)
+    minutes, centis = divmod(centis, 6000)
+    if minutes >= 60:
+        hours, minutes = divmod(minutes, 60)
+        return f"{sign}{hours}:{minutes:02d}:{centis // 100:02d}.{centis % 100:02d}"
+    if signed and not minutes:
+        return f"{sign}{centis // 100}.{centis % 100:02d}"
+    return f"{sign}{minutes}:{centis // 100:02d}.{centis % 100:02d}"
+
+
+def next_tick_delay(anchor, now, interval):
+    """Milliseconds until the next tick on the grid anchor + k * interval
+
+    Scheduling against a fixed grid instead of "interval after the last tick"
+    keeps late callbacks from pushing every later tick back.
+    """
+    return max(1, math.ceil((interval - (now - anchor) % interval) * 1000))
+
+
+class SplitTimer:
+    """Timer for one run through a guide, split on every step reached
+
+    The run log is two parallel arrays: the step arrived at and the seconds
+    since the start (perf_counter based). Arriving at the last step finishes
+    the run. A personal best is the arrival time at each step of the best
+    finished run, compared against as steps are reached.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """Drop the current run"""
+        self.state = IDLE
+        self.template = None
+        self.start_time = 0.0
+        self.end_time = 0.0
+        self.steps = array('I')
+        self.times = array('d')
+        self.personal_best = None
+        self.last_delta = None
+        # Set when the finished run replaced the personal best
+        self.new_best = False
+
+    def start(self, template, step, personal_best=None, now=None):
+        """Start a run at step, comparing against personal_best (array of arrival times, NaN where unknown)"""
+        self.reset()
+        self.state = RUNNING
+        self.template = template
+        self.start_time = self.clock() if now is None else now
+        self.personal_best = personal_best
+        self.steps.append(step)
+        self.times.append(0.0)
+
+    def split(self, step, last_step, now=None):
+        """Record arriving at step; returns True if this finished the run"""
+        if self.state != RUNNING:
+            return False
+        elapsed = (self.clock() if now is None else now) - self.start_time
+        self.steps.append(step)
+        self.times.append(elapsed)
+        best = self.personal_best
+        if best is not None and step < len(best) and best[step] == best[step]:
+            self.last_delta = elapsed - best[step]
+        else:
+            self.last_delta = None
+        if step >= last_step:
+            self.state = FINISHED
+            self.end_time = self.start_time + elapsed
+            return True
+        return False
+
+    def elapsed(self, now=None):
+        """Seconds since the start, frozen once the run is finished"""
+        if self.state == IDLE:
+            return 0.0
+        if self.state == FINISHED:
+            return self.end_time - self.start_time
+        return (self.clock() if now is None else now) - self.start_time
+
+    def arrivals(self, step_count):
+        """Arrival time at each step of this run (last arrival wins), NaN for steps never reached"""
+        arrivals = array('d', [_NAN]) * step_count
+        for step, elapsed in zip(self.steps, self.times):
+            if step < step_count:
+                arrivals[step] = elapsed
+        return arrivals
+
+    def text(self, now=None):
+        """Timer label text: elapsed time plus the last split against the personal best"""
+        if self.state == IDLE:
+            return ""
+        text = format_time(self.elapsed(now))
+        if self.last_delta is not None:
+            text += f"  {format_time(self.last_delta, signed=True)}"
+        if self.state == FINISHED:
+            text = "Final " + text + ("  PB" if self.new_best else "")
+        return text
+
+
+class PersonalBests:
+    """Best finished run per template, kept in a small JSON file
+
+    Each record is {"total": seconds, "splits": [arrival seconds or null per step]}.
+    """
+
+    template_key = staticmethod(ProgressJournal.template_key)
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self.loaded = False
+
+    def load(self):
+        """Read the file; a missing or unreadable file means no personal bests yet"""
+        self.records = {}
+        self.loaded = True
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.records = json.load(f)
+            except Exception as e:
+                print(f"Error loading personal bests: {e}")
+        return self
+
+    def get(self, template):
+        """Arrival times of the personal best for template as an array (NaN where unknown), or None"""
+        record = self.records.get(self.template_key(template))
+        if record is None:
+            return None
+        return array('d', (_NAN if split is None else split for split in record.get('splits', [])))
+
+    def total(self, template):
+        """Finishing time of the personal best, or None"""
+        record = self.records.get(self.template_key(template))
+        return record.get('total') if record is not None else None
+
+    def update(self, template, total, arrivals):
+        """Keep a finished run if it beats the stored one; returns True if it did"""
+        best = self.total(template)
+        if best is not None and best <= total:
+            return False
+        self.records[self.template_key(template)] = {
+            "total": round(total, 6),
+            "splits": [None if split != split else round(split, 6) for split in arrivals]
+        }
+        return True
+
+    def dumps(self):
+        """JSON text of every record"""
+        return json.dumps(self.records, indent=2)
+
+    def snapshot(self):
+        """Return a callable producing dumps() as of now, for serializing on the writer thread
+
+        update() replaces a template's record rather than editing it, so
+        copying the top-level dict is enough.
+        """
+        records = dict(self.records)
+        return lambda: json.dumps(records, indent=2)
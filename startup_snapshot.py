@@ -0,0 +1,73 @@
+import marshal
+import os
+
+
+SNAPSHOT_FILE = os.path.join('.vtask_cache', 'startup.bin')
+SNAPSHOT_VERSION = 2
+
+
+def file_signature(path):
+    """Return (mtime_ns, size) for path, or None if it cannot be stat'ed"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class StartupSnapshot:
+    """Pre-parsed keybinds and last template, reused while their files are unchanged
+
+    Entries are keyed by kind ('keybinds', 'template') and remember the
+    (mtime, size) of the file they were parsed from.
+    """
+
+    def __init__(self, path=SNAPSHOT_FILE):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+
+    def load(self):
+        """Read the snapshot; a missing or incompatible one is ignored"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = marshal.load(f)
+            # marshal's format is tied to the interpreter version
+            if data.get('version') == (SNAPSHOT_VERSION, marshal.version):
+                self.entries = data.get('entries', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ignoring startup snapshot: {e}")
+        return self
+
+    def get(self, kind, path):
+        """Return the cached value for path if the file has not changed since"""
+        entry = self.entries.get(kind)
+        if entry is None or entry[0] != os.path.abspath(path):
+            return None
+        if entry[1] != file_signature(path):
+            return None
+        return entry[2]
+
+    def put(self, kind, path, value):
+        """Cache a parsed value for path"""
+        signature = file_signature(path)
+        if signature is None:
+            return
+        self.entries[kind] = (os.path.abspath(path), signature, value)
+        self.dirty = True
+
+    def save(self):
+        """Write the snapshot if anything changed"""
+        if not self.dirty:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                marshal.dump({'version': (SNAPSHOT_VERSION, marshal.version), 'entries': self.entries}, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"Error saving startup snapshot: {e}")
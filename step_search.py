@@ -0,0 +1,389 @@
+import bisect
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+
+from template_library import tokenize
+
+
+# Guides up to this many steps are indexed synchronously on first use
+SYNC_INDEX_LIMIT = 5000
+# Steps tokenized per chunk by the background builder
+CHUNK_SIZE = 4096
+# The sorted vocabulary used for prefix matching is refreshed at most this often while building
+VOCABULARY_REFRESH = 0.25
+# Prefix terms covering more tokens than this are checked step by step, then merged
+MAX_PREFIX_LISTS = 64
+# Steps such a prefix checks one at a time before merging its posting lists; prefixes
+# too rare to be expected within half that many steps are merged straight away
+PREFIX_SCAN_LIMIT = 64
+# Merged prefix postings kept while the user types
+PREFIX_CACHE_SIZE = 8
+# Counting multi-term matches stops here; the UI shows "1000+"
+MATCH_COUNT_LIMIT = 1000
+
+
+class StepIndex:
+    """Inverted token index over a guide's steps
+
+    Each token maps to an array of the step numbers containing it, in
+    ascending order because steps are indexed front to back. A query is a
+    list of terms that must all match (the last one as a prefix while the
+    user is still typing); finding the next match from a position leapfrogs
+    the posting lists with bisect, so a lookup costs O(terms * log steps)
+    however common the terms are. A prefix covering very many tokens is
+    the exception; see _PrefixScan.
+
+    build() runs in a background thread for large guides. Queries work on
+    whatever has been indexed so far.
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.postings = {}
+        self.indexed = 0
+        self.build_time = None
+        self._memory = None
+        self._vocabulary = []
+        # Running posting counts over the vocabulary, to size a prefix in O(1)
+        self._vocabulary_sizes = array('Q')
+        # Prefix term -> (steps indexed when merged, merged posting array)
+        self._prefix_cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self.steps)
+
+    @property
+    def complete(self):
+        return self._done.is_set()
+
+    def progress(self):
+        """Fraction of steps indexed so far"""
+        total = len(self.steps)
+        return self.indexed / total if total else 1.0
+
+    def start(self):
+        """Build in a background thread (idempotent); small guides are built right away"""
+        if len(self.steps) <= SYNC_INDEX_LIMIT:
+            if not self.complete:
+                self.build()
+        elif self._thread is None and not self.complete:
+            self._thread = threading.Thread(target=self.build, name="StepIndexBuilder", daemon=True)
+            self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop a background build and wait for it, e.g. before the steps are closed"""
+        self._cancel.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def wait(self, timeout=None):
+        """Wait for the build to finish; returns True if it did"""
+        return self._done.wait(timeout)
+
+    def build(self):
+        """Index every step, a chunk at a time"""
+        start = time.perf_counter()
+        steps = self.steps
+        total = len(steps)
+        last_vocabulary = start
+        position = self.indexed
+        while position < total:
+            if self._cancel.is_set():
+                return
+            end = min(position + CHUNK_SIZE, total)
+            chunk = {}
+            for number in range(position, end):
+                step = steps[number]
+                if not isinstance(step, str):
+                    continue
+                for token in set(tokenize(step)):
+                    postings = chunk.get(token)
+                    if postings is None:
+                        chunk[token] = [number]
+                    else:
+                        postings.append(number)
+            with self._lock:
+                postings = self.postings
+                for token, numbers in chunk.items():
+                    existing = postings.get(token)
+                    if existing is None:
+                        postings[token] = array('I', numbers)
+                    else:
+                        existing.extend(numbers)
+                self.indexed = end
+            position = end
+            now = time.perf_counter()
+            if now - last_vocabulary >= VOCABULARY_REFRESH:
+                self._refresh_vocabulary()
+                last_vocabulary = now
+        self._refresh_vocabulary()
+        self.build_time = time.perf_counter() - start
+        self._done.set()
+
+    def _refresh_vocabulary(self):
+        """Sort the tokens for prefix matching (on the builder thread)"""
+        postings = self.postings
+        vocabulary = sorted(postings)
+        sizes = array('Q', accumulate(len(postings[token]) for token in vocabulary))
+        with self._lock:
+            self._vocabulary, self._vocabulary_sizes = vocabulary, sizes
+
+    def memory_bytes(self):
+        """Approximate memory held by the index (cached once the build is complete)"""
+        if self._memory is not None:
+            return self._memory
+        complete = self.complete
+        with self._lock:
+            total = (sys.getsizeof(self.postings) + sys.getsizeof(self._vocabulary)
+                     + sys.getsizeof(self._vocabulary_sizes))
+            for token, numbers in self.postings.items():
+                total += sys.getsizeof(token) + sys.getsizeof(numbers)
+        if complete:
+            self._memory = total
+        return total
+
+    # Queries
+
+    def _term_lists(self, query):
+        """Resolve a query into one term cursor per term, rarest first, or None if a term has no match"""
+        terms = tokenize(query)
+        if not terms:
+            return None
+        prefix_last = not query[-1:].isspace()
+        term_lists = []
+        for i, term in enumerate(terms):
+            if prefix_last and i == len(terms) - 1:
+                vocabulary = self._vocabulary
+                start = bisect.bisect_left(vocabulary, term)
+                end = bisect.bisect_left(vocabulary, term + '\uffff', start)
+                tokens = vocabulary[start:end]
+                # The vocabulary may lag behind a running build
+                if (start == end or vocabulary[start] != term) and term in self.postings:
+                    tokens.append(term)
+                if len(tokens) > MAX_PREFIX_LISTS:
+                    sizes = self._vocabulary_sizes
+                    postings = sizes[end - 1] - (sizes[start - 1] if start else 0) if end else 0
+                    cursor = _PrefixScan(self, term, tokens)
+                    if postings * (PREFIX_SCAN_LIMIT // 2) < self.indexed:
+                        cursor.single()
+                    term_lists.append(cursor)
+                    continue
+                lists = [self.postings[token] for token in tokens]
+            else:
+                numbers = self.postings.get(term)
+                lists = [numbers] if numbers is not None else []
+            if not lists:
+                return None
+            term_lists.append(_PostingLists(lists))
+        # Rarest term first so the leapfrog skips furthest
+        term_lists.sort(key=lambda cursor: cursor.size)
+        return term_lists
+
+    def _cached_prefix(self, term):
+        """The merged posting array of a prefix if it is cached and current, else None"""
+        cached = self._prefix_cache.get(term)
+        if cached is not None and cached[0] == self.indexed:
+            self._prefix_cache.move_to_end(term)
+            return cached[1]
+        return None
+
+    def _merged_prefix(self, term, tokens):
+        """One sorted array of every step containing a token that starts with term
+
+        Built once and reused while the index is unchanged.
+        """
+        merged = self._cached_prefix(term)
+        if merged is None:
+            postings = self.postings
+            merged = array('I', sorted(set().union(*(postings[token] for token in tokens))))
+            self._prefix_cache[term] = (self.indexed, merged)
+            if len(self._prefix_cache) > PREFIX_CACHE_SIZE:
+                self._prefix_cache.popitem(last=False)
+        return merged
+
+    @staticmethod
+    def _leapfrog(term_lists, position, forward):
+        """First step matching every term from position in the given direction"""
+        while True:
+            candidate = position
+            for cursor in term_lists:
+                if forward:
+                    found = cursor.next_at_or_after(candidate)
+                else:
+                    found = cursor.previous_at_or_before(candidate)
+                if found is None:
+                    return None
+                candidate = found
+            if candidate == position:
+                return position
+            position = candidate
+
+    def find(self, query, current, forward=True, wrap=True):
+        """Return the next (or previous) matching step after current, wrapping around; None if none"""
+        with self._lock:
+            term_lists = self._term_lists(query)
+            if term_lists is None:
+                return None
+            if forward:
+                found = self._leapfrog(term_lists, current + 1, True)
+                if found is None and wrap:
+                    found = self._leapfrog(term_lists, 0, True)
+            else:
+                found = self._leapfrog(term_lists, current - 1, False) if current > 0 else None
+                if found is None and wrap:
+                    found = self._leapfrog(term_lists, max(len(self.steps) - 1, 0), False)
+            return found
+
+    def count(self, query, current=None, limit=MATCH_COUNT_LIMIT):
+        """Return (matches, ordinal of current among them or None)
+
+        Single-term queries are counted exactly from the posting list (merging
+        a long prefix's lists first); anything else is walked match by match
+        and stops at `limit`. Costs more than find(), so the overlay only
+        counts once typing pauses.
+        """
+        with self._lock:
+            term_lists = self._term_lists(query)
+            if term_lists is None:
+                return 0, None
+            if len(term_lists) > 1:
+                # Walking a thousand matches would check steps one by one otherwise
+                for cursor in term_lists:
+                    cursor.single()
+            numbers = term_lists[0].single() if len(term_lists) == 1 else None
+            if numbers is not None:
+                ordinal = None
+                if current is not None:
+                    i = bisect.bisect_left(numbers, current)
+                    if i < len(numbers) and numbers[i] == current:
+                        ordinal = i + 1
+                return len(numbers), ordinal
+            matches = 0
+            ordinal = None
+            position = 0
+            while matches < limit:
+                found = self._leapfrog(term_lists, position, True)
+                if found is None:
+                    break
+                matches += 1
+                if found == current:
+                    ordinal = matches
+                position = found + 1
+            return matches, ordinal
+
+
+class _PostingLists:
+    """A query term as the posting arrays of the tokens it covers"""
+
+    __slots__ = ('lists', 'size')
+
+    def __init__(self, lists):
+        self.lists = lists
+        self.size = sum(len(numbers) for numbers in lists)
+
+    def single(self):
+        """The one sorted array of matching steps, or None if there are several"""
+        return self.lists[0] if len(self.lists) == 1 else None
+
+    def next_at_or_after(self, position):
+        """Smallest step >= position in any of the arrays, or None"""
+        best = None
+        for numbers in self.lists:
+            i = bisect.bisect_left(numbers, position)
+            if i < len(numbers) and (best is None or numbers[i] < best):
+                best = numbers[i]
+        return best
+
+    def previous_at_or_before(self, position):
+        """Largest step <= position in any of the arrays, or None"""
+        best = None
+        for numbers in self.lists:
+            i = bisect.bisect_right(numbers, position)
+            if i and (best is None or numbers[i - 1] > best):
+                best = numbers[i - 1]
+        return best
+
+
+class _PrefixScan:
+    """A prefix term covering more than MAX_PREFIX_LISTS tokens
+
+    Merging thousands of posting lists costs milliseconds, too slow for the
+    first keystroke of a search. A prefix that common usually matches within
+    a few steps, so the cursor checks steps one at a time from the position;
+    only when PREFIX_SCAN_LIMIT steps go by without a match does it merge
+    the lists (cached for the next keystroke). While the query is extended,
+    the cached array of a shorter prefix narrows the steps it has to check.
+    """
+
+    # Always tried last: it checks candidates rather than generating them
+    size = sys.maxsize
+
+    def __init__(self, index, term, tokens):
+        self.index = index
+        self.term = term
+        self.tokens = tokens
+        self.merged = index._cached_prefix(term)
+        self.parent = None
+        if self.merged is None:
+            for length in range(len(term) - 1, 0, -1):
+                self.parent = index._cached_prefix(term[:length])
+                if self.parent is not None:
+                    break
+
+    def single(self):
+        if self.merged is None:
+            self.merged = self.index._merged_prefix(self.term, self.tokens)
+        return self.merged
+
+    def _matches(self, number):
+        step = self.index.steps[number]
+        term = self.term
+        return isinstance(step, str) and any(token.startswith(term) for token in tokenize(step))
+
+    def next_at_or_after(self, position):
+        """Smallest matching step >= position, or None"""
+        if self.merged is None:
+            parent = self.parent
+            if parent is None:
+                candidates = range(position, min(position + PREFIX_SCAN_LIMIT, self.index.indexed))
+            else:
+                i = bisect.bisect_left(parent, position)
+                candidates = parent[i:i + PREFIX_SCAN_LIMIT]
+            for number in candidates:
+                if self._matches(number):
+                    return number
+            if len(candidates) < PREFIX_SCAN_LIMIT:
+                return None
+            self.single()
+        numbers = self.merged
+        i = bisect.bisect_left(numbers, position)
+        return numbers[i] if i < len(numbers) else None
+
+    def previous_at_or_before(self, position):
+        """Largest matching step <= position, or None"""
+        if self.merged is None:
+            parent = self.parent
+            if parent is None:
+                top = min(position, self.index.indexed - 1)
+                candidates = range(top, max(top - PREFIX_SCAN_LIMIT, -1), -1)
+            else:
+                i = bisect.bisect_right(parent, position)
+                candidates = parent[max(i - PREFIX_SCAN_LIMIT, 0):i][::-1]
+            for number in candidates:
+                if self._matches(number):
+                    return number
+            if len(candidates) < PREFIX_SCAN_LIMIT:
+                return None
+            self.single()
+        numbers = self.merged
+        i = bisect.bisect_right(numbers, position)
+        return numbers[i - 1] if i else None
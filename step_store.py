@@ -0,0 +1,396 @@
+import json
+import os
+import re
+import struct
+import threading
+from array import array
+from collections.abc import Sequence
+
+from binary_template import BinaryStepStore, is_binary_template, map_file, open_binary_template, release_view
+from sections import SectionOutline, flatten_sections
+
+
+# Guides smaller than this are parsed with json.load into a plain list
+MMAP_THRESHOLD = 1024 * 1024
+
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'VTSI'
+INDEX_VERSION = 2
+# magic, version, source mtime_ns, source size, step count, title start, title end
+INDEX_HEADER = struct.Struct('<4sIqQQQQ')
+
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+_ARRAY_ITEM = re.compile(rb'[ \t\r\n]*("[^"\\]*(?:\\.[^"\\]*)*")[ \t\r\n]*([,\]])', re.DOTALL)
+
+
+def _skip_ws(buf, pos):
+    return _WHITESPACE.match(buf, pos).end()
+
+
+def _expect(buf, pos, char):
+    pos = _skip_ws(buf, pos)
+    if buf[pos:pos + 1] != char:
+        raise ValueError(f"Expected {char.decode()!r} at byte {pos}")
+    return pos + 1
+
+
+def _match_string(buf, pos):
+    match = _STRING.match(buf, pos)
+    if match is None:
+        raise ValueError(f"Expected string at byte {pos}")
+    return match
+
+
+def _skip_value(buf, pos):
+    """Return the position just past the JSON value starting at pos"""
+    pos = _skip_ws(buf, pos)
+    char = buf[pos:pos + 1]
+    if char == b'"':
+        return _match_string(buf, pos).end()
+    if char in (b'{', b'['):
+        depth = 0
+        while True:
+            char = buf[pos:pos + 1]
+            if not char:
+                raise ValueError("Unterminated JSON value")
+            if char == b'"':
+                pos = _match_string(buf, pos).end()
+                continue
+            if char in (b'{', b'['):
+                depth += 1
+            elif char in (b'}', b']'):
+                depth -= 1
+                if depth == 0:
+                    return pos + 1
+            pos += 1
+    # Number, true, false or null
+    end = pos
+    while end < len(buf) and buf[end:end + 1] not in b',}] \t\r\n':
+        end += 1
+    if end == pos:
+        raise ValueError(f"Unexpected character at byte {pos}")
+    return end
+
+
+def decode_string(raw):
+    """Decode a quoted JSON string literal"""
+    if b'\\' not in raw:
+        return raw[1:-1].decode('utf-8')
+    return json.loads(raw)
+
+
+def _scan_steps(buf, pos, offsets):
+    """Append the literals of a steps array starting just past '['; returns the position after ']'"""
+    if buf[_skip_ws(buf, pos):_skip_ws(buf, pos) + 1] == b']':
+        return _skip_ws(buf, pos) + 1
+    append = offsets.append
+    for item in _ARRAY_ITEM.finditer(buf, pos):
+        if item.start() != pos:
+            break
+        append(item.start(1))
+        append(item.end(1))
+        pos = item.end()
+        if item.group(2) == b']':
+            return pos
+    raise ValueError(f"Steps must be strings (byte {pos})")
+
+
+def _scan_sections(buf, pos, offsets, outline, depth, parent):
+    """Scan a sections array starting just past '[', appending step literals in flattened order
+
+    Each section adds [title, start step, end step, depth, parent] to outline
+    as in SectionOutline. Returns the position after ']'.
+    """
+    pos = _skip_ws(buf, pos)
+    if buf[pos:pos + 1] == b']':
+        return pos + 1
+    while True:
+        pos = _expect(buf, pos, b'{')
+        index = len(outline)
+        entry = [None, len(offsets) // 2, 0, depth, parent]
+        outline.append(entry)
+        children_pos = None
+        pos = _skip_ws(buf, pos)
+        if buf[pos:pos + 1] == b'}':
+            pos += 1
+        else:
+            while True:
+                pos = _skip_ws(buf, pos)
+                key_match = _match_string(buf, pos)
+                key = decode_string(key_match.group())
+                pos = _skip_ws(buf, _expect(buf, key_match.end(), b':'))
+                char = buf[pos:pos + 1]
+                if key == 'title' and char == b'"':
+                    title_match = _match_string(buf, pos)
+                    entry[0] = decode_string(title_match.group())
+                    pos = title_match.end()
+                elif key == 'steps' and char == b'[':
+                    pos = _scan_steps(buf, pos + 1, offsets)
+                elif key == 'sections' and char == b'[':
+                    children_pos = pos + 1
+                    pos = _skip_value(buf, pos)
+                else:
+                    pos = _skip_value(buf, pos)
+                pos = _skip_ws(buf, pos)
+                char = buf[pos:pos + 1]
+                if char == b'}':
+                    pos += 1
+                    break
+                if char != b',':
+                    raise ValueError(f"Expected ',' or '}}' at byte {pos}")
+                pos += 1
+        # Sub-sections follow the section's own steps whatever the key order
+        if children_pos is not None:
+            _scan_sections(buf, children_pos, offsets, outline, depth + 1, index)
+        entry[2] = len(offsets) // 2
+        pos = _skip_ws(buf, pos)
+        char = buf[pos:pos + 1]
+        if char == b']':
+            return pos + 1
+        if char != b',':
+            raise ValueError(f"Expected ',' or ']' at byte {pos}")
+        pos += 1
+
+
+def scan_template(buf, outline=None):
+    """Locate the title and each step string of a template without decoding it
+
+    Returns (title_span, offsets) where offsets holds start/end byte pairs of
+    every step literal (quotes included), sections flattened after the
+    top-level steps. Section entries are appended to `outline` if given.
+    """
+    pos = 0
+    if buf[:3] == b'\xef\xbb\xbf':
+        pos = 3
+    pos = _expect(buf, pos, b'{')
+    title_span = (0, 0)
+    offsets = array('Q')
+    sections_pos = None
+    pos = _skip_ws(buf, pos)
+    if buf[pos:pos + 1] == b'}':
+        return title_span, offsets
+    while True:
+        pos = _skip_ws(buf, pos)
+        key_match = _match_string(buf, pos)
+        key = decode_string(key_match.group())
+        pos = _expect(buf, key_match.end(), b':')
+        pos = _skip_ws(buf, pos)
+        if key == 'title' and buf[pos:pos + 1] == b'"':
+            title_match = _match_string(buf, pos)
+            title_span = title_match.span()
+            pos = title_match.end()
+        elif key == 'steps' and buf[pos:pos + 1] == b'[':
+            offsets = array('Q')
+            pos = _scan_steps(buf, pos + 1, offsets)
+        elif key == 'sections' and buf[pos:pos + 1] == b'[':
+            sections_pos = pos + 1
+            pos = _skip_value(buf, pos)
+        else:
+            pos = _skip_value(buf, pos)
+        pos = _skip_ws(buf, pos)
+        char = buf[pos:pos + 1]
+        if char == b'}':
+            break
+        if char != b',':
+            raise ValueError(f"Expected ',' or '}}' at byte {pos}")
+        pos += 1
+    if sections_pos is not None:
+        _scan_sections(buf, sections_pos, offsets, outline if outline is not None else [], 0, -1)
+    return title_span, offsets
+
+
+def scan_step_range(buf, pos, after_item, stop=None):
+    """Scan step literals of a steps array starting at pos
+
+    pos is just past the opening '[' or, with after_item, just past a step
+    literal. Scanning ends at the closing ']' or right before the literal
+    that starts at byte `stop`. Returns (offsets, closed) with start/end pairs
+    as in scan_template; closed is True if the ']' was reached.
+    """
+    offsets = array('Q')
+    pos = _skip_ws(buf, pos)
+    char = buf[pos:pos + 1]
+    if char == b']':
+        return offsets, True
+    if after_item:
+        if char != b',':
+            raise ValueError(f"Expected ',' or ']' at byte {pos}")
+        pos += 1
+    while True:
+        pos = _skip_ws(buf, pos)
+        if stop is not None and pos >= stop:
+            if pos > stop:
+                raise ValueError(f"Step boundary at byte {stop} not found")
+            return offsets, False
+        item = _ARRAY_ITEM.match(buf, pos)
+        if item is None:
+            raise ValueError(f"Steps must be strings (byte {pos})")
+        offsets.append(item.start(1))
+        offsets.append(item.end(1))
+        pos = item.end()
+        if item.group(2) == b']':
+            return offsets, True
+
+
+class MmapStepStore(Sequence):
+    """Read-only step sequence decoded lazily from a memory-mapped template (see map_file)"""
+
+    def __init__(self, path, data, offsets, title_span, index_map=None, outline=None):
+        self.path = path
+        self.outline = outline
+        self._data = data
+        self._offsets = offsets
+        self._title_span = title_span
+        self._index_map = index_map
+        self._count = len(offsets) // 2
+        self._refs = 1
+        self._refs_lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("step index out of range")
+        start = self._offsets[2 * i]
+        end = self._offsets[2 * i + 1]
+        return decode_string(self._data[start:end])
+
+    @property
+    def title(self):
+        start, end = self._title_span
+        if end <= start:
+            return None
+        return decode_string(self._data[start:end])
+
+    def retain(self):
+        """Take another reference for a reader on another thread; returns self"""
+        with self._refs_lock:
+            self._refs += 1
+        return self
+
+    def close(self):
+        """Drop a reference, releasing the mappings once every holder has closed it"""
+        with self._refs_lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+        offsets, self._offsets = self._offsets, array('Q')
+        self._count = 0
+        if isinstance(offsets, memoryview):
+            offsets.release()
+        release_view(self._index_map)
+        release_view(self._data)
+        self._index_map = None
+
+
+def _load_index(index_path, stat):
+    """Map a cached sidecar index if it matches the source file"""
+    try:
+        with open(index_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < INDEX_HEADER.size:
+                return None
+            index_map = map_file(f)
+    except OSError:
+        return None
+    magic, version, mtime_ns, size, count, title_start, title_end = INDEX_HEADER.unpack_from(index_map, 0)
+    expected = INDEX_HEADER.size + count * 16
+    if (magic != INDEX_MAGIC or version != INDEX_VERSION or mtime_ns != stat.st_mtime_ns
+            or size != stat.st_size or len(index_map) != expected):
+        release_view(index_map)
+        return None
+    offsets = memoryview(index_map)[INDEX_HEADER.size:].cast('Q')
+    return index_map, offsets, (title_start, title_end)
+
+
+def write_index(index_path, stat, offsets, title_span):
+    """Write the sidecar index next to the template (best effort)"""
+    tmp_path = index_path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, stat.st_mtime_ns, stat.st_size,
+                                      len(offsets) // 2, title_span[0], title_span[1]))
+            offsets.tofile(f)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def open_mmap_store(path, cache_index=True):
+    """Open a template as an MmapStepStore, building the sidecar index if stale
+
+    With cache_index False a stale index is rebuilt in memory only, so
+    nothing is written next to the template.
+    """
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        data = map_file(f)
+    index_path = path + INDEX_SUFFIX
+    cached = _load_index(index_path, stat)
+    if cached is not None:
+        index_map, offsets, title_span = cached
+        return MmapStepStore(path, data, offsets, title_span, index_map)
+    outline = []
+    try:
+        title_span, offsets = scan_template(data, outline)
+    except Exception:
+        release_view(data)
+        raise
+    if outline:
+        # The sidecar only describes flat guides, so sectioned ones are rescanned on open
+        return MmapStepStore(path, data, offsets, title_span, outline=SectionOutline(outline))
+    if cache_index:
+        write_index(index_path, stat, offsets, title_span)
+    return MmapStepStore(path, data, offsets, title_span)
+
+
+def load_template(path, cache_index=True):
+    """Load a template, returning (title, steps, section outline or None)
+
+    Small files are parsed with json.load as before; large ones are opened as
+    an MmapStepStore so only the visible step is ever decoded (cache_index
+    is passed to open_mmap_store). Binary .vtg templates are always mapped
+    and have no sections.
+    """
+    if is_binary_template(path):
+        store = open_binary_template(path)
+        return store.title, store, None
+    if os.path.getsize(path) >= MMAP_THRESHOLD:
+        store = open_mmap_store(path, cache_index)
+        return store.title, store, store.outline
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    steps, outline = flatten_sections(data)
+    return data.get('title'), steps, outline
+
+
+def open_template(path, cache_index=True):
+    """Load a template, returning (title, steps) with any sections flattened"""
+    title, steps, _ = load_template(path, cache_index)
+    return title, steps
+
+
+def close_steps(steps):
+    """Release a step store if it holds any mappings"""
+    if isinstance(steps, (MmapStepStore, BinaryStepStore)):
+        steps.close()
+
+
+def snapshot_steps(steps):
+    """Return a read-only view of steps for another thread; release it with close_steps
+
+    A step store is never modified, so the snapshot is another reference to
+    it and nothing is decoded. A plain list may be edited in place, so it is
+    copied.
+    """
+    if isinstance(steps, (MmapStepStore, BinaryStepStore)):
+        return steps.retain()
+    return tuple(steps)
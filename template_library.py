@@ -0,0 +1,304 @@
+import bisect
+import heapq
+import marshal
+import os
+import re
+import time
+from collections.abc import Sequence
+
+from step_store import open_template, close_steps
+from binary_template import BINARY_EXTENSION
+from startup_snapshot import file_signature
+
+
+LIBRARY_INDEX_FILE = os.path.join('.vtask_cache', 'library.bin')
+LIBRARY_INDEX_VERSION = 1
+
+# Directories never worth descending into
+SKIP_DIRS = {'.git', '.vtask_cache', '__pycache__', 'node_modules'}
+
+_TOKEN = re.compile(r'\w+')
+
+# Score weights per matched query term
+TITLE_EXACT = 8
+TITLE_PREFIX = 4
+STEP_EXACT = 2
+STEP_PREFIX = 1
+
+# Shorter terms only prefix-match titles; a one-letter prefix over every step
+# token in the library would cost tens of milliseconds per keystroke
+MIN_STEP_PREFIX = 3
+# Step-token prefix matches are truncated to this many tokens (in sorted order)
+MAX_PREFIX_EXPANSION = 512
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return _TOKEN.findall(text.lower())
+
+
+def fuzzy_score(query, text):
+    """Score query as an in-order subsequence of text (0 = no match)
+
+    Consecutive and word-start matches score higher, so "drcl" ranks
+    "Dracula Rush" above "dark cellar loot".
+    """
+    text = text.lower()
+    score = 0
+    pos = 0
+    previous = -2
+    for char in query:
+        pos = text.find(char, pos)
+        if pos < 0:
+            return 0
+        if pos == previous + 1:
+            score += 3
+        elif pos == 0 or not text[pos - 1].isalnum():
+            score += 2
+        else:
+            score += 1
+        previous = pos
+        pos += 1
+    return score
+
+
+class LibraryScan:
+    """Result of TemplateLibrary.scan(), applied with TemplateLibrary.apply()
+
+    `base` is the entries dict the scan started from; `entries` and
+    `postings` replace the library's when they differ from it.
+    """
+
+    __slots__ = ('base', 'entries', 'postings', 'parsed', 'unchanged', 'removed', 'elapsed')
+
+    def __init__(self, base, entries, postings, parsed, unchanged, removed, elapsed):
+        self.base = base
+        self.entries = entries
+        self.postings = postings
+        self.parsed = parsed
+        self.unchanged = unchanged
+        self.removed = removed
+        self.elapsed = elapsed
+
+
+class TemplateLibrary:
+    """Index of every guide under the configured directories
+
+    Each file's entry remembers the (mtime, size) it was parsed at, so a rescan
+    only stats unchanged files and re-parses the ones that changed. Title and
+    step tokens go into in-memory inverted indexes; term lookups are dict hits
+    plus a bisect over the sorted vocabulary for prefixes.
+    """
+
+    def __init__(self, directories, index_file=LIBRARY_INDEX_FILE):
+        self.directories = list(directories)
+        self.index_file = index_file
+        # path -> (signature, title, step count, title tokens, step tokens); title is None for non-guides
+        self.entries = {}
+        self.dirty = False
+        self.last_scan = None
+        self._title_postings = {}
+        self._step_postings = {}
+        self._title_vocabulary = []
+        self._step_vocabulary = []
+        self._sort_titles = {}
+
+    def load(self):
+        """Read the persisted index; a missing or incompatible one is ignored"""
+        self.entries = self.read_index()
+        self._set_postings(self._build_postings(self.entries))
+        return self
+
+    def read_index(self):
+        """Return the persisted entries without changing the library ({} if missing or incompatible)"""
+        try:
+            with open(self.index_file, 'rb') as f:
+                data = marshal.load(f)
+            if data.get('version') == (LIBRARY_INDEX_VERSION, marshal.version):
+                return data.get('entries', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ignoring template library index: {e}")
+        return {}
+
+    def save(self):
+        """Write the index if anything changed"""
+        if not self.dirty:
+            return
+        tmp_path = self.index_file + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.index_file) or '.', exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                marshal.dump({'version': (LIBRARY_INDEX_VERSION, marshal.version), 'entries': self.entries}, f)
+            os.replace(tmp_path, self.index_file)
+            self.dirty = False
+        except Exception as e:
+            print(f"Error saving template library index: {e}")
+
+    def set_directories(self, directories):
+        """Change the scanned directories (takes effect on the next refresh)"""
+        self.directories = list(directories)
+
+    def iter_files(self):
+        """Yield every .json and .vtg file under the configured directories"""
+        seen = set()
+        for directory in self.directories:
+            for dirpath, dirnames, filenames in os.walk(directory):
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')]
+                for filename in filenames:
+                    if filename.endswith(('.json', BINARY_EXTENSION)):
+                        path = os.path.abspath(os.path.join(dirpath, filename))
+                        if path not in seen:
+                            seen.add(path)
+                            yield path
+
+    def refresh(self):
+        """Rescan the directories; returns (parsed, unchanged, removed) file counts"""
+        return self.apply(self.scan())
+
+    def scan(self, entries=None):
+        """Rescan the directories against `entries` (default: the current ones) into a LibraryScan
+
+        The library itself is not changed, so this can run on a worker
+        thread while searches continue on the current index.
+        """
+        start = time.perf_counter()
+        base = self.entries if entries is None else entries
+        parsed = unchanged = 0
+        scanned = {}
+        for path in self.iter_files():
+            signature = file_signature(path)
+            if signature is None:
+                continue
+            entry = base.get(path)
+            if entry is not None and entry[0] == signature:
+                scanned[path] = entry
+                unchanged += 1
+            else:
+                scanned[path] = self._parse(path, signature)
+                parsed += 1
+        removed = len(base.keys() - scanned.keys())
+        if not parsed and not removed:
+            scanned = base
+        postings = self._build_postings(scanned) if scanned is not self.entries else None
+        return LibraryScan(base, scanned, postings, parsed, unchanged, removed, time.perf_counter() - start)
+
+    def apply(self, scan):
+        """Install a LibraryScan; returns its (parsed, unchanged, removed) file counts"""
+        if scan.entries is not self.entries:
+            self.entries = scan.entries
+            self._set_postings(scan.postings or self._build_postings(scan.entries))
+        if scan.entries is not scan.base:
+            self.dirty = True
+        self.last_scan = (scan.parsed, scan.unchanged, scan.removed, scan.elapsed)
+        return scan.parsed, scan.unchanged, scan.removed
+
+    def _parse(self, path, signature):
+        """Build the index entry for one file"""
+        try:
+            # Scanning must not leave sidecar indexes next to every large guide
+            title, steps = open_template(path, cache_index=False)
+        except Exception:
+            return (signature, None, 0, [], [])
+        try:
+            # Config files and other JSON without a step list are remembered as non-guides
+            if not isinstance(steps, Sequence) or isinstance(steps, str) or not len(steps):
+                return (signature, None, 0, [], [])
+            title = str(title) if title else os.path.splitext(os.path.basename(path))[0]
+            step_tokens = set()
+            for step in steps:
+                if isinstance(step, str):
+                    step_tokens.update(tokenize(step))
+            return (signature, title, len(steps), sorted(set(tokenize(title))), sorted(step_tokens))
+        finally:
+            close_steps(steps)
+
+    @staticmethod
+    def _build_postings(entries):
+        """Return the inverted indexes for a set of entries"""
+        title_postings = {}
+        step_postings = {}
+        sort_titles = {}
+        for path, (_, title, _, title_tokens, step_tokens) in entries.items():
+            if title is None:
+                continue
+            sort_titles[path] = title.lower()
+            for token in title_tokens:
+                title_postings.setdefault(token, []).append(path)
+            for token in step_tokens:
+                step_postings.setdefault(token, []).append(path)
+        return title_postings, step_postings, sorted(title_postings), sorted(step_postings), sort_titles
+
+    def _set_postings(self, postings):
+        (self._title_postings, self._step_postings, self._title_vocabulary, self._step_vocabulary,
+         self._sort_titles) = postings
+
+    def templates(self):
+        """Return [(path, title, step count)] for every indexed guide"""
+        return [(path, entry[1], entry[2]) for path, entry in self.entries.items() if entry[1] is not None]
+
+    def __len__(self):
+        return sum(1 for entry in self.entries.values() if entry[1] is not None)
+
+    @staticmethod
+    def _prefix_tokens(vocabulary, prefix):
+        """Return the tokens in a sorted vocabulary that start with prefix"""
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + '\uffff', start)
+        return vocabulary[start:end]
+
+    def _term_scores(self, term):
+        """Return {path: best score} for one query term"""
+        if len(term) >= MIN_STEP_PREFIX:
+            # The exact token sorts first, so truncating keeps it
+            step_tokens = self._prefix_tokens(self._step_vocabulary, term)[:MAX_PREFIX_EXPANSION]
+        else:
+            step_tokens = [term] if term in self._step_postings else []
+        title_tokens = self._prefix_tokens(self._title_vocabulary, term)
+
+        # Apply weights lowest first so each path ends up with its best one
+        scores = {}
+        for postings, tokens, exact, prefix in (
+                (self._step_postings, step_tokens, STEP_EXACT, STEP_PREFIX),
+                (self._title_postings, title_tokens, TITLE_EXACT, TITLE_PREFIX)):
+            for token in tokens:
+                if token != term:
+                    scores.update(dict.fromkeys(postings[token], prefix))
+            if term in postings:
+                scores.update(dict.fromkeys(postings[term], exact))
+        return scores
+
+    def search(self, query, limit=50):
+        """Return [(path, title, step count)] best first
+
+        Every query term must prefix-match a title or step token. If nothing
+        does, titles and file names are fuzzy-matched as a subsequence instead.
+        An empty query lists guides alphabetically.
+        """
+        terms = tokenize(query)
+        if not terms:
+            sort_titles = self._sort_titles
+            return heapq.nsmallest(limit, self.templates(), key=lambda item: sort_titles[item[0]])
+
+        totals = None
+        for term in terms:
+            scores = self._term_scores(term)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {path: totals[path] + score for path, score in scores.items() if path in totals}
+            if not totals:
+                break
+
+        if not totals:
+            compact = ''.join(terms)
+            totals = {}
+            for path, title, _ in self.templates():
+                score = max(fuzzy_score(compact, title), fuzzy_score(compact, os.path.basename(path)))
+                if score:
+                    totals[path] = score
+
+        sort_titles = self._sort_titles
+        ranked = heapq.nsmallest(limit, totals.items(), key=lambda item: (-item[1], sort_titles[item[0]]))
+        return [(path, self.entries[path][1], self.entries[path][2]) for path, _ in ranked]
@@ -0,0 +1,203 @@
+import json
+
+from sections import flatten_sections
+
+# Editor line kinds
+BLANK = 0
+STEP = 1
+HEADER = 2
+INVALID = 3
+
+# Lines longer than this are flagged rather than saved as one giant step
+MAX_LINE_LENGTH = 4000
+
+
+def encode_step(step):
+    """Editor line for a step: newlines become \\n and a leading '#' is escaped"""
+    line = step.replace('\n', '\\n')
+    if line.startswith('#') or line.startswith('\\#'):
+        line = '\\' + line
+    return line
+
+
+def decode_step(line):
+    """Step text for an editor line (inverse of encode_step)"""
+    step = line.strip()
+    if step.startswith('\\#'):
+        step = step[1:]
+    return step.replace('\\n', '\n')
+
+
+def parse_header(line):
+    """Return (depth, title) for a '#' section header line; depth 0 is a top-level section"""
+    stripped = line.strip()
+    marks = len(stripped) - len(stripped.lstrip('#'))
+    return marks - 1, stripped[marks:].strip()
+
+
+def classify(line):
+    """Kind of an editor line"""
+    stripped = line.strip()
+    if not stripped:
+        return BLANK
+    if len(line) > MAX_LINE_LENGTH:
+        return INVALID
+    if stripped.startswith('#'):
+        return HEADER if parse_header(stripped)[1] else INVALID
+    return STEP
+
+
+def line_error(line):
+    """Describe what is wrong with an INVALID line"""
+    if len(line) > MAX_LINE_LENGTH:
+        return f"line is longer than {MAX_LINE_LENGTH} characters"
+    return "section header has no title"
+
+
+def _header_line(title, depth):
+    # Headers need a title to be valid, so untitled sections get a placeholder
+    title = ' '.join(str(title).split()) if title is not None else ''
+    return '#' * (depth + 1) + ' ' + (title or 'Untitled section')
+
+
+def format_lines(steps, outline=None, start=0, stop=None):
+    """Yield editor lines for steps[start:stop], with '#' headers where sections begin
+
+    A header is emitted before the first step of each section (deepest last),
+    so editing and saving a guide keeps its sections.
+    """
+    stop = len(steps) if stop is None else stop
+    section = 0
+    entries = outline.entries if outline is not None else ()
+    while section < len(entries) and entries[section][1] < start:
+        section += 1
+    for number in range(start, stop):
+        while section < len(entries) and entries[section][1] == number:
+            title, _, _, depth, _ = entries[section]
+            yield _header_line(title, depth)
+            section += 1
+        step = steps[number]
+        yield encode_step(step if isinstance(step, str) else str(step))
+    if stop == len(steps):
+        # Empty sections at the very end
+        for title, _, _, depth, _ in entries[section:]:
+            yield _header_line(title, depth)
+
+
+class EditorLines:
+    """Kind of every line in the editor, updated as lines change
+
+    The editor reports each edit as "lines [start, start + removed) became
+    these lines", so only the changed lines are classified and step, header
+    and error counts are adjusted by difference.
+    """
+
+    def __init__(self):
+        # One empty line, like an empty Text widget
+        self.kinds = bytearray([BLANK])
+        self.counts = [1, 0, 0, 0]
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def replace(self, start, removed, lines):
+        """Lines [start, start + removed) were replaced by `lines` (0-based)"""
+        old = self.kinds[start:start + removed]
+        new = bytearray(map(classify, lines))
+        for kind in (BLANK, STEP, HEADER, INVALID):
+            self.counts[kind] += new.count(kind) - old.count(kind)
+        self.kinds[start:start + removed] = new
+
+    @property
+    def step_count(self):
+        return self.counts[STEP]
+
+    @property
+    def section_count(self):
+        return self.counts[HEADER]
+
+    @property
+    def error_count(self):
+        return self.counts[INVALID]
+
+    def first_error(self):
+        """0-based number of the first invalid line, or None"""
+        line = self.kinds.find(INVALID)
+        return line if line >= 0 else None
+
+
+class TemplateStreamEncoder:
+    """Turns editor lines into template JSON a chunk at a time
+
+    Steps go into the innermost open section; a header of depth d closes
+    sections at depth d or deeper and opens a new one (a header more than one
+    level deeper than its parent is treated as a direct child). The output
+    loads as the same steps and outline as parse_lines would give.
+    """
+
+    def __init__(self, title):
+        self.steps = 0
+        self.sections = 0
+        # One frame per open container (the template itself, then sections):
+        # [steps array open, first step pending, sections array open]
+        self._stack = [[True, True, False]]
+        self._header = '{\n  "title": ' + json.dumps(title) + ',\n  "steps": ['
+
+    def feed(self, lines):
+        """Return the JSON text for more editor lines"""
+        parts = [self._header] if self._header else []
+        self._header = None
+        stack = self._stack
+        for line in lines:
+            kind = classify(line)
+            if kind == STEP:
+                # The innermost open section always still takes steps
+                frame = stack[-1]
+                parts.append('\n    ' + json.dumps(decode_step(line)) if frame[1]
+                             else ',\n    ' + json.dumps(decode_step(line)))
+                frame[1] = False
+                self.steps += 1
+            elif kind == HEADER:
+                depth, title = parse_header(line)
+                self._open_section(parts, depth, title)
+        return ''.join(parts)
+
+    def _open_section(self, parts, depth, title):
+        stack = self._stack
+        depth = max(0, min(depth, len(stack) - 1))
+        frame = stack[-1]
+        if frame[0]:
+            parts.append(']' if frame[1] else '\n  ]')
+            frame[0] = False
+        while len(stack) > depth + 1:
+            frame = stack.pop()
+            if frame[2]:
+                parts.append('\n  ]')
+            parts.append('}')
+        parent = stack[-1]
+        parts.append(',' if parent[2] else ',\n  "sections": [')
+        parent[2] = True
+        parts.append('\n  {"title": ' + json.dumps(title) + ', "steps": [')
+        stack.append([True, True, False])
+        self.sections += 1
+
+    def finish(self):
+        """Return the JSON text that closes the template"""
+        parts = [self._header] if self._header else []
+        self._header = None
+        stack = self._stack
+        while stack:
+            frame = stack.pop()
+            if frame[0]:
+                parts.append(']' if frame[1] else '\n  ]')
+            if frame[2]:
+                parts.append('\n  ]')
+            parts.append('}' if stack else '\n}\n')
+        return ''.join(parts)
+
+
+def parse_lines(lines):
+    """Return (steps, outline or None) for editor lines, exactly as their saved template loads"""
+    encoder = TemplateStreamEncoder('')
+    text = encoder.feed(lines) + encoder.finish()
+    return flatten_sections(json.loads(text))
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, next to the overlay
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import binary_template
+
+
+@pytest.fixture(params=[True, False], ids=['mapped', 'read'])
+def map_files(request, monkeypatch):
+    """Run a test with files memory-mapped and, as on Windows, read into memory"""
+    monkeypatch.setattr(binary_template, 'MAP_FILES', request.param)
+    return request.param
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from binary_template import BinaryStepStore, convert, open_binary_template, write_binary_template
+
+STEPS = ["plain", "", "unicode é ✓ 𝄞", "line\nbreak", "quote \" and \\", "x" * 5000]
+
+
+@pytest.mark.parametrize('title', ["Guide ✓", None, "odd length"])
+def test_round_trip(tmp_path, map_files, title):
+    path = str(tmp_path / 'guide.vtg')
+    write_binary_template(path, title, STEPS)
+    store = open_binary_template(path)
+    try:
+        assert isinstance(store, BinaryStepStore)
+        assert store.title == title
+        assert list(store) == STEPS
+        assert store[-3] == STEPS[-3]
+        assert store[1:4] == STEPS[1:4]
+        with pytest.raises(IndexError):
+            store[len(STEPS)]
+    finally:
+        store.close()
+
+
+def test_empty_template(tmp_path, map_files):
+    path = str(tmp_path / 'empty.vtg')
+    write_binary_template(path, "", [])
+    store = open_binary_template(path)
+    assert store.title is None and len(store) == 0
+    store.close()
+
+
+def test_non_string_steps_are_refused(tmp_path):
+    with pytest.raises(ValueError):
+        write_binary_template(str(tmp_path / 'bad.vtg'), "t", ["ok", 3])
+    assert not (tmp_path / 'bad.vtg').exists()
+    assert not (tmp_path / 'bad.vtg.tmp').exists()
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'magic', 'too short'])
+def test_corrupt_files_are_refused(tmp_path, map_files, damage):
+    path = tmp_path / 'guide.vtg'
+    write_binary_template(str(path), "t", STEPS)
+    data = path.read_bytes()
+    if damage == 'truncate':
+        data = data[:-1]
+    elif damage == 'magic':
+        data = b'XXXX' + data[4:]
+    else:
+        data = data[:10]
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        open_binary_template(str(path))
+
+
+def test_convert_json_to_vtg_and_back(tmp_path, map_files):
+    source = tmp_path / 'guide.json'
+    source.write_text(json.dumps({"title": "Guide", "steps": STEPS}), encoding='utf-8')
+    assert convert(str(source), str(tmp_path / 'guide.vtg')) == len(STEPS)
+    assert convert(str(tmp_path / 'guide.vtg'), str(tmp_path / 'back.json')) == len(STEPS)
+    back = json.loads((tmp_path / 'back.json').read_text(encoding='utf-8'))
+    assert back == {"title": "Guide", "steps": STEPS}
+
+
+@pytest.mark.parametrize('data', [
+    {"title": "t", "steps": ["a"], "sections": [{"title": "s", "steps": ["b"]}]},
+    {"title": "t", "steps": ["a"], "author": "me"},
+], ids=['sections', 'extra-key'])
+def test_convert_refuses_what_the_format_cannot_hold(tmp_path, data):
+    source = tmp_path / 'guide.json'
+    source.write_text(json.dumps(data), encoding='utf-8')
+    target = tmp_path / 'guide.vtg'
+    with pytest.raises(ValueError):
+        convert(str(source), str(target))
+    assert not target.exists()
+
+    assert convert(str(source), str(target), flatten=True) == len(data['steps']) + len(data.get('sections', []))
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+
+import pytest
+
+import step_store
+from file_writer import ChunkFeed, FileWriter
+from vtask_core import TrackerCore
+
+
+@pytest.fixture
+def writer():
+    writer = FileWriter(fsync=False).start()
+    yield writer
+    writer.close(timeout=5)
+
+
+def block(writer, path):
+    """Hold the writer thread on a write to path until the returned event is set"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def payload():
+        started.set()
+        release.wait(5)
+        return b'blocker'
+    writer.write(path, payload)
+    assert started.wait(5)
+    return release
+
+
+def test_payload_kinds(tmp_path, writer):
+    targets = {
+        'bytes': b'raw bytes',
+        'str': 'text é',
+        'chunks': ['a', b'b', 'c'],
+        'callable': lambda: json.dumps({"steps": [1, 2]}),
+    }
+    for name, payload in targets.items():
+        writer.write(str(tmp_path / name), payload)
+    assert writer.flush(5)
+    assert (tmp_path / 'bytes').read_bytes() == b'raw bytes'
+    assert (tmp_path / 'str').read_text(encoding='utf-8') == 'text é'
+    assert (tmp_path / 'chunks').read_bytes() == b'abc'
+    assert json.loads((tmp_path / 'callable').read_text()) == {"steps": [1, 2]}
+    assert writer.writes == 4 and writer.pending() == 0
+
+
+def test_callable_payload_runs_on_the_writer_thread(tmp_path, writer):
+    threads = []
+
+    def payload():
+        threads.append(threading.current_thread())
+        return b'x'
+    writer.write(str(tmp_path / 'out'), payload)
+    writer.flush(5)
+    assert threads and threads[0] is not threading.current_thread()
+
+
+def test_failed_write_keeps_the_old_file(tmp_path, writer):
+    path = tmp_path / 'guide.json'
+    path.write_text('old contents', encoding='utf-8')
+    results = []
+
+    def chunks():
+        yield 'new '
+        raise RuntimeError("encoder failed")
+    writer.write(str(path), chunks(), on_done=results.append)
+    writer.flush(5)
+    assert path.read_text(encoding='utf-8') == 'old contents'
+    assert not os.path.exists(str(path) + '.tmp')
+    assert isinstance(results[0], RuntimeError) and writer.last_error is results[0]
+
+
+def test_writes_queued_behind_a_busy_writer_are_coalesced(tmp_path, writer):
+    release = block(writer, str(tmp_path / 'blocker'))
+    path = str(tmp_path / 'settings.json')
+    results = []
+    for i in range(5):
+        writer.write(path, f'version {i}', on_done=results.append)
+    assert writer.pending() == 2
+    release.set()
+    writer.flush(5)
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == 'version 4'
+    # One write, but every caller hears about it
+    assert writer.coalesced == 4 and writer.writes == 2
+    assert results == [None] * 5
+
+
+def test_writes_to_different_files_keep_their_order(tmp_path, writer):
+    release = block(writer, str(tmp_path / 'blocker'))
+    order = []
+    for name in ('a', 'b', 'c'):
+        writer.write(str(tmp_path / name), name, on_done=lambda error, name=name: order.append(name))
+    release.set()
+    writer.flush(5)
+    assert order == ['a', 'b', 'c']
+
+
+def test_chunk_feed_streams_and_aborts(tmp_path, writer):
+    path = tmp_path / 'guide.json'
+    feed = ChunkFeed()
+    writer.write(str(path), feed)
+    for chunk in ('{"steps": [', '"a", ', '"b"]}'):
+        feed.put(chunk)
+    feed.close()
+    writer.flush(5)
+    assert json.loads(path.read_text()) == {"steps": ["a", "b"]}
+
+    feed = ChunkFeed()
+    results = []
+    writer.write(str(path), feed, on_done=results.append)
+    feed.put('{"steps": [')
+    feed.abort(ValueError("editor closed"))
+    writer.flush(5)
+    assert json.loads(path.read_text()) == {"steps": ["a", "b"]}
+    assert isinstance(results[0], ValueError)
+
+
+def test_dispatch_marshals_callbacks(tmp_path):
+    writer = FileWriter(fsync=False)
+    marshalled = []
+    writer.dispatch = marshalled.append
+    writer.write(str(tmp_path / 'out'), b'x', on_done=lambda error: None)
+    writer.close(timeout=5)
+    assert len(marshalled) == 1 and callable(marshalled[0])
+
+
+def test_close_flushes_outstanding_writes(tmp_path):
+    writer = FileWriter()
+    for i in range(20):
+        writer.write(str(tmp_path / f'file_{i}'), str(i))
+    assert writer.close(timeout=5)
+    assert sorted(os.listdir(tmp_path)) == sorted(f'file_{i}' for i in range(20))
+
+
+def make_core(directory):
+    names = ['keybind_config_file', 'settings_file', 'journal_file', 'snapshot_file', 'library_index_file',
+             'personal_bests_file', 'bookmarks_file']
+    paths = {name: str(directory / name) for name in names}
+    return TrackerCore(template=str(directory / 'guide.json'), **paths)
+
+
+def test_saving_a_mapped_guide_elsewhere_keeps_it_mapped(tmp_path, monkeypatch, map_files):
+    monkeypatch.setattr(step_store, 'MMAP_THRESHOLD', 0)
+    source = tmp_path / 'guide.json'
+    steps = [f"Step {i}" for i in range(1000)]
+    source.write_text(json.dumps({"title": "t", "steps": steps}), encoding='utf-8')
+    core = make_core(tmp_path)
+    core.start()
+    try:
+        core.open_template_file(str(source))
+        store = core.steps
+        assert isinstance(store, step_store.MmapStepStore)
+        release = block(core.file_writer.start(), str(tmp_path / 'blocker'))
+        core.save_template_file(str(tmp_path / 'copy.json'))
+        core.save_template_file(str(tmp_path / 'copy.vtg'))
+        assert core.steps is store
+        # Switching guides closes the core's reference before the writer has run
+        core.set_steps(["other"])
+        release.set()
+        core.flush_writes()
+        assert len(store) == 0
+        assert json.loads((tmp_path / 'copy.json').read_text(encoding='utf-8'))['steps'] == steps
+        core.open_template_file(str(tmp_path / 'copy.vtg'))
+        assert list(core.steps) == steps
+
+        # Saving over the file that backs the store decodes it first
+        core.open_template_file(str(source))
+        core.save_template_file(str(source))
+        core.flush_writes()
+        assert isinstance(core.steps, list)
+        assert json.loads(source.read_text(encoding='utf-8'))['steps'] == steps
+    finally:
+        core.close()
@@ -0,0 +1,157 @@
+import json
+import random
+
+import pytest
+
+import hot_reload
+from hot_reload import TemplateReloader
+from binary_template import write_binary_template
+from step_store import MmapStepStore
+
+
+def write_guide(path, title, steps, indent=2):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"title": title, "steps": steps}, f, indent=indent, ensure_ascii=False)
+
+
+def reload(reloader):
+    # Coarse mtime clocks may not tell two quick writes apart
+    reloader.signature = (0, 0)
+    return reloader.check()
+
+
+def apply(steps, diff):
+    if diff.steps is not None:
+        return list(diff.steps)
+    return steps[:diff.start] + diff.inserted + steps[diff.start + diff.removed:]
+
+
+def edit(rng, steps, serial):
+    """Apply one random contiguous edit; new steps get unique texts"""
+    steps = list(steps)
+    kind = rng.choice(['insert', 'delete', 'replace', 'append', 'prepend', 'move'])
+    start = rng.randint(0, len(steps))
+    length = rng.randint(1, 30)
+    fresh = [f"Edit {serial}.{i}: \"quoted\" \\ é" for i in range(length)]
+    if kind == 'insert':
+        steps[start:start] = fresh
+    elif kind == 'delete':
+        del steps[start:start + length]
+    elif kind == 'replace':
+        steps[start:start + length] = fresh[:rng.randint(0, length)]
+    elif kind == 'append':
+        steps += fresh
+    elif kind == 'prepend':
+        steps[:0] = fresh
+    else:
+        moved = steps[start:start + length]
+        del steps[start:start + length]
+        target = rng.randint(0, len(steps))
+        steps[target:target] = moved
+    return steps
+
+
+@pytest.fixture(params=['in-memory', 'mapped'])
+def large(request, monkeypatch):
+    # Tiny blocks make a small guide span many fingerprint blocks
+    monkeypatch.setattr(hot_reload, 'FINGERPRINT_BLOCK', 256)
+    if request.param == 'mapped':
+        monkeypatch.setattr(hot_reload, 'MMAP_THRESHOLD', 0)
+    return request.param == 'mapped'
+
+
+def test_unchanged_file_gives_no_diff(tmp_path):
+    path = str(tmp_path / 'guide.json')
+    write_guide(path, "t", ["a", "b"])
+    reloader = TemplateReloader(path)
+    reloader.prime()
+    assert reloader.check() is None
+    assert reload(reloader) is None
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_random_edits_reproduce_the_new_guide(tmp_path, large, seed):
+    rng = random.Random(seed)
+    path = str(tmp_path / 'guide.json')
+    steps = [f"Step {i}: go to waypoint {i}" for i in range(400)]
+    write_guide(path, "Guide", steps)
+    reloader = TemplateReloader(path)
+    reloader.prime()
+    for serial in range(25):
+        new_steps = edit(rng, steps, serial)
+        title = f"Guide {serial}" if serial % 5 == 0 else "Guide"
+        write_guide(path, title, new_steps, indent=rng.choice([2, None]))
+        diff = reload(reloader)
+        assert diff is not None
+        try:
+            assert diff.title == title
+            assert diff.old_count == len(steps) and diff.new_count == len(new_steps)
+            assert (diff.steps is not None) == large
+            if large:
+                assert isinstance(diff.steps, MmapStepStore)
+            assert apply(steps, diff) == new_steps
+            # Every step that survived keeps its place under the cursor
+            where = {text: i for i, text in enumerate(new_steps)}
+            for position, text in enumerate(steps):
+                if text in where:
+                    assert diff.map_position(position) == where[text]
+                else:
+                    assert 0 <= diff.map_position(position) < max(len(new_steps), 1)
+        finally:
+            diff.discard()
+        steps = new_steps
+
+
+def test_append_rescans_only_the_new_steps(tmp_path, monkeypatch):
+    monkeypatch.setattr(hot_reload, 'FINGERPRINT_BLOCK', 256)
+    path = str(tmp_path / 'guide.json')
+    steps = [f"Step {i}" for i in range(2000)]
+    write_guide(path, "t", steps)
+    reloader = TemplateReloader(path)
+    reloader.prime()
+    write_guide(path, "t", steps + ["new 1", "new 2"])
+
+    def no_full_scan(*args):
+        raise AssertionError("appending rescanned the whole guide")
+    monkeypatch.setattr(hot_reload, 'scan_template', no_full_scan)
+    diff = reload(reloader)
+    assert (diff.start, diff.removed, diff.inserted) == (2000, 0, ["new 1", "new 2"])
+
+
+def test_half_written_file_keeps_the_old_state(tmp_path):
+    path = str(tmp_path / 'guide.json')
+    write_guide(path, "t", ["a", "b", "c"])
+    reloader = TemplateReloader(path)
+    reloader.prime()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"title": "t", "steps": ["a", "b')
+    with pytest.raises(ValueError):
+        reload(reloader)
+    write_guide(path, "t", ["a", "b", "c", "d"])
+    diff = reload(reloader)
+    assert apply(["a", "b", "c"], diff) == ["a", "b", "c", "d"]
+
+
+def test_sections_are_rebuilt(tmp_path):
+    path = str(tmp_path / 'guide.json')
+    write_guide(path, "t", ["a"])
+    reloader = TemplateReloader(path)
+    reloader.prime()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"title": "t", "steps": ["a"], "sections": [{"title": "Act", "steps": ["b", "c"]}]}, f)
+    diff = reload(reloader)
+    assert apply(["a"], diff) == ["a", "b", "c"]
+    assert diff.outline is not None and diff.outline.titles == ["Act"]
+
+
+def test_binary_guides_are_swapped_whole(tmp_path, map_files):
+    path = str(tmp_path / 'guide.vtg')
+    write_binary_template(path, "t", ["a", "b"])
+    reloader = TemplateReloader(path)
+    reloader.prime()
+    write_binary_template(path, "t", ["a", "b", "c"])
+    diff = reload(reloader)
+    try:
+        assert (diff.old_count, list(diff.steps)) == (2, ["a", "b", "c"])
+    finally:
+        diff.discard()
@@ -0,0 +1,120 @@
+import json
+import random
+
+import pytest
+
+from navigation_history import Bookmarks, NavigationHistory
+
+
+class ListHistory:
+    """Reference model: a plain list trimmed to capacity from the front"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.positions = []
+        self.head = -1
+
+    def record(self, previous, step):
+        if self.head < 0 or self.positions[self.head] != previous:
+            del self.positions[self.head + 1:]
+            self.positions.append(previous)
+            self.head = len(self.positions) - 1
+        del self.positions[self.head + 1:]
+        self.positions.append(step)
+        self.head = len(self.positions) - 1
+        excess = len(self.positions) - self.capacity
+        if excess > 0:
+            del self.positions[:excess]
+            self.head -= excess
+
+    def undo(self):
+        if self.head <= 0:
+            return None
+        self.head -= 1
+        return self.positions[self.head]
+
+    def redo(self):
+        if self.head >= len(self.positions) - 1:
+            return None
+        self.head += 1
+        return self.positions[self.head]
+
+
+def test_undo_and_redo_walk_the_moves():
+    history = NavigationHistory(8)
+    assert history.undo() is None and history.redo() is None
+    for previous, step in [(0, 1), (1, 2), (2, 5)]:
+        history.record(previous, step)
+    assert [history.undo(), history.undo(), history.undo(), history.undo()] == [2, 1, 0, None]
+    assert [history.redo(), history.redo(), history.redo(), history.redo()] == [1, 2, 5, None]
+
+
+def test_a_new_move_drops_the_redo_tail():
+    history = NavigationHistory(8)
+    for previous, step in [(0, 1), (1, 2), (2, 3)]:
+        history.record(previous, step)
+    assert history.undo() == 2
+    history.record(2, 9)
+    assert history.redo() is None
+    assert [history.undo(), history.undo(), history.undo()] == [2, 1, 0]
+
+
+def test_a_jump_without_a_recorded_move_keeps_both_positions():
+    history = NavigationHistory(8)
+    history.record(0, 1)
+    # The guide was reloaded and the position moved to 4 behind the history's back
+    history.record(4, 6)
+    assert [history.undo(), history.undo(), history.undo()] == [4, 1, 0]
+
+
+def test_ring_wraps_and_forgets_the_oldest():
+    history = NavigationHistory(4)
+    for step in range(1, 11):
+        history.record(step - 1, step)
+    assert len(history) == 4
+    assert [history.undo() for _ in range(4)] == [9, 8, 7, None]
+    assert [history.redo() for _ in range(4)] == [8, 9, 10, None]
+    history.clear()
+    assert len(history) == 0 and history.undo() is None
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_a_list_under_random_use(seed):
+    rng = random.Random(seed)
+    capacity = rng.choice([1, 2, 5, 16])
+    history = NavigationHistory(capacity)
+    model = ListHistory(capacity)
+    current = 0
+    for _ in range(3000):
+        action = rng.random()
+        if action < 0.5:
+            # Mostly moves from the current step, sometimes from somewhere unrecorded
+            previous = current if rng.random() < 0.9 else rng.randrange(50)
+            current = rng.randrange(50)
+            history.record(previous, current)
+            model.record(previous, current)
+        elif action < 0.75:
+            result = history.undo()
+            assert result == model.undo()
+            current = current if result is None else result
+        else:
+            result = history.redo()
+            assert result == model.redo()
+            current = current if result is None else result
+        assert len(history) == len(model.positions)
+
+
+def test_bookmarks_round_trip(tmp_path):
+    path = str(tmp_path / 'bookmarks.json')
+    bookmarks = Bookmarks(path).load()
+    bookmarks.set('guide.json', '1', 12)
+    bookmarks.set('guide.json', '1', 14)
+    bookmarks.set('other.json', 'boss', 3)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(bookmarks.dumps())
+
+    loaded = Bookmarks(path).load()
+    assert loaded.get('guide.json', '1') == 14
+    assert loaded.names('other.json') == {'boss': 3}
+    assert loaded.get('guide.json', 'missing') is None
+    assert json.loads(loaded.dumps()) == json.loads(bookmarks.dumps())
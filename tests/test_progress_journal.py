@@ -0,0 +1,82 @@
+import json
+import os
+
+from progress_journal import ProgressJournal
+
+
+def read_records(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_positions_resume_after_restart(tmp_path):
+    path = str(tmp_path / 'progress.journal')
+    journal = ProgressJournal(path, flush_interval=0)
+    journal.load()
+    journal.start()
+    for step in range(50):
+        journal.record('guide.json', step)
+    journal.record(str(tmp_path / 'other.json'), 7)
+    journal.close()
+
+    resumed = ProgressJournal(path)
+    resumed.load()
+    # Relative and absolute spellings of a path share one record
+    assert resumed.get(os.path.abspath('guide.json')) == 49
+    assert resumed.get(str(tmp_path / 'other.json')) == 7
+    assert resumed.get('missing.json', 3) == 3
+
+
+def test_unchanged_position_is_not_rewritten(tmp_path):
+    path = str(tmp_path / 'progress.journal')
+    journal = ProgressJournal(path)
+    journal.load()
+    journal.record('guide.json', 4)
+    journal.record('guide.json', 4)
+    journal.close()
+    assert len(read_records(path)) == 1
+
+
+def test_load_compacts_a_grown_journal(tmp_path):
+    path = str(tmp_path / 'progress.journal')
+    key = ProgressJournal.template_key('guide.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        for step in range(20):
+            f.write(json.dumps([key, step]) + '\n')
+            f.write(json.dumps(['other', step * 2]) + '\n')
+
+    journal = ProgressJournal(path, compact_ratio=4, compact_min_records=10)
+    journal.load()
+    assert sorted(read_records(path)) == sorted([[key, 19], ['other', 38]])
+    assert journal.get('guide.json') == 19
+
+
+def test_small_journal_is_not_compacted(tmp_path):
+    path = str(tmp_path / 'progress.journal')
+    with open(path, 'w', encoding='utf-8') as f:
+        for step in range(5):
+            f.write(json.dumps(['guide', step]) + '\n')
+    ProgressJournal(path, compact_min_records=10).load()
+    assert len(read_records(path)) == 5
+
+
+def test_torn_tail_is_ignored_and_terminated(tmp_path):
+    path = str(tmp_path / 'progress.journal')
+    key = ProgressJournal.template_key('guide.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps([key, 3]) + '\n')
+        f.write('["torn", 1')
+
+    journal = ProgressJournal(path)
+    journal.load()
+    assert journal.get('guide.json') == 3
+    assert 'torn' not in journal.positions
+    journal.record('guide.json', 5)
+    journal.close()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines[-1] == json.dumps([key, 5])
+    resumed = ProgressJournal(path)
+    resumed.load()
+    assert resumed.get('guide.json') == 5
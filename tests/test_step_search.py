@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+import step_search
+from step_search import StepIndex
+from template_library import tokenize
+
+
+def make_steps(count, seed=7):
+    rng = random.Random(seed)
+    words = ['waypoint', 'wolf', 'woods', 'chest', 'cheese', 'loot', 'farbane', 'castle'] + \
+            [f'w{i}' for i in range(150)]
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(0, 5))) for _ in range(count)]
+
+
+def matches(step, query):
+    """Reference matcher: every term is a token, the last one a prefix while still typing"""
+    terms = tokenize(query)
+    tokens = set(tokenize(step))
+    if not terms:
+        return False
+    prefix_last = not query[-1:].isspace()
+    for i, term in enumerate(terms):
+        if prefix_last and i == len(terms) - 1:
+            if not any(token.startswith(term) for token in tokens):
+                return False
+        elif term not in tokens:
+            return False
+    return True
+
+
+QUERIES = ['waypoint', 'waypoint ', 'wo', 'w', 'w1', 'che', 'chest loot', 'loot w', 'wolf ', 'w12 w', 'castle farbane wo',
+           'missing', 'chest missing']
+
+
+@pytest.fixture(params=[64, 2], ids=['merged-prefixes', 'scanned-prefixes'])
+def index(request, monkeypatch):
+    # A low limit sends even short prefixes through _PrefixScan
+    monkeypatch.setattr(step_search, 'MAX_PREFIX_LISTS', request.param)
+    steps = make_steps(3000)
+    return StepIndex(steps).start()
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_find_visits_every_match_in_order(index, query):
+    expected = [n for n, step in enumerate(index.steps) if matches(step, query)]
+    for current in (-1, 0, 17, 1500, len(index.steps) - 1):
+        after = [n for n in expected if n > current]
+        before = [n for n in expected if n < current]
+        assert index.find(query, current) == (after or expected or [None])[0]
+        assert index.find(query, current, wrap=False) == (after or [None])[0]
+        if current >= 0:
+            assert index.find(query, current, forward=False) == (before or expected or [None])[-1]
+            assert index.find(query, current, forward=False, wrap=False) == (before or [None])[-1]
+
+
+def check_count(index, query, expected, current=None):
+    """Counts are exact, or stop at MATCH_COUNT_LIMIT when there are at least that many matches"""
+    total, ordinal = index.count(query, current)
+    limit = step_search.MATCH_COUNT_LIMIT
+    assert total == len(expected) or total == limit <= len(expected)
+    rank = expected.index(current) + 1 if current in expected else None
+    assert ordinal == (rank if rank is not None and rank <= total else None)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_count_and_ordinal(index, query):
+    expected = [n for n, step in enumerate(index.steps) if matches(step, query)]
+    for current in (None, 5, expected[0] if expected else 0, expected[len(expected) // 2] if expected else 0):
+        check_count(index, query, expected, current)
+    if len(tokenize(query)) == 1 and query[-1:].isspace():
+        # A single exact token is counted straight from its posting list
+        assert index.count(query)[0] == len(expected)
+
+
+def test_typing_a_prefix_letter_by_letter(index):
+    # Each keystroke narrows the prefix; cached unions of the shorter ones must not leak through
+    for query in ('w', 'w1', 'w12', 'w12 ', 'w12 w', 'w12 wo', 'w12 wol'):
+        expected = [n for n, step in enumerate(index.steps) if matches(step, query)]
+        assert index.find(query, -1) == (expected or [None])[0]
+        check_count(index, query, expected)
+
+
+def test_empty_query_and_empty_guide():
+    index = StepIndex([]).start()
+    assert index.find('loot', 0) is None
+    assert index.count('loot') == (0, None)
+    index = StepIndex(['loot the chest']).start()
+    assert index.find('', 0) is None
+    assert index.find('loot', 0) == 0
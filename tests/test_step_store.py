@@ -0,0 +1,102 @@
+import json
+import os
+
+import pytest
+
+import step_store
+from step_store import (INDEX_SUFFIX, MmapStepStore, close_steps, load_template, open_mmap_store,
+                        scan_template, snapshot_steps)
+
+
+STEPS = ["plain", "quote \" and backslash \\", "unicode é ✓ 𝄞", "", "line\nbreak", "tab\tend"]
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    return str(path)
+
+
+def test_mapped_store_matches_json_load(tmp_path, map_files):
+    path = write_json(tmp_path / 'guide.json', {"title": "Guide \"1\"", "extra": [1, {"a": "]"}], "steps": STEPS})
+    store = open_mmap_store(path)
+    try:
+        assert isinstance(store, MmapStepStore)
+        assert store.title == 'Guide "1"'
+        assert list(store) == STEPS
+        assert store[-1] == STEPS[-1]
+        assert store[1:3] == STEPS[1:3]
+        with pytest.raises(IndexError):
+            store[len(STEPS)]
+    finally:
+        store.close()
+
+
+def test_sections_are_flattened_after_top_level_steps(tmp_path):
+    data = {"title": "t", "sections": [
+        {"title": "Act 1", "steps": ["a1"], "sections": [{"title": "Part", "steps": ["p1", "p2"]}]},
+        {"steps": ["a2"], "title": "Act 2"}], "steps": ["intro"]}
+    with open(write_json(tmp_path / 'guide.json', data), 'rb') as f:
+        buf = f.read()
+    outline = []
+    title_span, offsets = scan_template(buf, outline)
+    steps = [step_store.decode_string(buf[offsets[i]:offsets[i + 1]]) for i in range(0, len(offsets), 2)]
+    assert steps == ["intro", "a1", "p1", "p2", "a2"]
+    assert outline == [["Act 1", 1, 4, 0, -1], ["Part", 2, 4, 1, 0], ["Act 2", 4, 5, 0, -1]]
+
+
+def test_sidecar_index_is_reused_and_rebuilt_when_stale(tmp_path, monkeypatch, map_files):
+    path = write_json(tmp_path / 'guide.json', {"title": "t", "steps": STEPS})
+    open_mmap_store(path).close()
+    assert os.path.exists(path + INDEX_SUFFIX)
+
+    def no_scan(*args):
+        raise AssertionError("template rescanned despite a valid index")
+    monkeypatch.setattr(step_store, 'scan_template', no_scan)
+    store = open_mmap_store(path)
+    assert store.title == "t" and list(store) == STEPS
+    store.close()
+    monkeypatch.setattr(step_store, 'scan_template', scan_template)
+
+    write_json(path, {"title": "t", "steps": STEPS + ["added"]})
+    store = open_mmap_store(path)
+    try:
+        assert list(store) == STEPS + ["added"]
+    finally:
+        store.close()
+
+
+def test_cache_index_false_writes_no_sidecar(tmp_path):
+    path = write_json(tmp_path / 'guide.json', {"title": "t", "steps": STEPS})
+    store = open_mmap_store(path, cache_index=False)
+    store.close()
+    assert not os.path.exists(path + INDEX_SUFFIX)
+
+
+def test_load_template_maps_only_large_guides(tmp_path, monkeypatch):
+    path = write_json(tmp_path / 'guide.json', {"title": "t", "steps": STEPS})
+    title, steps, outline = load_template(path)
+    assert isinstance(steps, list) and steps == STEPS and outline is None
+
+    monkeypatch.setattr(step_store, 'MMAP_THRESHOLD', 0)
+    title, steps, outline = load_template(path)
+    try:
+        assert isinstance(steps, MmapStepStore) and list(steps) == STEPS
+    finally:
+        close_steps(steps)
+
+
+def test_snapshot_keeps_store_open_until_every_holder_closes(tmp_path, map_files):
+    path = write_json(tmp_path / 'guide.json', {"title": "t", "steps": STEPS})
+    store = open_mmap_store(path)
+    snapshot = snapshot_steps(store)
+    assert snapshot is store
+    store.close()
+    assert list(snapshot) == STEPS
+    close_steps(snapshot)
+    assert len(store) == 0
+
+    steps = list(STEPS)
+    copy = snapshot_steps(steps)
+    steps[0] = "edited"
+    assert copy[0] == "plain"
@@ -1,44 +1,711 @@
+import time
+_PROCESS_START = time.perf_counter()
+
+import argparse
+import importlib
+import itertools
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, simpledialog
-import json
 import os
-from pynput import keyboard
+import sys
 import threading
-import time
+from event_bus import EventBus
+from render_cache import StepRenderer
+from instrumentation import Instrumentation
+from keybind_index import KeybindConflict, MODIFIER_BITS
+from vtask_core import TrackerCore, template_filename
+from panel_dispatch import PanelDispatcher
+from key_hook import KeyHook
+from file_writer import ChunkFeed
+from template_text import EditorLines, line_error
+from split_timer import next_tick_delay, IDLE, RUNNING
+from step_search import MATCH_COUNT_LIMIT
+from repeat_engine import DEFAULT_REPEAT_SETTINGS, SINGLE_SHOT
+from idle_stats import PowerSample, format_power_report
+
+# Minimum interval between window moves while dragging (one 60 Hz frame)
+FRAME_INTERVAL_MS = 16
+
+# Pixel width step text is wrapped to
+STEP_WRAP_WIDTH = 380
+
+# How often the performance HUD is refreshed while visible
+HUD_REFRESH_MS = 500
+
+# Time from process start to the first painted frame we aim for
+STARTUP_TARGET_MS = 250
+
+# Size of an extra guide panel window
+PANEL_GEOMETRY = "400x150"
+
+# Refresh interval of the split timer label (display rate)
+TIMER_REFRESH_INTERVAL = 1 / 60
+
+# Lines the template editor loads or saves per event loop tick
+EDITOR_CHUNK_LINES = 2000
+
+# Pause in typing before the search box recounts matches (finding the next match is immediate)
+SEARCH_STATUS_DELAY_MS = 150
+
+# Seconds without interaction before the overlay goes idle (overlay_settings "idle_timeout", 0 = never)
+DEFAULT_IDLE_TIMEOUT = 60
+
+# Events the overlay posts to itself; they neither count as interaction nor wake it from idle
+BACKGROUND_ACTIONS = frozenset({'save_completed', 'template_reloaded', 'control_commands', 'library_scanned'})
+
+
+class LazyModule:
+    """Module proxy that imports the module on first attribute access"""
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+    
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+# Dialog modules are only needed once the user clicks something
+filedialog = LazyModule('tkinter.filedialog')
+messagebox = LazyModule('tkinter.messagebox')
+
+# Imports asyncio, so it is only loaded when a control socket or port is configured
+control_server = LazyModule('control_server')
+
+# pynput is imported off the UI thread after the first frame (see load_keyboard_module)
+keyboard = None
+_keyboard_lock = threading.Lock()
+
+# Left/right variants of each modifier map onto the same bit
+MODIFIER_KEYS = {}
+
+
+def load_keyboard_module():
+    """Import pynput's keyboard module and build the modifier table (idempotent)"""
+    global keyboard
+    with _keyboard_lock:
+        if keyboard is None:
+            from pynput import keyboard as pynput_keyboard
+            for name in ('shift', 'shift_l', 'shift_r', 'ctrl', 'ctrl_l', 'ctrl_r', 'alt', 'alt_l', 'alt_r', 'alt_gr'):
+                key = getattr(pynput_keyboard.Key, name, None)
+                if key is not None:
+                    MODIFIER_KEYS[key] = MODIFIER_BITS[name.split('_')[0]]
+            keyboard = pynput_keyboard
+    return keyboard
+
+
+class StartupProfile:
+    """Named startup milestones measured from process start"""
+    
+    def __init__(self, start=_PROCESS_START):
+        self.start = start
+        self.marks = []
+    
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter()))
+    
+    def elapsed_ms(self, label):
+        for name, timestamp in self.marks:
+            if name == label:
+                return (timestamp - self.start) * 1000
+        return None
+    
+    def report(self):
+        """Format the milestones as a table with the first-paint verdict"""
+        lines = ["Startup profile (ms since process start):"]
+        previous = self.start
+        for label, timestamp in sorted(self.marks, key=lambda mark: mark[1]):
+            lines.append(f"  {label:<20}{(timestamp - self.start) * 1000:>9.1f}  (+{(timestamp - previous) * 1000:.1f})")
+            previous = timestamp
+        first_paint = self.elapsed_ms('first_paint')
+        if first_paint is not None:
+            verdict = "OK" if first_paint <= STARTUP_TARGET_MS else "OVER TARGET"
+            lines.append(f"First paint {first_paint:.1f} ms, target {STARTUP_TARGET_MS} ms: {verdict}")
+        return '\n'.join(lines)
+
+
+class WindowDrag:
+    """Mouse drag of a toplevel window, moved at most once per frame
+
+    Motion events only record the latest target; the window is moved from an
+    after() callback no more often than FRAME_INTERVAL_MS. on_moved(x, y)
+    runs on release, and only if the window ended up somewhere new.
+    """
+    
+    def __init__(self, window, on_moved):
+        self.window = window
+        self.on_moved = on_moved
+        self.start = None
+        self.target = None
+        self.position = None
+        self.after_id = None
+        self.last_move = 0.0
+    
+    def begin(self, event):
+        """Start a drag at the pointer"""
+        self.start = (event.x_root, event.y_root, self.window.winfo_x(), self.window.winfo_y())
+        self.position = None
+    
+    def motion(self, event):
+        """Remember the latest position; move at most once per frame"""
+        if self.start is None:
+            return
+        start_x, start_y, window_x, window_y = self.start
+        self.target = (window_x + event.x_root - start_x, window_y + event.y_root - start_y)
+        if self.after_id is None:
+            elapsed_ms = (time.perf_counter() - self.last_move) * 1000
+            if elapsed_ms >= FRAME_INTERVAL_MS:
+                self.after_id = self.window.after_idle(self.apply)
+            else:
+                self.after_id = self.window.after(int(FRAME_INTERVAL_MS - elapsed_ms) + 1, self.apply)
+    
+    def apply(self):
+        """Move the window to the latest drag position"""
+        self.after_id = None
+        if self.target is not None:
+            new_x, new_y = self.target
+            self.target = None
+            self.window.geometry(f"+{new_x}+{new_y}")
+            self.last_move = time.perf_counter()
+            self.position = (new_x, new_y)
+    
+    def end(self, event):
+        """Finish the drag, reporting the new position if the window moved"""
+        if self.start is None:
+            return
+        origin = self.start[2:]
+        self.start = None
+        if self.after_id is not None:
+            self.window.after_cancel(self.after_id)
+            self.after_id = None
+        self.apply()
+        if self.position is not None and self.position != origin:
+            self.on_moved(*self.position)
+
+
+class GuidePanel:
+    """Extra guide window with its own template, position and keybinds
+    
+    Panels are listed under "panels" in overlay_settings.json. They share the
+    overlay's keyboard hook, event bus and dispatch index; actions bound in a
+    panel's keybinds are routed here by VTaskTracker.dispatch_action.
+    """
+    
+    def __init__(self, tracker, number, core, config):
+        self.tracker = tracker
+        self.number = number
+        self.core = core
+        self.config = config
+        self.is_minimized = False
+        self._defer_render = False
+        self._render_pending = False
+        self.actions = {
+            'next_step': lambda arg, count: self.next_step(count),
+            'previous_step': lambda arg, count: self.previous_step(count),
+            'jump_to_step': lambda arg, count: self.jump_to_step(arg),
+            'next_section': lambda arg, count: self.next_section(count),
+            'previous_section': lambda arg, count: self.previous_section(count),
+            'minimize_toggle': lambda arg, count: self.toggle_minimize(),
+            'template_reloaded': lambda arg, count: self.apply_template_reload(arg),
+        }
+        
+        self.window = window = tk.Toplevel(tracker.root)
+        window.title(config.get('name') or "VTask Tracker")
+        window.configure(bg='black')
+        window.attributes('-topmost', True)
+        window.attributes('-alpha', 0.9)
+        window.overrideredirect(True)
+        self.drag = WindowDrag(window, self.drag_moved)
+        
+        # Restore the last dragged position, or stack below the main window
+        position = config.get('position')
+        if not position:
+            position = [tracker.root.winfo_x(), tracker.root.winfo_y() + 260 + 160 * (number - 1)]
+        window.geometry(f"{PANEL_GEOMETRY}+{position[0]}+{position[1]}")
+        
+        frame = tk.Frame(window, bg='black', padx=10, pady=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        title_label = tk.Label(
+            frame,
+            text=config.get('name') or os.path.basename(core.current_template),
+            font=('Arial', 10, 'bold'),
+            fg='white',
+            bg='black'
+        )
+        title_label.pack()
+        
+        self.step_counter = tk.Label(frame, text="Step 0 of 0", font=('Arial', 10), fg='yellow', bg='black')
+        self.step_counter.pack()
+        
+        self.step_display = tk.Label(
+            frame,
+            text="No steps loaded",
+            font=('Arial', 11),
+            fg='white',
+            bg='black',
+            wraplength=STEP_WRAP_WIDTH,
+            justify=tk.LEFT
+        )
+        self.step_display.pack(pady=5, fill=tk.BOTH, expand=True)
+        
+        self.renderer = StepRenderer(window, self.step_counter, self.step_display, STEP_WRAP_WIDTH)
+        
+        for widget in (frame, title_label):
+            widget.bind("<Button-1>", self.start_drag)
+            widget.bind("<B1-Motion>", self.drag_window)
+            widget.bind("<ButtonRelease-1>", self.stop_drag)
+    
+    def dispatch_action(self, action, arg=None, count=1):
+        """Apply a queued action to this panel; actions a panel doesn't support are ignored"""
+        handler = self.actions.get(action)
+        if handler is not None:
+            handler(arg, count)
+    
+    def load_guide(self):
+        """Load the panel's template"""
+        self.renderer.cancel_prefetch()
+        try:
+            if self.core.load_guide():
+                self.update_display()
+            else:
+                self.renderer.show(None, f"Template not found: {self.core.current_template}")
+        except Exception as e:
+            self.renderer.show(None, f"Error loading guide: {str(e)}")
+    
+    def next_step(self, count=1):
+        """Move to the next step"""
+        if self.core.next_step(count):
+            self.update_display()
+    
+    def previous_step(self, count=1):
+        """Move to the previous step"""
+        if self.core.previous_step(count):
+            self.update_display()
+    
+    def jump_to_step(self, step_number):
+        """Jump to a 1-based step number, clamped to the guide"""
+        if self.core.jump_to_step(step_number):
+            self.update_display()
+    
+    def next_section(self, count=1):
+        """Move to the start of the next section"""
+        if self.core.next_section(count):
+            self.update_display()
+    
+    def previous_section(self, count=1):
+        """Move to the start of this section, or the previous one"""
+        if self.core.previous_section(count):
+            self.update_display()
+    
+    def apply_template_reload(self, diff):
+        """Apply an edit of the panel's template made outside the overlay"""
+        self.renderer.cancel_prefetch()
+        if self.core.apply_template_diff(diff):
+            self.update_display()
+    
+    def toggle_minimize(self):
+        """Hide or show this panel"""
+        if self.is_minimized:
+            self.window.deiconify()
+            self.is_minimized = False
+        else:
+            self.window.withdraw()
+            self.is_minimized = True
+    
+    def update_display(self):
+        """Update the step display"""
+        if self._defer_render:
+            self._render_pending = True
+            return
+        if self.core.steps:
+            self.renderer.show(self.core.step_counter_text(), self.core.current_step_text())
+            self.renderer.prefetch(self.core.steps, self.core.current_step)
+        else:
+            self.renderer.show(self.core.step_counter_text(), "No steps loaded")
+    
+    def begin_batch(self):
+        """Defer rendering while a batch of queued events is applied"""
+        self._defer_render = True
+        self._render_pending = False
+    
+    def end_batch(self):
+        """Render once for the whole batch"""
+        self._defer_render = False
+        if self._render_pending:
+            self._render_pending = False
+            self.update_display()
+    
+    def start_drag(self, event):
+        """Start dragging the panel"""
+        self.drag.begin(event)
+    
+    def drag_window(self, event):
+        """Follow the pointer, at most once per frame"""
+        self.drag.motion(event)
+    
+    def stop_drag(self, event):
+        """Stop dragging; a moved panel's position is saved"""
+        self.drag.end(event)
+    
+    def drag_moved(self, x, y):
+        """Remember where the panel was left"""
+        self.config['position'] = [x, y]
+        self.core.save_overlay_settings()
+    
+    def close(self):
+        """Stop watching the template and release the steps"""
+        self.renderer.cancel_prefetch()
+        self.core.close()
+
+
+class TemplateEditor:
+    """Editor window for writing a new guide or editing an existing one
+    
+    One line per step; '# Title' lines start a section ('## Title' a
+    sub-section). Every insert/delete on the Text widget goes through a proxy
+    of its Tcl command, so only the lines an edit touched are re-validated and
+    the step count stays current on guides with hundreds of thousands of
+    steps. Opening and saving move EDITOR_CHUNK_LINES lines per event loop
+    tick, and the save is streamed to the background writer as it is read.
+    """
+    
+    def __init__(self, tracker, filename=None):
+        self.tracker = tracker
+        self.filename = filename
+        self.model = EditorLines()
+        self.feed = None
+        self.busy = None
+        self._internal = False
+        self._status_after_id = None
+        self._chunk_after_id = None
+        
+        self.window = window = tk.Toplevel(tracker.root)
+        window.title("Edit Template" if filename else "Create New Template")
+        window.geometry("560x480")
+        window.configure(bg='black')
+        window.attributes('-topmost', True)
+        window.transient(tracker.root)
+        
+        # Template name input
+        name_frame = tk.Frame(window, bg='black')
+        name_frame.pack(pady=10)
+        
+        tk.Label(name_frame, text="Template Name:", font=('Arial', 10), fg='white', bg='black').pack()
+        self.name_entry = tk.Entry(name_frame, font=('Arial', 10), width=30)
+        self.name_entry.pack(pady=5)
+        
+        # Steps input
+        steps_frame = tk.Frame(window, bg='black')
+        steps_frame.pack(pady=5, fill=tk.BOTH, expand=True)
+        
+        tk.Label(steps_frame, text="Steps (one per line, '# Title' starts a section):",
+                 font=('Arial', 10), fg='white', bg='black').pack()
+        
+        # Text widget with scrollbar for steps
+        text_frame = tk.Frame(steps_frame, bg='black')
+        text_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        self.text = tk.Text(text_frame, font=('Arial', 9), height=15, width=60, bg='darkgray', fg='black', wrap=tk.NONE)
+        scrollbar = tk.Scrollbar(text_frame, orient=tk.VERTICAL, command=self.text.yview)
+        self.text.configure(yscrollcommand=scrollbar.set)
+        
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.status_label = tk.Label(window, text="", font=('Arial', 8), fg='gray', bg='black', anchor='w')
+        self.status_label.pack(fill=tk.X, padx=10)
+        
+        # Route the widget's Tcl command through edit tracking
+        self._widget = self.text._w
+        self._original = self._widget + '_original'
+        window.tk.call('rename', self._widget, self._original)
+        window.tk.createcommand(self._widget, self.on_text_command)
+        
+        # Buttons
+        button_frame = tk.Frame(window, bg='black')
+        button_frame.pack(pady=10)
+        
+        tk.Button(button_frame, text="Save Template", command=self.save,
+                  bg='darkgreen', fg='white', font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Cancel", command=self.close,
+                  bg='darkred', fg='white', font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        if filename:
+            self.load(filename)
+        else:
+            self.update_status()
+        self.name_entry.focus_force()
+    
+    # Edit tracking
+    
+    def _call(self, *args):
+        return self.window.tk.call(self._original, *args)
+    
+    def _line(self, index):
+        return int(str(self._call('index', index)).split('.')[0])
+    
+    def on_text_command(self, *args):
+        """Pass a widget command through, updating the line model for edits"""
+        operation = args[0] if args else None
+        if operation not in ('insert', 'delete', 'replace'):
+            return self._call(*args)
+        if self.busy is not None and not self._internal:
+            # No typing while the guide is being loaded or saved
+            return ''
+        lines = self._line('end-1c')
+        if operation == 'insert':
+            first = last = min(self._line(args[1]), lines)
+        elif len(args) > 3 and operation == 'delete':
+            # Multi-range deletes are rare enough to recheck every line
+            first, last = 1, lines
+        else:
+            # A one-index delete removes a single character, possibly a newline
+            first = min(self._line(args[1]), lines)
+            last = max(min(self._line(args[2] if len(args) > 2 else args[1] + ' +1c'), lines), first)
+        result = self._call(*args)
+        added = last - first + 1 + self._line('end-1c') - lines
+        changed = str(self._call('get', f"{first}.0", f"{first + added - 1}.end")).split('\n')
+        self.model.replace(first - 1, last - first + 1, changed)
+        self.schedule_status()
+        return result
+    
+    def schedule_status(self):
+        """Refresh the status line once the current burst of edits is done"""
+        if self._status_after_id is None:
+            self._status_after_id = self.window.after_idle(self.update_status)
+    
+    def update_status(self):
+        """Show step and section counts and the first problem, if any"""
+        self._status_after_id = None
+        model = self.model
+        text = f"{model.step_count:,} steps"
+        if model.section_count:
+            text += f" | {model.section_count:,} sections"
+        line = model.first_error()
+        if line is not None:
+            text += f" | {model.error_count:,} invalid lines, first on line {line + 1}"
+        if self.busy is not None:
+            text += f" | {self.busy}"
+        self.status_label.config(text=text)
+    
+    # Chunked load and save
+    
+    def load(self, filename):
+        """Fill the editor from a template file a chunk of lines at a time"""
+        try:
+            title, total, lines = self.tracker.core.template_lines(filename)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open template: {str(e)}")
+            return
+        self.name_entry.insert(0, title or os.path.splitext(os.path.basename(filename))[0])
+        separator = ''
+        
+        def insert_chunk():
+            nonlocal separator
+            self._chunk_after_id = None
+            chunk = list(itertools.islice(lines, EDITOR_CHUNK_LINES))
+            if chunk:
+                self._internal = True
+                try:
+                    self.text.insert('end-1c', separator + '\n'.join(chunk))
+                    separator = '\n'
+                finally:
+                    self._internal = False
+                self.busy = f"loading {min(self.model.step_count / max(total, 1), 1):.0%}"
+                self.schedule_status()
+                self._chunk_after_id = self.window.after(1, insert_chunk)
+            else:
+                self.busy = None
+                self.text.mark_set('insert', '1.0')
+                self.update_status()
+        
+        self.busy = "loading"
+        insert_chunk()
+    
+    def save(self):
+        """Validate and stream the editor's lines to disk"""
+        if self.busy is not None:
+            return
+        template_name = self.name_entry.get().strip()
+        if not template_name:
+            messagebox.showerror("Error", "Please enter a template name")
+            return
+        line = self.model.first_error()
+        if line is not None:
+            text = str(self._call('get', f"{line + 1}.0", f"{line + 1}.end"))
+            messagebox.showerror("Error", f"Line {line + 1}: {line_error(text)}")
+            self.text.see(f"{line + 1}.0")
+            self.text.mark_set('insert', f"{line + 1}.0")
+            return
+        if not self.model.step_count:
+            messagebox.showerror("Error", "Please enter at least one step")
+            return
+        
+        filename = self.filename or template_filename(template_name)
+        feed = self.feed = ChunkFeed()
+        
+        def saved(error):
+            if error is not None:
+                self.busy = None
+                if self.window.winfo_exists():
+                    self.update_status()
+                    messagebox.showerror("Error", f"Failed to save template: {error}")
+                return
+            self.close()
+            messagebox.showinfo("Success", f"Template '{template_name}' saved as {os.path.basename(filename)}")
+            tracker = self.tracker
+            editing_current = os.path.abspath(filename) == os.path.abspath(tracker.current_template)
+            # Hot reload picks up a save of the watched guide by itself
+            if not editing_current or tracker.core.template_watcher is None:
+                tracker.current_template = filename
+                tracker.load_guide()
+        
+        try:
+            self.tracker.core.save_template_lines(filename, template_name, feed, on_done=saved)
+        except Exception as e:
+            self.feed = None
+            messagebox.showerror("Error", f"Failed to save template: {str(e)}")
+            return
+        total = len(self.model)
+        start = 1
+        
+        def feed_chunk():
+            nonlocal start
+            self._chunk_after_id = None
+            end = min(start + EDITOR_CHUNK_LINES, total + 1)
+            feed.put(str(self._call('get', f"{start}.0", f"{end - 1}.end")).split('\n'))
+            start = end
+            if start <= total:
+                self.busy = f"saving {(start - 1) / total:.0%}"
+                self.schedule_status()
+                self._chunk_after_id = self.window.after(1, feed_chunk)
+            else:
+                # Everything is handed over; closing the window no longer cancels the save
+                feed.close()
+                self.feed = None
+                self.busy = "writing"
+                self.schedule_status()
+        
+        self.busy = "saving"
+        feed_chunk()
+    
+    def close(self):
+        """Close the editor, abandoning a save that is still being read"""
+        if self._chunk_after_id is not None:
+            self.window.after_cancel(self._chunk_after_id)
+            self._chunk_after_id = None
+        if self._status_after_id is not None:
+            self.window.after_cancel(self._status_after_id)
+            self._status_after_id = None
+        if self.feed is not None:
+            self.feed.abort(RuntimeError("editor closed before the save finished"))
+            self.feed = None
+        if self.tracker.template_editor is self:
+            self.tracker.template_editor = None
+        if self.window.winfo_exists():
+            self.window.destroy()
+            self.window.tk.deletecommand(self._widget)
+
 
 class VTaskTracker:
-    def __init__(self):
+    def __init__(self, profile_startup=False, measure_idle=None):
+        self.profile = StartupProfile()
+        self.profile_startup = profile_startup
+        self.measure_idle = measure_idle
+        self.profile.mark('imports')
+        
+        # Navigation, keybinds, templates and config live in the headless core
+        self.core = TrackerCore()
+        self.settings = self.core.settings
+        # One dispatch index for this guide and any extra panels (see setup_panels)
+        self.dispatcher = PanelDispatcher(self.core)
+        self.panels = []
+        self.profile.mark('core')
+        
         self.root = tk.Tk()
         self.setup_window()
-        self.current_step = 0
-        self.steps = []
-        self.pressed_keys = set()
-        self.last_action_time = 0
-        self.current_template = "sample_guide.json"
-        
-        # Keybind configuration
-        self.keybind_config_file = "keybind_config.json"
-        self.default_keybinds = {
-            "next_step": {"modifiers": ["shift"], "key": "d"},
-            "previous_step": {"modifiers": ["shift"], "key": "s"},
-            "quit_app": {"modifiers": ["shift"], "key": "q"},
-            "minimize_toggle": {"modifiers": ["shift"], "key": "r"}
-        }
-        self.keybinds = self.load_keybind_config()
+        self.register_actions()
+        self.listener_ready = threading.Event()
+        self.quick_switch_window = None
+        self.quick_switch_refresh = None
+        self.library_scanning = False
+        self.step_search_window = None
+        self.template_editor = None
+        self.control_server = None
         
         # Window state tracking
         self.is_minimized = False
         
-        # Drag functionality variables
-        self.drag_start_x = 0
-        self.drag_start_y = 0
-        self.drag_window_x = 0
-        self.drag_window_y = 0
-        self.is_dragging = False
+        # Input events are queued by the hook thread and applied on the Tk thread
+        self.show_event_stats = os.environ.get('VTASK_EVENT_STATS') == '1'
+        self.instrumentation = Instrumentation(
+            enabled=self.show_event_stats or os.environ.get('VTASK_PERF') == '1')
+        self.event_bus = EventBus(self.root, self, self.instrumentation)
+        # Save results come back from the writer thread through the bus
+        self.core.file_writer.dispatch = lambda callback: self.event_bus.post_internal('save_completed', callback)
+        self._defer_render = False
+        self._render_pending = False
+        self.hud_after_id = None
+        self.timer_after_id = None
+        self.timer_text = ""
+        
+        # Idle mode: entered when hidden or after idle_timeout seconds without interaction
+        self.idle_mode = False
+        self.idle_timeout = self.settings.get('idle_timeout', DEFAULT_IDLE_TIMEOUT)
+        self.idle_after_id = None
+        self.last_interaction = time.perf_counter()
+        
+        self.core.start()
         
+        # Moves the window while it is dragged, at most once per frame
+        self.drag = WindowDrag(self.root, self.drag_moved)
+        
+        # Paint the guide first; buttons, the hook and dialogs follow once it is on screen
         self.setup_ui()
-        self.setup_keyboard_listener()
         self.load_guide()
+        self.root.update()
+        self.profile.mark('first_paint')
+        self.root.after_idle(self.finish_startup)
+        
+    # The view reads and writes tracker state through the core
+    
+    @property
+    def steps(self):
+        return self.core.steps
+    
+    @property
+    def current_step(self):
+        return self.core.current_step
+    
+    @current_step.setter
+    def current_step(self, value):
+        self.core.current_step = value
+    
+    @property
+    def current_template(self):
+        return self.core.current_template
+    
+    @current_template.setter
+    def current_template(self, value):
+        self.core.current_template = value
+    
+    @property
+    def keybinds(self):
+        return self.core.keybinds
+    
+    @keybinds.setter
+    def keybinds(self, value):
+        self.core.keybinds = value
+    
+    @property
+    def default_keybinds(self):
+        return self.core.default_keybinds
         
     def setup_window(self):
         """Configure the overlay window properties"""
@@ -53,14 +720,58 @@ class VTaskTracker:
         # Remove window decorations
         self.root.overrideredirect(True)
         
-        # Position window in top-right corner
-        screen_width = self.root.winfo_screenwidth()
-        self.root.geometry(f"400x250+{screen_width-420}+20")
+        # Restore the last dragged position, or default to the top-right corner
+        position = self.settings.get('window_position')
+        if position:
+            self.root.geometry(f"400x250+{position[0]}+{position[1]}")
+        else:
+            screen_width = self.root.winfo_screenwidth()
+            self.root.geometry(f"400x250+{screen_width-420}+20")
         
+    def finish_startup(self):
+        """Build the rest of the UI and start input handling after the first frame"""
+        self.setup_controls()
+        self.setup_panels()
+        self.event_bus.start()
+        if self.settings.get('hot_reload', True):
+            self.core.watch_template(lambda diff: self.event_bus.post_internal('template_reloaded', diff))
+        self.setup_control_server()
+        self.profile.mark('controls')
+        threading.Thread(target=self.start_keyboard_listener_async, name="ListenerStartup", daemon=True).start()
+        if self.profile_startup:
+            self.root.after(10, self.finish_startup_profile)
+        elif self.measure_idle:
+            self.root.after(10, self.run_idle_measurement)
+        else:
+            self.schedule_idle_check()
+    
+    def start_keyboard_listener_async(self):
+        """Import pynput and start the hook off the UI thread, then preload dialogs"""
+        try:
+            load_keyboard_module()
+            self.profile.mark('pynput_imported')
+            self.setup_keyboard_listener()
+            self.profile.mark('listener_started')
+            filedialog.load()
+            messagebox.load()
+            self.profile.mark('dialogs_preloaded')
+        except Exception as e:
+            print(f"Error starting keyboard listener: {e}")
+        finally:
+            self.listener_ready.set()
+    
+    def finish_startup_profile(self):
+        """Print the --profile-startup report once everything is up, then exit"""
+        if not self.listener_ready.is_set():
+            self.root.after(10, self.finish_startup_profile)
+            return
+        print(self.profile.report())
+        self.quit_application()
+    
     def setup_ui(self):
-        """Create the user interface"""
+        """Create the part of the interface needed for the first frame"""
         # Main frame
-        main_frame = tk.Frame(self.root, bg='black', padx=10, pady=10)
+        self.main_frame = main_frame = tk.Frame(self.root, bg='black', padx=10, pady=10)
         main_frame.pack(fill=tk.BOTH, expand=True)
         
         # Title
@@ -90,11 +801,28 @@ class VTaskTracker:
             font=('Arial', 11),
             fg='white',
             bg='black',
-            wraplength=380,
+            wraplength=STEP_WRAP_WIDTH,
             justify=tk.LEFT
         )
         self.step_display.pack(pady=10, fill=tk.BOTH, expand=True)
         
+        # Diffs against what is on screen and pre-wraps step text
+        self.renderer = StepRenderer(self.root, self.step_counter, self.step_display, STEP_WRAP_WIDTH)
+        
+        # Bind mouse events for window dragging
+        main_frame.bind("<Button-1>", self.start_drag)
+        main_frame.bind("<B1-Motion>", self.drag_window)
+        main_frame.bind("<ButtonRelease-1>", self.stop_drag)
+        
+        # Also bind to the title label for easier dragging
+        title_label.bind("<Button-1>", self.start_drag)
+        title_label.bind("<B1-Motion>", self.drag_window)
+        title_label.bind("<ButtonRelease-1>", self.stop_drag)
+        
+    def setup_controls(self):
+        """Create the buttons, controls line and HUD below the step display"""
+        main_frame = self.main_frame
+        
         # Template management buttons
         button_frame = tk.Frame(main_frame, bg='black')
         button_frame.pack(side=tk.BOTTOM, pady=5)
@@ -154,150 +882,221 @@ class VTaskTracker:
         )
         self.controls_label.pack(side=tk.BOTTOM)
         
-        # Bind mouse events for window dragging
-        main_frame.bind("<Button-1>", self.start_drag)
-        main_frame.bind("<B1-Motion>", self.drag_window)
-        main_frame.bind("<ButtonRelease-1>", self.stop_drag)
+        # Performance HUD, packed under the controls line while instrumentation is on
+        self.hud_label = tk.Label(
+            main_frame,
+            text="",
+            font=('Consolas', 8),
+            fg='lightgreen',
+            bg='black'
+        )
+        if self.instrumentation.enabled:
+            self.show_perf_hud()
         
-        # Also bind to the title label for easier dragging
-        title_label.bind("<Button-1>", self.start_drag)
-        title_label.bind("<B1-Motion>", self.drag_window)
-        title_label.bind("<ButtonRelease-1>", self.stop_drag)
+        # Split timer, packed under the step counter while a run is timed
+        self.timer_label = tk.Label(
+            main_frame,
+            text="",
+            font=('Consolas', 11, 'bold'),
+            fg='cyan',
+            bg='black'
+        )
+        
+    def setup_panels(self):
+        """Open the extra guide panels listed under "panels" in the settings"""
+        for config in self.settings.get('panels', []):
+            number = len(self.panels) + 1
+            try:
+                template = config['template']
+                core = TrackerCore.create_panel(self.core, template, config.get('keybinds', {}))
+                panel = GuidePanel(self, number, core, config)
+            except Exception as e:
+                print(f"Error opening guide panel: {e}")
+                continue
+            self.panels.append(panel)
+            self.dispatcher.add_panel(core, config.get('name') or os.path.splitext(os.path.basename(template))[0])
+            panel.load_guide()
+            if self.settings.get('hot_reload', True):
+                core.watch_template(lambda diff, number=number: self.event_bus.post_internal('template_reloaded', diff, panel=number))
+        
+    def setup_control_server(self):
+        """Serve the control protocol on "control_socket" and/or "control_port" if either is set"""
+        unix_path = self.settings.get('control_socket')
+        tcp_port = self.settings.get('control_port')
+        if not unix_path and tcp_port is None:
+            return
+        handlers = control_server.core_handlers(self.core, on_change=self.control_changed)
+        handlers['minimize'] = self.control_minimize
+        handlers['profile'] = self.control_profile
+        server = control_server.ControlServer(
+            handlers, submit=lambda callback: self.event_bus.post_internal('control_commands', callback),
+            unix_path=unix_path, tcp_port=tcp_port)
+        try:
+            server.start()
+        except Exception as e:
+            print(f"Error starting control server: {e}")
+            return
+        self.control_server = server
+        print(f"Control server listening on {server.address}")
+    
+    def control_changed(self):
+        """Redraw after a control command moved or replaced the guide"""
+        # Only commands that change something count; status polling must not keep the overlay awake
+        self.note_interaction()
+        self.renderer.cancel_prefetch()
+        self.update_display()
+    
+    def control_minimize(self, arg):
+        """Handler for the "minimize" control command"""
+        self.toggle_minimize()
+        return "ok"
+    
+    def control_profile(self, arg):
+        """Handler for the "profile" control command"""
+        if arg and not self.switch_keybind_profile(arg):
+            raise control_server.ControlError(f"no usable keybind profile named {arg}")
+        if arg:
+            self.note_interaction()
+        return "ok " + self.core.keybind_profiles.active
         
     def setup_keyboard_listener(self):
         """Set up global keyboard listener for navigation"""
-        def on_key_press(key):
-            try:
-                current_time = time.time()
-                
-                # Prevent rapid-fire actions (debounce)
-                if current_time - self.last_action_time < 0.2:
-                    return
-                
-                # Track modifier keys
-                if key == keyboard.Key.shift:
-                    self.pressed_keys.add('shift')
-                    return
-                elif key == keyboard.Key.ctrl:
-                    self.pressed_keys.add('ctrl')
-                    return
-                elif key == keyboard.Key.alt:
-                    self.pressed_keys.add('alt')
-                    return
-                
-                # Check for configured keybinds
-                if hasattr(key, 'char') and key.char:
-                    char = key.char.lower()
-                    self.check_keybind(char)
-                elif hasattr(key, 'name'):
-                    # Handle special keys like F1-F12, etc.
-                    self.check_keybind(key.name.lower())
-                    
-            except (AttributeError, TypeError):
-                pass
-                
-        def on_key_release(key):
-            try:
-                # Remove modifier keys from pressed keys when released
-                if key == keyboard.Key.shift:
-                    self.pressed_keys.discard('shift')
-                elif key == keyboard.Key.ctrl:
-                    self.pressed_keys.discard('ctrl')
-                elif key == keyboard.Key.alt:
-                    self.pressed_keys.discard('alt')
-            except (AttributeError, TypeError):
-                pass
+        self.key_hook = KeyHook(self.dispatcher, self.check_keybind, MODIFIER_KEYS,
+                                keyboard.Key, self.instrumentation)
+        # Filters for the other keybind profiles, so a switch costs the hook nothing
+        self.key_hook.prepare([table[0] for table in self.dispatcher.profile_tables.values()])
+        options = {}
+        if self.settings.get('suppress_bound_keys', False):
+            if sys.platform == 'win32':
+                # Bound chords are handled in the filter and never reach the game
+                options['win32_event_filter'] = self.key_hook.win32_event_filter
+            else:
+                print("Error enabling suppress_bound_keys: only supported on Windows")
         
         # Start keyboard listener in a separate thread
         self.listener = keyboard.Listener(
-            on_press=on_key_press,
-            on_release=on_key_release
+            on_press=self.key_hook.on_press,
+            on_release=self.key_hook.on_release,
+            **options
         )
+        self.key_hook.listener = self.listener
         self.listener.start()
     
-    def restart_keyboard_listener(self):
-        """Restart the keyboard listener with updated keybinds"""
-        if hasattr(self, 'listener'):
-            self.listener.stop()
-        self.setup_keyboard_listener()
+    def switch_keybind_profile(self, name):
+        """Swap in another keybind profile without stopping the keyboard listener
+
+        The hook picks up the precompiled table on its next keystroke; held
+        modifiers and keys carry over. Returns False if the profile is
+        missing or has conflicting bindings.
+        """
+        if not self.core.switch_keybind_profile(name):
+            return False
+        if hasattr(self, 'key_hook'):
+            table = self.dispatcher.profile_tables.get(name)
+            if table is not None:
+                self.key_hook.prepare([table[0]])
+        self.dispatcher.switch_profile(name)
+        self.controls_label.config(text=self.get_controls_text())
+        print(f"Keybind profile: {name}")
+        return True
     
-    def load_keybind_config(self):
-        """Load keybind configuration from file or use defaults"""
-        if os.path.exists(self.keybind_config_file):
-            try:
-                with open(self.keybind_config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    # Merge with defaults to ensure all keys are present
-                    keybinds = self.default_keybinds.copy()
-                    keybinds.update(config)
-                    return keybinds
-            except Exception as e:
-                print(f"Error loading keybind config: {e}")
-                return self.default_keybinds.copy()
-        else:
-            return self.default_keybinds.copy()
+    def cycle_keybind_profile(self):
+        """Switch to the next keybind profile in keybind_config.json"""
+        profiles = self.core.keybind_profiles
+        # Skip over any profile that fails to compile
+        for offset in range(1, len(profiles)):
+            if self.switch_keybind_profile(profiles.neighbour(offset)):
+                return
     
-    def save_keybind_config(self):
-        """Save current keybind configuration to file"""
-        try:
-            with open(self.keybind_config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.keybinds, f, indent=2)
-        except Exception as e:
-            print(f"Error saving keybind config: {e}")
+    def register_actions(self):
+        """Register the handlers that keybind actions dispatch to"""
+        self.actions = {}
+        self.register_action('next_step', lambda arg, count: self.next_step(count))
+        self.register_action('previous_step', lambda arg, count: self.previous_step(count))
+        self.register_action('jump_to_step', lambda arg, count: self.jump_to_step(arg))
+        self.register_action('next_section', lambda arg, count: self.next_section(count))
+        self.register_action('previous_section', lambda arg, count: self.previous_section(count))
+        # Let the rest of the batch render before the window is destroyed
+        self.register_action('quit_app', lambda arg, count: self.root.after_idle(self.quit_application))
+        self.register_action('minimize_toggle', lambda arg, count: self.toggle_minimize())
+        self.register_action('toggle_perf_hud', lambda arg, count: self.toggle_perf_hud())
+        self.register_action('dump_perf_stats', lambda arg, count: self.dump_perf_stats())
+        self.register_action('quick_switch', lambda arg, count: self.open_quick_switch())
+        self.register_action('template_reloaded', lambda arg, count: self.apply_template_reload(arg))
+        self.register_action('search_steps', lambda arg, count: self.open_step_search())
+        self.register_action('edit_template', lambda arg, count: self.edit_current_template())
+        self.register_action('toggle_timer', lambda arg, count: self.toggle_timer())
+        self.register_action('next_template', lambda arg, count: self.next_template())
+        self.register_action('previous_template', lambda arg, count: self.previous_template())
+        self.register_action('undo_step', lambda arg, count: self.undo_step(count))
+        self.register_action('redo_step', lambda arg, count: self.redo_step(count))
+        self.register_action('set_bookmark', lambda arg, count: self.core.set_bookmark(arg))
+        self.register_action('goto_bookmark', lambda arg, count: self.goto_bookmark(arg))
+        self.register_action('next_keybind_profile', lambda arg, count: self.cycle_keybind_profile())
+        self.register_action('next_match', lambda arg, count: self.next_match())
+        self.register_action('previous_match', lambda arg, count: self.previous_match())
+        self.register_action('save_completed', lambda callback, count: callback())
+        self.register_action('control_commands', lambda callback, count: callback())
+        self.register_action('library_scanned', lambda result, count: self.apply_library_scan(*result))
+    
+    def register_action(self, action, handler):
+        """Register a handler called as handler(arg, count) for an action"""
+        self.actions[action] = handler
     
-    def check_keybind(self, pressed_key):
-        """Check if the pressed key combination matches any configured keybind"""
-        current_time = time.time()
+    def check_keybind(self, pressed_key, hook_start=None):
+        """Check if the pressed key combination matches any configured keybind
         
-        for action, config in self.keybinds.items():
-            required_modifiers = set(config.get('modifiers', []))
-            required_key = config.get('key', '')
-            
-            # Debug print (can be removed later)
-            # print(f"Checking {action}: required_modifiers={required_modifiers}, required_key={required_key}")
-            # print(f"Current: pressed_keys={self.pressed_keys}, pressed_key={pressed_key}")
-            
-            # Check if modifiers match
-            if required_modifiers == self.pressed_keys and required_key == pressed_key:
-                # print(f"Keybind match found for {action}")
-                if action == 'next_step':
-                    self.next_step()
-                    self.last_action_time = current_time
-                elif action == 'previous_step':
-                    self.previous_step()
-                    self.last_action_time = current_time
-                elif action == 'quit_app':
-                    self.quit_application()
-                    self.last_action_time = current_time
-                elif action == 'minimize_toggle':
-                    self.toggle_minimize()
-                    self.last_action_time = current_time
-                break
+        Runs on the listener thread, so matched actions are only queued here and
+        applied later on the Tk thread by dispatch_action. One lookup serves
+        every panel.
+        """
+        match = self.dispatcher.handle_key(pressed_key)
+        if match is not None:
+            panel, action, arg, count = match
+            self.event_bus.post(action, arg, hook_start, count, panel)
+    
+    def dispatch_action(self, action, arg=None, count=1, panel=0):
+        """Apply a queued action on the Tk thread, in this window or an extra panel"""
+        if action not in BACKGROUND_ACTIONS:
+            self.note_interaction()
+        if panel:
+            self.panels[panel - 1].dispatch_action(action, arg, count)
+            return
+        handler = self.actions.get(action)
+        if handler is not None:
+            handler(arg, count)
+    
+    def note_interaction(self):
+        """Restart the idle countdown, waking the overlay if it is idle and visible"""
+        self.last_interaction = time.perf_counter()
+        if self.idle_mode and not self.is_minimized:
+            self.exit_idle()
+    
+    def begin_batch(self):
+        """Defer rendering while a batch of queued events is applied"""
+        self._defer_render = True
+        self._render_pending = False
+        for panel in self.panels:
+            panel.begin_batch()
+    
+    def end_batch(self):
+        """Render once for the whole batch"""
+        self._defer_render = False
+        if self._render_pending:
+            self._render_pending = False
+            self.update_display()
+        for panel in self.panels:
+            panel.end_batch()
     
     def get_controls_text(self):
         """Generate controls text based on current keybind configuration"""
-        next_key = self.format_keybind(self.keybinds['next_step'])
-        prev_key = self.format_keybind(self.keybinds['previous_step'])
-        quit_key = self.format_keybind(self.keybinds['quit_app'])
-        minimize_key = self.format_keybind(self.keybinds['minimize_toggle'])
-        return f"{next_key}: Next | {prev_key}: Previous | {minimize_key}: Min/Max | {quit_key}: Quit"
-    
-    def format_keybind(self, keybind_config):
-        """Format a keybind configuration for display"""
-        modifiers = keybind_config.get('modifiers', [])
-        key = keybind_config.get('key', '')
-        
-        modifier_text = '+'.join([mod.capitalize() for mod in modifiers])
-        if modifier_text:
-            return f"{modifier_text}+{key.upper()}"
-        else:
-            return key.upper()
+        return self.core.get_controls_text()
     
     def open_settings(self):
         """Open the settings window for keybind customization"""
         settings_window = tk.Toplevel(self.root)
         settings_window.title("Settings - Keybind Configuration")
-        settings_window.geometry("500x400")
+        settings_window.geometry("640x620")
         settings_window.configure(bg='black')
         settings_window.attributes('-topmost', True)
         
@@ -315,6 +1114,16 @@ class VTaskTracker:
         )
         title_label.pack(pady=10)
         
+        # Profile the keybinds are saved to; a new name creates a profile
+        profile_frame = tk.Frame(settings_window, bg='black')
+        profile_frame.pack(fill=tk.X, padx=20)
+        tk.Label(profile_frame, text="Profile:", font=('Arial', 10), fg='white', bg='black').pack(side=tk.LEFT)
+        profile_var = tk.StringVar(value=self.core.keybind_profiles.active)
+        tk.Entry(profile_frame, textvariable=profile_var, font=('Arial', 9), width=20,
+                 bg='darkgray', fg='black').pack(side=tk.LEFT, padx=10)
+        tk.Label(profile_frame, text=", ".join(self.core.keybind_profiles.names()),
+                 font=('Arial', 8), fg='gray', bg='black').pack(side=tk.LEFT)
+        
         # Keybind configuration frame
         config_frame = tk.Frame(settings_window, bg='black')
         config_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
@@ -331,19 +1140,36 @@ class VTaskTracker:
         for action, label in keybind_actions:
             self.create_keybind_widget(config_frame, action, label)
         
+        # Key repeat configuration
+        repeat_frame = tk.Frame(settings_window, bg='black')
+        repeat_frame.pack(fill=tk.X, padx=20)
+        self.create_repeat_widgets(repeat_frame, keybind_actions)
+        
         # Buttons frame
         button_frame = tk.Frame(settings_window, bg='black')
         button_frame.pack(pady=20)
         
         def save_settings():
+            repeat_settings = self.validate_repeat_settings()
+            if repeat_settings is None:
+                return
             # Validate and save keybinds
             if self.validate_keybinds():
-                self.save_keybind_config()
-                # Restart keyboard listener with new keybinds
-                self.restart_keyboard_listener()
+                def saved(error):
+                    if error is None:
+                        messagebox.showinfo("Success", "Keybind settings saved successfully!")
+                    else:
+                        messagebox.showerror("Error", f"Failed to save keybind settings: {error}")
+                profile = profile_var.get().strip() or self.core.keybind_profiles.active
+                self.core.store_keybind_profile(profile, self.keybinds)
+                self.core.save_keybind_config(on_done=saved)
+                # The running hook picks up the new index on its next keystroke
+                self.dispatcher.rebuild()
+                self.core.update_repeat_settings(repeat_settings)
+                for panel in self.panels:
+                    panel.core.repeat_engine.update_settings(repeat_settings)
                 # Update controls display
                 self.controls_label.config(text=self.get_controls_text())
-                messagebox.showinfo("Success", "Keybind settings saved successfully!")
                 settings_window.destroy()
             else:
                 messagebox.showerror("Error", "Invalid keybind configuration. Please check for conflicts.")
@@ -351,6 +1177,7 @@ class VTaskTracker:
         def reset_defaults():
             self.keybinds = self.default_keybinds.copy()
             self.update_keybind_widgets()
+            self.update_repeat_widgets(DEFAULT_REPEAT_SETTINGS)
             messagebox.showinfo("Reset", "Keybinds reset to defaults")
         
         def cancel_settings():
@@ -428,6 +1255,71 @@ class VTaskTracker:
             'key': key_var
         }
     
+    def create_repeat_widgets(self, parent, keybind_actions):
+        """Create the per-action debounce and auto-repeat grid"""
+        tk.Label(parent, text="Key Repeat", font=('Arial', 11, 'bold'),
+                 fg='white', bg='black').grid(row=0, column=0, columnspan=7, sticky='w', pady=(0, 5))
+        headers = ["", "Debounce ms", "Repeat", "Delay ms", "Interval ms", "Accel", "Min ms"]
+        for column, header in enumerate(headers):
+            tk.Label(parent, text=header, font=('Arial', 8), fg='gray', bg='black').grid(row=1, column=column, padx=2)
+        
+        self.repeat_widgets = {}
+        for row, (action, label) in enumerate(keybind_actions, start=2):
+            tk.Label(parent, text=label, font=('Arial', 9), fg='white', bg='black').grid(row=row, column=0, sticky='w')
+            widgets = {}
+            for column, field in enumerate(('debounce', 'auto_repeat', 'delay', 'interval', 'acceleration', 'min_interval'), start=1):
+                if field == 'auto_repeat':
+                    var = tk.BooleanVar()
+                    tk.Checkbutton(parent, variable=var, bg='black', selectcolor='darkgray',
+                                   activebackground='black').grid(row=row, column=column)
+                else:
+                    var = tk.StringVar()
+                    tk.Entry(parent, textvariable=var, font=('Arial', 9), width=7,
+                             bg='darkgray', fg='black').grid(row=row, column=column, padx=2, pady=2)
+                widgets[field] = var
+            self.repeat_widgets[action] = widgets
+        self.update_repeat_widgets(self.core.repeat_engine.settings)
+    
+    def update_repeat_widgets(self, repeat_settings):
+        """Fill the repeat grid from settings (times shown in milliseconds)"""
+        for action, widgets in self.repeat_widgets.items():
+            config = repeat_settings.get(action, SINGLE_SHOT)
+            for field, var in widgets.items():
+                value = config[field]
+                if field == 'auto_repeat':
+                    var.set(bool(value))
+                elif field == 'acceleration':
+                    var.set(f"{value:g}")
+                else:
+                    var.set(f"{value * 1000:g}")
+    
+    def validate_repeat_settings(self):
+        """Read the repeat grid; returns settings in seconds, or None after showing an error"""
+        repeat_settings = {}
+        for action, widgets in self.repeat_widgets.items():
+            config = {}
+            for field, var in widgets.items():
+                if field == 'auto_repeat':
+                    config[field] = bool(var.get())
+                    continue
+                try:
+                    value = float(var.get())
+                except ValueError:
+                    messagebox.showerror("Error", f"Invalid {field} for {action}: {var.get()!r}")
+                    return None
+                if field == 'acceleration':
+                    if not 0 < value <= 1:
+                        messagebox.showerror("Error", f"Acceleration for {action} must be between 0 and 1")
+                        return None
+                    config[field] = value
+                else:
+                    if value < 0 or (field == 'min_interval' and value == 0):
+                        messagebox.showerror("Error", f"Invalid {field} for {action}: {var.get()!r}")
+                        return None
+                    config[field] = value / 1000
+            repeat_settings[action] = config
+        return repeat_settings
+    
     def get_current_modifier(self, action):
         """Get the current modifier for an action (returns first modifier or 'none')"""
         modifiers = self.keybinds[action].get('modifiers', [])
@@ -450,7 +1342,9 @@ class VTaskTracker:
     
     def validate_keybinds(self):
         """Validate keybind configuration and update internal state"""
-        new_keybinds = {}
+        # Actions without a settings widget (e.g. jump_to_step) keep their binding
+        new_keybinds = {action: config for action, config in self.keybinds.items()
+                        if action not in self.keybind_widgets}
         
         for action, widgets in self.keybind_widgets.items():
             # Get selected modifier (only one allowed now)
@@ -471,23 +1365,85 @@ class VTaskTracker:
                 'key': key
             }
         
-        # Check for conflicts
-        keybind_strings = []
-        for action, config in new_keybinds.items():
-            if config['modifiers']:
-                keybind_str = f"{'+'.join(config['modifiers'])}+{config['key']}"
-            else:
-                keybind_str = config['key']
-            
-            if keybind_str in keybind_strings:
-                messagebox.showerror("Error", f"Duplicate keybind detected: {keybind_str}")
-                return False
-            keybind_strings.append(keybind_str)
+        # Check for conflicts, including with other panels, by compiling the index
+        try:
+            self.dispatcher.check_keybinds(0, new_keybinds)
+        except KeybindConflict as e:
+            messagebox.showerror("Error", str(e))
+            return False
         
         # Update internal keybinds
         self.keybinds = new_keybinds
         return True
     
+    def toggle_perf_hud(self):
+        """Turn instrumentation and its HUD line on or off"""
+        if self.instrumentation.enabled:
+            self.instrumentation.enabled = False
+            self.hide_perf_hud()
+        else:
+            self.instrumentation.reset()
+            self.instrumentation.enabled = True
+            self.show_perf_hud()
+    
+    def show_perf_hud(self):
+        """Show the HUD line and start refreshing it"""
+        self.hud_label.pack(side=tk.BOTTOM, before=self.controls_label)
+        self.refresh_perf_hud()
+    
+    def hide_perf_hud(self):
+        """Hide the HUD line and stop refreshing it"""
+        if self.hud_after_id is not None:
+            self.root.after_cancel(self.hud_after_id)
+            self.hud_after_id = None
+        self.hud_label.pack_forget()
+    
+    def refresh_perf_hud(self):
+        """Redraw the HUD from the latest histograms"""
+        self.hud_label.config(text=self.instrumentation.summary_line())
+        self.hud_after_id = self.root.after(HUD_REFRESH_MS, self.refresh_perf_hud)
+    
+    def toggle_timer(self):
+        """Start timing a run from the current step, or reset the timer"""
+        if self.timer_after_id is not None:
+            self.root.after_cancel(self.timer_after_id)
+            self.timer_after_id = None
+        if self.core.toggle_timer():
+            self.timer_label.pack(before=self.step_display)
+            self.refresh_timer()
+        else:
+            self.timer_label.pack_forget()
+    
+    def refresh_timer(self):
+        """Redraw the timer label, rescheduled on a fixed frame grid while the run goes on
+        
+        Navigation records splits in the core; the label only reads them, so
+        a tick costs one format and (at most) one label update.
+        """
+        self.timer_after_id = None
+        timer = self.core.split_timer
+        if timer.state == IDLE:
+            # The run was dropped by switching guides
+            self.timer_label.pack_forget()
+            return
+        now = time.perf_counter()
+        text = timer.text(now)
+        if text != self.timer_text:
+            self.timer_text = text
+            self.timer_label.config(text=text)
+        if timer.state == RUNNING:
+            delay = next_tick_delay(timer.start_time, now, TIMER_REFRESH_INTERVAL)
+            self.timer_after_id = self.root.after(delay, self.refresh_timer)
+    
+    def dump_perf_stats(self):
+        """Write the collected histograms to a JSON file"""
+        filename = time.strftime("vtask_perf_%Y%m%d_%H%M%S.json")
+        try:
+            self.instrumentation.dump(filename)
+            print(f"Performance stats written to {filename}")
+        except Exception as e:
+            print(f"Error writing performance stats: {e}")
+    
     def toggle_minimize(self):
         """Toggle between minimized and maximized state"""
         if self.is_minimized:
@@ -495,117 +1451,239 @@ class VTaskTracker:
             self.root.deiconify()
             self.root.attributes('-alpha', 0.9)
             self.is_minimized = False
+            self.exit_idle()
         else:
             # Minimize the window (make it invisible but keep it running)
             self.root.withdraw()
             self.is_minimized = True
+            self.enter_idle()
+    
+    def schedule_idle_check(self):
+        """Arm a one-shot check for idle_timeout seconds after the last interaction
+        
+        Interactions only update a timestamp, so an active overlay pays one
+        wakeup per timeout period for this, not one per action.
+        """
+        if self.idle_after_id is not None or not self.idle_timeout:
+            return
+        remaining = self.last_interaction + self.idle_timeout - time.perf_counter()
+        self.idle_after_id = self.root.after(max(1, int(remaining * 1000)), self.check_idle)
+    
+    def check_idle(self):
+        """Go idle if nothing happened for idle_timeout seconds, or check again later"""
+        self.idle_after_id = None
+        if self.idle_mode:
+            return
+        now = time.perf_counter()
+        if self.core.split_timer.state == RUNNING:
+            # A ticking timer is on screen; keep it live
+            self.last_interaction = now
+        elif now - self.last_interaction >= self.idle_timeout:
+            self.enter_idle()
+            return
+        self.schedule_idle_check()
+    
+    def enter_idle(self):
+        """Suspend periodic work until the next interaction
+        
+        The event bus polls at its idle interval, HUD and timer refreshes
+        stop and cached layouts are dropped. While the window is hidden (and
+        no extra panels are open) the hook only matches the restore chord.
+        """
+        if self.is_minimized and not self.panels:
+            self.dispatcher.set_idle(True)
+        if self.idle_mode:
+            return
+        self.idle_mode = True
+        self.event_bus.set_idle(True)
+        for after_id in (self.idle_after_id, self.hud_after_id, self.timer_after_id):
+            if after_id is not None:
+                self.root.after_cancel(after_id)
+        self.idle_after_id = self.hud_after_id = self.timer_after_id = None
+        self.renderer.invalidate()
+    
+    def exit_idle(self):
+        """Resume normal polling and refreshes, re-rendering the current step"""
+        self.last_interaction = time.perf_counter()
+        if not self.idle_mode:
+            return
+        self.idle_mode = False
+        self.dispatcher.set_idle(False)
+        self.event_bus.set_idle(False)
+        if self.instrumentation.enabled:
+            self.refresh_perf_hud()
+        if self.core.split_timer.state != IDLE:
+            self.refresh_timer()
+        self.update_display()
+        self.schedule_idle_check()
+    
+    def run_idle_measurement(self):
+        """Print CPU and wakeups for the active, idle and hidden states (--measure-idle), then exit"""
+        if not self.listener_ready.is_set():
+            self.root.after(10, self.run_idle_measurement)
+            return
+        seconds = self.measure_idle
+        # States are switched by hand; the inactivity check would get in the way
+        self.idle_timeout = 0
+        states = [
+            ('active', self.exit_idle),
+            ('idle', self.enter_idle),
+            ('hidden', self.toggle_minimize),
+        ]
+        rows = []
+        
+        def measure(index):
+            name, enter = states[index]
+            enter()
+            sample = PowerSample(self.event_bus)
+            
+            def finish():
+                rows.append((name, sample.finish()))
+                if index + 1 < len(states):
+                    measure(index + 1)
+                else:
+                    print(f"Idle measurement ({seconds:g} s per state):")
+                    print(format_power_report(rows))
+                    self.quit_application()
+            self.root.after(int(seconds * 1000), finish)
+        measure(0)
         
     def create_new_template(self):
-        """Create a new custom template"""
-        # Create a new window for template creation
-        template_window = tk.Toplevel(self.root)
-        template_window.title("Create New Template")
-        template_window.geometry("500x400")
-        template_window.configure(bg='black')
-        template_window.attributes('-topmost', True)
+        """Open the template editor on an empty guide"""
+        self.open_template_editor()
         
-        # Center the window
-        template_window.transient(self.root)
-        template_window.grab_set()
+    def edit_current_template(self):
+        """Open the template editor on the active guide"""
+        if not os.path.exists(self.current_template):
+            messagebox.showerror("Error", f"Template not found: {self.current_template}")
+            return
+        self.open_template_editor(self.current_template)
         
-        # Template name input
-        name_frame = tk.Frame(template_window, bg='black')
-        name_frame.pack(pady=10)
+    def open_template_editor(self, filename=None):
+        """Open the template editor, or raise the one already open"""
+        if self.template_editor is not None:
+            self.template_editor.window.lift()
+            self.template_editor.window.focus_force()
+            return
+        self.template_editor = TemplateEditor(self, filename)
+
+    def load_template(self):
+        """Load a template from file"""
+        filename = filedialog.askopenfilename(
+            title="Load Template",
+            filetypes=[("JSON files", "*.json"), ("Binary guides", "*.vtg"), ("All files", "*.*")]
+        )
         
-        tk.Label(name_frame, text="Template Name:", font=('Arial', 10), fg='white', bg='black').pack()
-        name_entry = tk.Entry(name_frame, font=('Arial', 10), width=30)
-        name_entry.pack(pady=5)
+        if filename:
+            try:
+                self.renderer.cancel_prefetch()
+                self.core.open_template_file(filename)
+                self.update_display()
+                messagebox.showinfo("Success", f"Template loaded: {os.path.basename(filename)}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to load template: {str(e)}")
+
+    def open_quick_switch(self):
+        """Open the quick-switch popup for searching the template library"""
+        if self.quick_switch_window is not None:
+            self.quick_switch_window.lift()
+            self.quick_switch_window.focus_force()
+            return
         
-        # Steps input
-        steps_frame = tk.Frame(template_window, bg='black')
-        steps_frame.pack(pady=10, fill=tk.BOTH, expand=True)
+        # Search the index as it is while the directories are rescanned in the background
+        if self.core.scan_library(lambda scan, error: self.event_bus.post_internal('library_scanned', (scan, error))):
+            self.library_scanning = True
         
-        tk.Label(steps_frame, text="Steps (one per line):", font=('Arial', 10), fg='white', bg='black').pack()
+        switch_window = tk.Toplevel(self.root)
+        switch_window.title("Quick Switch")
+        switch_window.geometry("460x360")
+        switch_window.configure(bg='black')
+        switch_window.attributes('-topmost', True)
+        switch_window.transient(self.root)
+        self.quick_switch_window = switch_window
         
-        # Text widget with scrollbar for steps
-        text_frame = tk.Frame(steps_frame, bg='black')
-        text_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        query_entry = tk.Entry(switch_window, font=('Arial', 11), width=40)
+        query_entry.pack(fill=tk.X, padx=10, pady=(10, 5))
+        
+        status_label = tk.Label(switch_window, text="", font=('Arial', 8), fg='gray', bg='black', anchor='w')
+        status_label.pack(fill=tk.X, padx=10)
         
-        steps_text = tk.Text(text_frame, font=('Arial', 9), height=15, width=50, bg='darkgray', fg='black')
-        scrollbar = tk.Scrollbar(text_frame, orient=tk.VERTICAL, command=steps_text.yview)
-        steps_text.configure(yscrollcommand=scrollbar.set)
+        list_frame = tk.Frame(switch_window, bg='black')
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 10))
         
-        steps_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        results_list = tk.Listbox(list_frame, font=('Arial', 9), bg='darkgray', fg='black',
+                                  activestyle='none', exportselection=False)
+        scrollbar = tk.Scrollbar(list_frame, orient=tk.VERTICAL, command=results_list.yview)
+        results_list.configure(yscrollcommand=scrollbar.set)
+        results_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Buttons
-        button_frame = tk.Frame(template_window, bg='black')
-        button_frame.pack(pady=10)
+        results = []
         
-        def save_new_template():
-            template_name = name_entry.get().strip()
-            steps_content = steps_text.get("1.0", tk.END).strip()
-            
-            if not template_name:
-                messagebox.showerror("Error", "Please enter a template name")
+        def update_results(event=None):
+            if event is not None and event.keysym in ('Up', 'Down', 'Return', 'Escape'):
                 return
-                
-            if not steps_content:
-                messagebox.showerror("Error", "Please enter at least one step")
-                return
-            
-            # Parse steps
-            steps = [step.strip() for step in steps_content.split('\n') if step.strip()]
-            
-            # Create template data
-            template_data = {
-                "title": template_name,
-                "steps": steps
-            }
-            
-            # Save template
-            filename = f"{template_name.replace(' ', '_').lower()}_template.json"
-            try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(template_data, f, indent=2)
-                
-                messagebox.showinfo("Success", f"Template '{template_name}' saved as {filename}")
-                template_window.destroy()
-                
-                # Load the new template
-                self.current_template = filename
-                self.load_guide()
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save template: {str(e)}")
+            start = time.perf_counter()
+            results[:] = self.core.search_templates(query_entry.get())
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            results_list.delete(0, tk.END)
+            for path, title, step_count in results:
+                results_list.insert(tk.END, f"{title}  ({step_count} steps)  {os.path.basename(path)}")
+            if results:
+                results_list.selection_set(0)
+            scanning = ", scanning..." if self.library_scanning else ""
+            status_label.config(text=f"{len(results)} of {len(self.core.library)} guides ({elapsed_ms:.1f} ms{scanning})")
         
-        def cancel_template():
-            template_window.destroy()
+        def move_selection(delta):
+            if not results:
+                return "break"
+            selection = results_list.curselection()
+            index = max(0, min((selection[0] if selection else 0) + delta, len(results) - 1))
+            results_list.selection_clear(0, tk.END)
+            results_list.selection_set(index)
+            results_list.see(index)
+            return "break"
         
-        tk.Button(button_frame, text="Save Template", command=save_new_template, 
-                 bg='darkgreen', fg='white', font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
-        tk.Button(button_frame, text="Cancel", command=cancel_template, 
-                 bg='darkred', fg='white', font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
-
-    def load_template(self):
-        """Load a template from file"""
-        filename = filedialog.askopenfilename(
-            title="Load Template",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
-        )
+        def close_switch(event=None):
+            self.quick_switch_window = None
+            self.quick_switch_refresh = None
+            switch_window.destroy()
         
-        if filename:
+        def open_selected(event=None):
+            selection = results_list.curselection()
+            if not selection:
+                return
+            path = results[selection[0]][0]
+            close_switch()
             try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.steps = data.get('steps', [])
-                    self.current_template = filename
-                    self.current_step = 0
-                    self.update_display()
-                    messagebox.showinfo("Success", f"Template loaded: {os.path.basename(filename)}")
+                self.renderer.cancel_prefetch()
+                self.core.open_template_file(path)
+                self.update_display()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load template: {str(e)}")
-
+        
+        query_entry.bind("<KeyRelease>", update_results)
+        query_entry.bind("<Up>", lambda event: move_selection(-1))
+        query_entry.bind("<Down>", lambda event: move_selection(1))
+        query_entry.bind("<Return>", open_selected)
+        switch_window.bind("<Escape>", close_switch)
+        results_list.bind("<Double-Button-1>", open_selected)
+        switch_window.protocol("WM_DELETE_WINDOW", close_switch)
+        
+        self.quick_switch_refresh = update_results
+        update_results()
+        query_entry.focus_force()
+    
+    def apply_library_scan(self, scan, error):
+        """Install a finished background library scan and refresh the quick-switch results"""
+        self.library_scanning = False
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to scan template library: {str(error)}")
+        else:
+            self.core.apply_library_scan(scan)
+        if self.quick_switch_refresh is not None:
+            self.quick_switch_refresh()
+    
     def save_template(self):
         """Save current template to file"""
         if not self.steps:
@@ -615,83 +1693,208 @@ class VTaskTracker:
         filename = filedialog.asksaveasfilename(
             title="Save Template",
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("JSON files", "*.json"), ("Binary guides", "*.vtg"), ("All files", "*.*")]
         )
         
         if filename:
+            def saved(error):
+                if error is None:
+                    messagebox.showinfo("Success", f"Template saved: {os.path.basename(filename)}")
+                else:
+                    messagebox.showerror("Error", f"Failed to save template: {error}")
+            
             try:
-                template_data = {
-                    "title": os.path.splitext(os.path.basename(filename))[0],
-                    "steps": self.steps
-                }
-                
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(template_data, f, indent=2)
-                
-                messagebox.showinfo("Success", f"Template saved: {os.path.basename(filename)}")
+                self.renderer.cancel_prefetch()
+                self.core.save_template_file(filename, on_done=saved)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save template: {str(e)}")
 
     def load_guide(self):
         """Load speedrun guide from JSON file"""
-        guide_file = self.current_template
-        if os.path.exists(guide_file):
-            try:
-                with open(guide_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.steps = data.get('steps', [])
-                    self.update_display()
-            except Exception as e:
-                self.step_display.config(text=f"Error loading guide: {str(e)}")
-        else:
-            # Create sample guide if none exists
-            self.create_sample_guide()
+        self.renderer.cancel_prefetch()
+        try:
+            if self.core.load_guide():
+                self.update_display()
+            else:
+                # Create sample guide if none exists
+                self.create_sample_guide()
+        except Exception as e:
+            self.renderer.show(None, f"Error loading guide: {str(e)}")
             
     def create_sample_guide(self):
         """Create a sample speedrun guide"""
-        sample_steps = [
-            "Start the game and create your character",
-            "Collect basic materials (stone, wood, fiber)",
-            "Build your first Castle Heart",
-            "Craft basic weapons and armor",
-            "Find and defeat the first boss",
-            "Upgrade your Castle Heart to level 2",
-            "Explore the world for better resources",
-            "Defeat the second boss",
-            "Continue following the main quest line"
-        ]
-        
-        guide_data = {
-            "title": "VTask Tracker Guide",
-            "steps": sample_steps
-        }
-        
-        with open("speedrun_guide.json", 'w', encoding='utf-8') as f:
-            json.dump(guide_data, f, indent=2)
-            
-        self.steps = sample_steps
+        self.core.create_sample_guide()
         self.update_display()
         
-    def next_step(self):
-        """Move to the next step"""
-        if self.current_step < len(self.steps) - 1:
-            self.current_step += 1
+    def next_step(self, count=1):
+        """Move to the next step, or on into the next playlist guide from the last one"""
+        template = self.current_template
+        if self.core.next_step(count):
+            if self.current_template != template:
+                self.renderer.cancel_prefetch()
             self.update_display()
             
-    def previous_step(self):
+    def previous_step(self, count=1):
         """Move to the previous step"""
-        if self.current_step > 0:
-            self.current_step -= 1
+        if self.core.previous_step(count):
+            self.update_display()
+            
+    def jump_to_step(self, step_number):
+        """Jump to a 1-based step number, clamped to the guide"""
+        if self.core.jump_to_step(step_number):
+            self.update_display()
+            
+    def next_section(self, count=1):
+        """Move to the start of the next section"""
+        if self.core.next_section(count):
             self.update_display()
             
+    def previous_section(self, count=1):
+        """Move to the start of this section, or the previous one"""
+        if self.core.previous_section(count):
+            self.update_display()
+            
+    def apply_template_reload(self, diff):
+        """Apply an edit of the active template made outside the overlay"""
+        self.renderer.cancel_prefetch()
+        if self.core.apply_template_diff(diff):
+            self.update_display()
+    
+    def undo_step(self, count=1):
+        """Go back to where the last move started"""
+        moved = False
+        for _ in range(count):
+            moved = self.core.undo_step() or moved
+        if moved:
+            self.update_display()
+    
+    def redo_step(self, count=1):
+        """Redo the last undone move"""
+        moved = False
+        for _ in range(count):
+            moved = self.core.redo_step() or moved
+        if moved:
+            self.update_display()
+    
+    def goto_bookmark(self, name):
+        """Go to a bookmarked step"""
+        if self.core.goto_bookmark(name):
+            self.update_display()
+    
+    def next_template(self):
+        """Switch to the next guide in the playlist"""
+        if self.core.next_template():
+            self.renderer.cancel_prefetch()
+            self.update_display()
+    
+    def previous_template(self):
+        """Switch back to the previous guide in the playlist"""
+        if self.core.previous_template():
+            self.renderer.cancel_prefetch()
+            self.update_display()
+    
+    def next_match(self):
+        """Jump to the next step matching the last search"""
+        if self.core.next_match():
+            self.update_display()
+    
+    def previous_match(self):
+        """Jump to the previous step matching the last search"""
+        if self.core.previous_match():
+            self.update_display()
+    
+    def open_step_search(self):
+        """Open the search box for jumping to steps by their text"""
+        if self.step_search_window is not None:
+            self.step_search_window.lift()
+            self.step_search_window.focus_force()
+            return
+        if not self.steps:
+            return
+        
+        search_window = tk.Toplevel(self.root)
+        search_window.title("Find Step")
+        search_window.geometry("380x90")
+        search_window.configure(bg='black')
+        search_window.attributes('-topmost', True)
+        search_window.transient(self.root)
+        self.step_search_window = search_window
+        
+        query_entry = tk.Entry(search_window, font=('Arial', 11), width=36)
+        query_entry.insert(0, self.core.search_query)
+        query_entry.select_range(0, tk.END)
+        query_entry.pack(fill=tk.X, padx=10, pady=(10, 5))
+        
+        status_label = tk.Label(search_window, text="", font=('Arial', 8), fg='gray', bg='black', anchor='w')
+        status_label.pack(fill=tk.X, padx=10)
+        
+        refresh_after_id = None
+        
+        def update_status():
+            nonlocal refresh_after_id
+            refresh_after_id = None
+            query = query_entry.get()
+            matches, ordinal, progress, memory = self.core.search_status(query)
+            if not query.strip():
+                text = "Type to search step text"
+            elif not matches:
+                text = "No matches"
+            else:
+                total = f"{matches}+" if matches >= MATCH_COUNT_LIMIT else str(matches)
+                text = f"Match {ordinal} of {total}" if ordinal is not None else f"{total} matches"
+            if progress < 1.0:
+                text += f" | indexing {progress:.0%}"
+                # Results fill in as the background build progresses
+                refresh_after_id = search_window.after(100, update_status)
+            elif memory is not None:
+                text += f" | index {memory / (1024 * 1024):.1f} MB"
+            status_label.config(text=text)
+        
+        def search(forward=True, include_current=False):
+            nonlocal refresh_after_id
+            query = query_entry.get()
+            if query.strip() and self.core.find_step(query, forward, include_current):
+                self.update_display()
+            # Counting costs more than finding, so it waits until typing pauses
+            if refresh_after_id is not None:
+                search_window.after_cancel(refresh_after_id)
+            refresh_after_id = search_window.after(SEARCH_STATUS_DELAY_MS, update_status)
+            return "break"
+        
+        def on_key_release(event):
+            if event.keysym in ('Return', 'Escape', 'Up', 'Down', 'Shift_L', 'Shift_R'):
+                return
+            search(include_current=True)
+        
+        def close_search(event=None):
+            if refresh_after_id is not None:
+                search_window.after_cancel(refresh_after_id)
+            self.step_search_window = None
+            search_window.destroy()
+        
+        query_entry.bind("<KeyRelease>", on_key_release)
+        query_entry.bind("<Return>", lambda event: search(True))
+        query_entry.bind("<Shift-Return>", lambda event: search(False))
+        query_entry.bind("<Down>", lambda event: search(True))
+        query_entry.bind("<Up>", lambda event: search(False))
+        search_window.bind("<Escape>", close_search)
+        search_window.protocol("WM_DELETE_WINDOW", close_search)
+        
+        update_status()
+        query_entry.focus_force()
+    
     def update_display(self):
         """Update the step display"""
+        if self._defer_render:
+            self._render_pending = True
+            return
         if self.steps:
-            self.step_counter.config(text=f"Step {self.current_step + 1} of {len(self.steps)}")
-            self.step_display.config(text=self.steps[self.current_step])
+            self.renderer.show(self.core.step_counter_text(), self.core.current_step_text())
+            self.renderer.prefetch(self.steps, self.current_step)
         else:
-            self.step_counter.config(text="No steps available")
-            self.step_display.config(text="No steps loaded")
+            self.renderer.show(self.core.step_counter_text(), "No steps loaded")
+        if self.control_server is not None and self.control_server.subscribers:
+            self.control_server.publish(control_server.core_state(self.core))
             
     def quit_application(self):
         """Quit the application"""
@@ -707,33 +1910,57 @@ class VTaskTracker:
         """Clean up resources"""
         if hasattr(self, 'listener'):
             self.listener.stop()
+        if self.control_server is not None:
+            self.control_server.stop()
+        self.event_bus.stop()
+        if self.hud_after_id is not None:
+            self.root.after_cancel(self.hud_after_id)
+            self.hud_after_id = None
+        if self.timer_after_id is not None:
+            self.root.after_cancel(self.timer_after_id)
+            self.timer_after_id = None
+        for panel in self.panels:
+            panel.close()
+        # A save still being read from the editor can never finish now
+        if self.template_editor is not None:
+            self.template_editor.close()
+        # Pending saves reach disk before exit
+        if not self.core.flush_writes(timeout=5):
+            print("Error saving files: writes still pending at exit")
+        self.core.close()
+        # Reloads that came in too late to apply may hold a mapped step store
+        for action, arg, _ in self.event_bus.take_internal():
+            if action == 'template_reloaded':
+                arg.discard()
+        if self.show_event_stats:
+            print(f"Event bus: {self.event_bus.format_stats()}")
     
     def start_drag(self, event):
         """Start dragging the window"""
-        self.is_dragging = True
-        self.drag_start_x = event.x_root
-        self.drag_start_y = event.y_root
-        self.drag_window_x = self.root.winfo_x()
-        self.drag_window_y = self.root.winfo_y()
+        self.exit_idle()
+        self.drag.begin(event)
     
     def drag_window(self, event):
-        """Handle window dragging"""
-        if self.is_dragging:
-            # Calculate new window position
-            delta_x = event.x_root - self.drag_start_x
-            delta_y = event.y_root - self.drag_start_y
-            new_x = self.drag_window_x + delta_x
-            new_y = self.drag_window_y + delta_y
-            
-            # Update window position
-            self.root.geometry(f"+{new_x}+{new_y}")
+        """Follow the pointer, at most once per frame"""
+        self.drag.motion(event)
     
     def stop_drag(self, event):
-        """Stop dragging the window"""
-        self.is_dragging = False
+        """Stop dragging; a moved window's position is saved"""
+        self.drag.end(event)
+    
+    def drag_moved(self, x, y):
+        """Remember where the window was left"""
+        self.settings['window_position'] = [x, y]
+        self.core.save_overlay_settings()
 
 if __name__ == "__main__":
-    tracker = VTaskTracker()
+    parser = argparse.ArgumentParser(description="VTask Tracker overlay")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print a startup timing report once the overlay is fully up, then exit")
+    parser.add_argument('--measure-idle', type=float, metavar='SECONDS',
+                        help="measure CPU and wakeups for SECONDS each while active, idle and hidden, then exit")
+    args = parser.parse_args()
+    tracker = VTaskTracker(profile_startup=args.profile_startup, measure_idle=args.measure_idle)
     try:
         tracker.run()
     except KeyboardInterrupt:
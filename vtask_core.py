@@ -0,0 +1,854 @@
+import json
+import os
+import threading
+from step_store import load_template, close_steps, snapshot_steps
+from sections import SectionOutline
+from binary_template import is_binary_template, encode_binary_template
+from progress_journal import ProgressJournal
+from keybind_index import KeybindIndex, KeySequenceMatcher, KeybindConflict
+from repeat_engine import RepeatEngine
+from startup_snapshot import StartupSnapshot, SNAPSHOT_FILE
+from template_library import TemplateLibrary, LIBRARY_INDEX_FILE
+from step_search import StepIndex
+from hot_reload import TemplateReloader, TemplateWatcher
+from file_writer import FileWriter
+from split_timer import SplitTimer, PersonalBests, IDLE, RUNNING
+from template_text import TemplateStreamEncoder, format_lines, classify, decode_step, STEP
+from playlist import Playlist, TemplatePrefetcher
+from navigation_history import NavigationHistory, Bookmarks
+from keybind_profiles import KeybindProfiles
+
+
+DEFAULT_KEYBINDS = {
+    "next_step": {"modifiers": ["shift"], "key": "d"},
+    "previous_step": {"modifiers": ["shift"], "key": "s"},
+    "quit_app": {"modifiers": ["shift"], "key": "q"},
+    "minimize_toggle": {"modifiers": ["shift"], "key": "r"},
+    "jump_to_step": {"modifiers": ["ctrl", "shift"], "key": "j", "argument": "number"},
+    "toggle_perf_hud": {"modifiers": ["ctrl", "shift"], "key": "p"},
+    "dump_perf_stats": {"modifiers": ["ctrl", "shift"], "key": "o"},
+    "quick_switch": {"modifiers": ["ctrl", "shift"], "key": "l"},
+    "search_steps": {"modifiers": ["ctrl", "shift"], "key": "f"},
+    "next_section": {"modifiers": ["ctrl", "shift"], "key": "d"},
+    "previous_section": {"modifiers": ["ctrl", "shift"], "key": "s"},
+    "edit_template": {"modifiers": ["ctrl", "shift"], "key": "e"},
+    "toggle_timer": {"modifiers": ["ctrl", "shift"], "key": "t"},
+    "next_template": {"modifiers": ["ctrl", "shift"], "key": "n"},
+    "previous_template": {"modifiers": ["ctrl", "shift"], "key": "b"},
+    "undo_step": {"modifiers": ["ctrl", "shift"], "key": "z"},
+    "redo_step": {"modifiers": ["ctrl", "shift"], "key": "y"},
+    "set_bookmark": {"modifiers": ["ctrl", "shift"], "key": "m", "argument": "number"},
+    "goto_bookmark": {"modifiers": ["ctrl", "shift"], "key": "g", "argument": "number"},
+    "next_keybind_profile": {"modifiers": ["ctrl", "shift"], "key": "k"}
+}
+
+SAMPLE_STEPS = [
+    "Start the game and create your character",
+    "Collect basic materials (stone, wood, fiber)",
+    "Build your first Castle Heart",
+    "Craft basic weapons and armor",
+    "Find and defeat the first boss",
+    "Upgrade your Castle Heart to level 2",
+    "Explore the world for better resources",
+    "Defeat the second boss",
+    "Continue following the main quest line"
+]
+
+
+def template_filename(template_name):
+    """Return the file name a new template is saved under"""
+    return f"{template_name.replace(' ', '_').lower()}_template.json"
+
+
+class TrackerCore:
+    """UI-free tracker state: navigation, keybind matching, template I/O and config
+
+    Nothing here imports Tk or pynput, so it can be driven and measured headless.
+    The overlay in vrising_overlay.py is a view on top of it.
+    """
+
+    def __init__(self, keybind_config_file="keybind_config.json", settings_file="overlay_settings.json",
+                 journal_file="progress.journal", template="sample_guide.json", snapshot_file=SNAPSHOT_FILE,
+                 library_index_file=LIBRARY_INDEX_FILE, personal_bests_file="personal_bests.json",
+                 bookmarks_file="bookmarks.json"):
+        self.init_guide_state(template)
+
+        # Every file save goes through this thread; started on the first write
+        self.file_writer = FileWriter()
+
+        # Pre-parsed keybinds and template from the last run
+        self.snapshot = StartupSnapshot(snapshot_file).load()
+
+        # Keybind configuration
+        self.keybind_config_file = keybind_config_file
+        self.default_keybinds = json.loads(json.dumps(DEFAULT_KEYBINDS))
+        # Profile name -> (keybinds, compiled KeybindIndex), so switching to a profile doesn't recompile it
+        self._profile_indexes = {}
+        self.keybinds = self.load_keybind_config()
+        self.rebuild_keybind_index()
+
+        # Overlay settings (window position etc.)
+        self.settings_file = settings_file
+        self.settings = self.load_overlay_settings()
+        self.repeat_engine = RepeatEngine(self.settings.get('repeat', {}))
+
+        # Searchable index of every guide on disk, loaded on first use
+        self.library = TemplateLibrary(self.settings.get('library_dirs', ['.']), library_index_file)
+        self._library_loaded = False
+        self._library_scan_thread = None
+
+        # Per-template position, persisted in the background
+        self.progress_journal = ProgressJournal(journal_file)
+        self.progress_journal.load()
+
+        # Best split times per template, read when a timer is first started
+        self.personal_bests = PersonalBests(personal_bests_file)
+
+        # Named steps per template, read on first use
+        self.bookmarks = Bookmarks(bookmarks_file)
+
+        # Templates run back to back; the next ones are parsed ahead in the background
+        self.playlist = Playlist(self.settings.get('playlist', []))
+        self.prefetcher = TemplatePrefetcher()
+
+    def init_guide_state(self, template):
+        """Set up the state that belongs to one guide rather than to the process"""
+        self.primary = None
+        self.current_step = 0
+        self.steps = []
+        # SectionOutline over the flattened steps, None for a flat guide
+        self.outline = None
+        self.current_template = template
+        self.modifier_mask = 0
+
+        # Positions visited in this guide, for undo/redo
+        self.history = NavigationHistory()
+
+        # Token index over the loaded steps, built on first search
+        self.step_index = None
+        self.search_query = ''
+
+        # Hot reload of the active template (see watch_template)
+        self.template_watcher = None
+        self._reload_callback = None
+
+        # Speedrun timer, split on every forward move
+        self.split_timer = SplitTimer()
+
+    @classmethod
+    def create_panel(cls, primary, template, keybinds):
+        """Create the core for an extra guide panel
+
+        The panel has its own template, position, keybinds and repeat state but
+        shares the primary core's settings, caches, progress journal and file
+        writer, which stay owned by the primary.
+        """
+        core = cls.__new__(cls)
+        core.init_guide_state(template)
+        core.primary = primary
+        core.file_writer = primary.file_writer
+        core.snapshot = primary.snapshot
+        core.keybind_config_file = None
+        core.default_keybinds = {}
+        core.keybind_profiles = KeybindProfiles()
+        core._profile_indexes = {}
+        core.keybinds = dict(keybinds)
+        core.rebuild_keybind_index()
+        core.settings_file = primary.settings_file
+        core.settings = primary.settings
+        core.repeat_engine = RepeatEngine(core.settings.get('repeat', {}))
+        core.library = primary.library
+        core._library_loaded = False
+        core._library_scan_thread = None
+        core.progress_journal = primary.progress_journal
+        core.personal_bests = primary.personal_bests
+        core.bookmarks = primary.bookmarks
+        # Playlists are only followed by the primary guide
+        core.playlist = Playlist()
+        core.prefetcher = None
+        return core
+
+    def start(self):
+        """Start background services"""
+        if self.primary is None:
+            self.progress_journal.start()
+
+    def close(self):
+        """Flush background services and release the loaded steps"""
+        self.stop_watching()
+        if self.primary is None:
+            self.prefetcher.close(timeout=5)
+            self.file_writer.close(timeout=5)
+            self.progress_journal.close()
+            self.snapshot.save()
+            self.library.save()
+        self.reset_step_index()
+        close_steps(self.steps)
+
+    # Config
+
+    def load_keybind_config(self):
+        """Load keybind profiles from file or use defaults; returns the active profile's keybinds"""
+        config = self.snapshot.get('keybinds', self.keybind_config_file)
+        if config is None and os.path.exists(self.keybind_config_file):
+            try:
+                with open(self.keybind_config_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+                    self.snapshot.put('keybinds', self.keybind_config_file, config)
+            except Exception as e:
+                print(f"Error loading keybind config: {e}")
+                config = None
+        self.keybind_profiles = KeybindProfiles.from_config(config or {})
+        return self.profile_keybinds(self.keybind_profiles.active)
+
+    def profile_keybinds(self, name):
+        """Return a profile's keybinds merged over the defaults, so every action is present"""
+        keybinds = self.default_keybinds.copy()
+        keybinds.update(self.keybind_profiles.get(name) or {})
+        return keybinds
+
+    def store_keybind_profile(self, name, keybinds):
+        """Save keybinds as profile name (new or existing) and make it the active one"""
+        self.keybind_profiles.set(name, keybinds)
+        self.keybind_profiles.active = name
+        self.keybinds = keybinds
+        self._profile_indexes.pop(name, None)
+        self.rebuild_keybind_index()
+
+    def compiled_profile(self, name):
+        """Return (keybinds, KeybindIndex) for a profile, compiling it on first use; raises KeybindConflict"""
+        compiled = self._profile_indexes.get(name)
+        if compiled is None:
+            keybinds = self.profile_keybinds(name)
+            compiled = self._profile_indexes[name] = (keybinds, KeybindIndex(keybinds))
+        return compiled
+
+    def switch_keybind_profile(self, name):
+        """Make another stored profile active and remember it; returns False if it is missing or conflicts
+
+        Reuses the profile's compiled index (the dispatcher compiles every
+        profile up front), and the save is serialized on the writer thread,
+        so a switch does no compiling or JSON work here.
+        """
+        if name not in self.keybind_profiles:
+            return False
+        try:
+            keybinds, index = self.compiled_profile(name)
+        except KeybindConflict as e:
+            print(f"Error in keybind profile {name}: {e}")
+            return False
+        self.keybind_profiles.active = name
+        self.keybinds = keybinds
+        self.keybind_index = index
+        self.key_matcher.set_index(index)
+        self.save_keybind_config()
+        return True
+
+    def save_keybind_config(self, on_done=None):
+        """Queue a save of every keybind profile; on_done(error) reports the result"""
+        # Serialized on the writer thread; back-to-back saves are coalesced into one write
+        self.file_writer.write(self.keybind_config_file, self.keybind_profiles.snapshot(), on_done)
+
+    def load_overlay_settings(self):
+        """Load overlay settings from file"""
+        if os.path.exists(self.settings_file):
+            try:
+                with open(self.settings_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading overlay settings: {e}")
+        return {}
+
+    def save_overlay_settings(self, on_done=None):
+        """Queue a save of the overlay settings; on_done(error) reports the result"""
+        try:
+            payload = json.dumps(self.settings, indent=2)
+        except Exception as e:
+            print(f"Error saving overlay settings: {e}")
+            if on_done:
+                on_done(e)
+            return
+        self.file_writer.write(self.settings_file, payload, on_done)
+
+    def flush_writes(self, timeout=None):
+        """Wait for queued saves to reach disk; returns False on timeout"""
+        return self.file_writer.flush(timeout)
+
+    def rebuild_keybind_index(self):
+        """Compile the keybind configuration into the dispatch index"""
+        try:
+            index = KeybindIndex(self.keybinds)
+        except KeybindConflict as e:
+            print(f"Error in keybind config, using defaults: {e}")
+            self.keybinds = self.default_keybinds.copy()
+            index = KeybindIndex(self.keybinds)
+        self.keybind_index = index
+        self._profile_indexes[self.keybind_profiles.active] = (self.keybinds, index)
+        if hasattr(self, 'key_matcher'):
+            self.key_matcher.set_index(index)
+        else:
+            self.key_matcher = KeySequenceMatcher(index)
+
+    @staticmethod
+    def check_keybinds(keybinds):
+        """Raise KeybindConflict if the keybinds cannot be compiled"""
+        KeybindIndex(keybinds)
+
+    # Keybind matching
+
+    def press_modifier(self, bit):
+        """Record a modifier key going down"""
+        self.modifier_mask |= bit
+
+    def release_modifier(self, bit):
+        """Record a modifier key going up"""
+        self.modifier_mask &= ~bit
+
+    def match_key(self, key):
+        """Feed a non-modifier key; return (action, argument) when a binding completes"""
+        return self.key_matcher.feed(self.modifier_mask, key)
+
+    def handle_key(self, key, now=None):
+        """Match a key press and apply debounce/auto-repeat
+
+        Returns (action, argument, count) or None when nothing should fire.
+        """
+        match = self.key_matcher.feed(self.modifier_mask, key)
+        if match is None:
+            return None
+        action, arg = match
+        count = self.repeat_engine.press(action, key, now)
+        if not count:
+            return None
+        return action, arg, count
+
+    def release_key(self, key):
+        """Record a non-modifier key going up (ends auto-repeat)"""
+        self.repeat_engine.release(key)
+
+    def update_repeat_settings(self, repeat_settings):
+        """Apply and persist per-action repeat settings"""
+        self.settings['repeat'] = repeat_settings
+        self.repeat_engine.update_settings(repeat_settings)
+        self.save_overlay_settings()
+
+    # Templates
+
+    def set_steps(self, steps, outline=None):
+        """Replace the loaded steps and their section outline, releasing the previous step store"""
+        self.outline = outline
+        old_steps, self.steps = self.steps, steps
+        if old_steps is not steps:
+            # The builder may still be reading the old steps
+            self.reset_step_index()
+            close_steps(old_steps)
+
+    def read_template(self, filename):
+        """Open a template as (title, steps, outline), reusing the startup snapshot when the file is unchanged"""
+        cached = self.snapshot.get('template', filename)
+        if cached is not None:
+            title, steps, entries = cached
+            return title, steps, SectionOutline(entries) if entries else None
+        title, steps, outline = load_template(filename)
+        # Mapped stores already open in O(1); only plain lists are worth snapshotting
+        if isinstance(steps, list):
+            self.snapshot.put('template', filename, (title, steps, outline.entries if outline else None))
+        return title, steps, outline
+
+    def load_guide(self):
+        """Load the current template; returns False if the file does not exist"""
+        if not os.path.exists(self.current_template):
+            return False
+        _, steps, outline = self.read_template(self.current_template)
+        self.set_steps(steps, outline)
+        self.split_timer.reset()
+        self.history.clear()
+        self.current_step = self.resume_position()
+        self.rewatch_template()
+        self.prefetch_upcoming()
+        return True
+
+    def open_template_file(self, filename, step=None):
+        """Make filename the current template at a 0-based step, or at its journaled step by default
+
+        A playlist template the prefetcher has already parsed is swapped in
+        without touching the disk.
+        """
+        template = self.prefetcher.take(filename) if self.playlist else None
+        if template is None:
+            template = self.read_template(filename)
+        _, steps, outline = template
+        self.set_steps(steps, outline)
+        self.split_timer.reset()
+        self.history.clear()
+        self.current_template = filename
+        if step is None:
+            self.current_step = self.resume_position()
+        else:
+            self.current_step = max(0, min(step, len(self.steps) - 1))
+            self.record_progress()
+        self.rewatch_template()
+        self.prefetch_upcoming()
+
+    # Playlist
+
+    def prefetch_upcoming(self):
+        """Have the playlist templates after the current one parsed in the background"""
+        if self.playlist:
+            self.prefetcher.request(self.playlist.upcoming(self.current_template))
+
+    def next_template(self):
+        """Open the next playlist template at its first step; returns True if the guide changed"""
+        filename = self.playlist.neighbour(self.current_template, 1)
+        if filename is None and self.playlist and self.playlist.position(self.current_template) is None:
+            # Not in the playlist yet: start it
+            filename = self.playlist.paths[0]
+        return self._open_playlist_entry(filename, 1, step=0)
+
+    def previous_template(self):
+        """Reopen the previous playlist template where it was left; returns True if the guide changed"""
+        filename = self.playlist.neighbour(self.current_template, -1)
+        return self._open_playlist_entry(filename, -1)
+
+    def _open_playlist_entry(self, filename, offset, step=None):
+        """Open filename, skipping entries that fail to load in the direction of offset
+
+        A missing or malformed entry is reported and passed over; if none can
+        be opened, the current guide stays loaded and False is returned.
+        """
+        while filename is not None:
+            try:
+                self.open_template_file(filename, step)
+                return True
+            except Exception as e:
+                print(f"Error opening playlist entry {filename}: {e}")
+            filename = self.playlist.neighbour(filename, offset)
+        return False
+
+    def save_template_file(self, filename, title=None, on_done=None):
+        """Queue a save of the loaded steps (binary if filename ends in .vtg, JSON otherwise)"""
+        if os.path.abspath(filename) == os.path.abspath(self.current_template):
+            # The target may be the file backing a mapped step store
+            self.set_steps(list(self.steps), self.outline)
+        outline = self.outline
+        # Decoded on the writer thread; hot reload or a template switch can't change it meanwhile
+        snapshot = snapshot_steps(self.steps)
+        if title is None:
+            title = os.path.splitext(os.path.basename(filename))[0]
+
+        def payload():
+            try:
+                if is_binary_template(filename):
+                    # The binary format is flat: sections are saved as their flattened steps
+                    return encode_binary_template(title, snapshot)
+                if outline is not None:
+                    leading, sections = outline.nest(snapshot)
+                    return json.dumps({"title": title, "steps": leading, "sections": sections}, indent=2)
+                return json.dumps({"title": title, "steps": list(snapshot)}, indent=2)
+            finally:
+                close_steps(snapshot)
+        self.file_writer.write(filename, payload, on_done)
+
+    def template_lines(self, filename):
+        """Return (title, step count, editor lines) for opening a template in the editor
+
+        Lines are generated as they are read, and a mapped step store is
+        released once they run out.
+        """
+        title, steps, outline = load_template(filename)
+
+        def lines():
+            try:
+                yield from format_lines(steps, outline)
+            finally:
+                close_steps(steps)
+        return title, len(steps), lines()
+
+    def save_template_lines(self, filename, title, line_chunks, on_done=None):
+        """Queue a streamed save of editor lines, given as an iterable of line lists
+
+        line_chunks is consumed on the writer thread (usually a ChunkFeed the
+        editor fills a slice at a time), and JSON is encoded and written chunk
+        by chunk, so saving never holds the whole guide as one string.
+        """
+        if os.path.abspath(filename) == os.path.abspath(self.current_template):
+            # The target may be the file backing a mapped step store
+            self.set_steps(list(self.steps), self.outline)
+        if is_binary_template(filename):
+            def payload():
+                # The binary format needs every step's offset up front
+                steps = [decode_step(line) for chunk in line_chunks for line in chunk if classify(line) == STEP]
+                return encode_binary_template(title, steps)
+        else:
+            def payload():
+                encoder = TemplateStreamEncoder(title)
+                for chunk in line_chunks:
+                    yield encoder.feed(chunk)
+                yield encoder.finish()
+        self.file_writer.write(filename, payload, on_done)
+
+    def create_sample_guide(self):
+        """Create a sample speedrun guide"""
+        guide_data = {
+            "title": "VTask Tracker Guide",
+            "steps": SAMPLE_STEPS
+        }
+
+        self.file_writer.write("speedrun_guide.json", json.dumps(guide_data, indent=2))
+
+        self.set_steps(list(SAMPLE_STEPS))
+        self.current_step = 0
+
+    # Hot reload
+
+    def watch_template(self, callback):
+        """Watch the active template; callback(diff) runs on the watcher thread for each edit
+
+        The diff must be handed back to apply_template_diff on the thread that
+        owns the core.
+        """
+        self._reload_callback = callback
+        self.rewatch_template()
+
+    def rewatch_template(self):
+        """Point the watcher at the current template"""
+        if self._reload_callback is None:
+            return
+        # Don't block the caller; a late diff from the old watcher is dropped or reconciled
+        self.stop_watching(wait=False)
+        if not os.path.exists(self.current_template):
+            return
+        reloader = TemplateReloader(self.current_template)
+        callback = self._reload_callback
+
+        def on_change():
+            diff = reloader.check()
+            if diff is not None:
+                callback(diff)
+        self.template_watcher = TemplateWatcher(self.current_template, on_change, on_start=reloader.prime).start()
+
+    def stop_watching(self, wait=True):
+        """Stop the template watcher"""
+        if self.template_watcher is not None:
+            self.template_watcher.stop(wait)
+            self.template_watcher = None
+
+    def apply_template_diff(self, diff):
+        """Apply a TemplateDiff to the loaded steps, keeping the reader on the same step
+
+        Returns False if the diff is for a template that is no longer active.
+        """
+        if os.path.abspath(diff.path) != os.path.abspath(self.current_template):
+            diff.discard()
+            return False
+        position = diff.map_position(self.current_step)
+        if diff.steps is not None:
+            self.set_steps(diff.steps, diff.outline)
+            diff.steps = None
+        elif isinstance(self.steps, list) and len(self.steps) == diff.old_count:
+            # The index builder may be iterating the list being spliced
+            self.reset_step_index()
+            self.steps[diff.start:diff.start + diff.removed] = diff.inserted
+            self.outline = diff.outline
+        else:
+            # Out of step with the watcher (or switching to an in-memory list): load it whole
+            _, steps, outline = load_template(self.current_template)
+            self.set_steps(steps, outline)
+        position = max(0, min(position, len(self.steps) - 1))
+        if position != self.current_step:
+            self.current_step = position
+            self.record_progress()
+        return True
+
+    # Template library
+
+    def refresh_library(self):
+        """Rescan the library directories; returns (parsed, unchanged, removed)"""
+        if not self._library_loaded:
+            self.library.load()
+            self._library_loaded = True
+        return self.library.refresh()
+
+    def scan_library(self, on_done):
+        """Rescan the library on a worker thread; returns False if a scan is already running
+
+        on_done(scan, error) runs on the worker thread; the UI posts it back
+        and hands the LibraryScan to apply_library_scan on its own thread.
+        """
+        if self._library_scan_thread is not None and self._library_scan_thread.is_alive():
+            return False
+        loaded = self._library_loaded
+        library = self.library
+
+        def run():
+            try:
+                # The first scan starts from the persisted index, read here rather than on the UI thread
+                scan, error = library.scan(None if loaded else library.read_index()), None
+            except Exception as e:
+                scan, error = None, e
+            on_done(scan, error)
+        self._library_scan_thread = threading.Thread(target=run, name="LibraryScan", daemon=True)
+        self._library_scan_thread.start()
+        return True
+
+    def apply_library_scan(self, scan):
+        """Install a finished library scan; returns (parsed, unchanged, removed)"""
+        self._library_loaded = True
+        return self.library.apply(scan)
+
+    def search_templates(self, query, limit=50):
+        """Search indexed guides by title and step text; returns [(path, title, step count)]"""
+        return self.library.search(query, limit)
+
+    # Step search
+
+    def get_step_index(self):
+        """Return the index over the loaded steps, starting its build if needed"""
+        if self.step_index is None:
+            self.step_index = StepIndex(self.steps).start()
+        return self.step_index
+
+    def reset_step_index(self):
+        """Drop the step index, stopping a running build"""
+        if self.step_index is not None:
+            self.step_index.cancel()
+            self.step_index = None
+
+    def find_step(self, query, forward=True, include_current=False):
+        """Move to the next (or previous) step matching query; returns True if one was found
+
+        include_current keeps the position when the current step already
+        matches, which is what search-as-you-type wants.
+        """
+        if not self.steps:
+            return False
+        self.search_query = query
+        current = self.current_step
+        if include_current:
+            current += -1 if forward else 1
+        found = self.get_step_index().find(query, current, forward)
+        if found is None:
+            return False
+        if found != self.current_step:
+            self.history.record(self.current_step, found)
+            self.current_step = found
+            self.record_progress()
+        return True
+
+    def next_match(self):
+        """Repeat the last search forwards"""
+        return bool(self.search_query) and self.find_step(self.search_query, True)
+
+    def previous_match(self):
+        """Repeat the last search backwards"""
+        return bool(self.search_query) and self.find_step(self.search_query, False)
+
+    def search_status(self, query):
+        """Return (matches, ordinal of the current step, fraction indexed, index bytes or None)"""
+        index = self.get_step_index()
+        matches, ordinal = index.count(query, self.current_step)
+        # Sizing walks every posting list, so only do it once the build is done
+        memory = index.memory_bytes() if index.complete else None
+        return matches, ordinal, index.progress(), memory
+
+    # Navigation
+
+    def resume_position(self):
+        """Return the journaled step for the current template, clamped to the guide"""
+        step = self.progress_journal.get(self.current_template)
+        return max(0, min(step, len(self.steps) - 1))
+
+    def record_progress(self):
+        """Journal the current position (non-blocking)"""
+        self.progress_journal.record(self.current_template, self.current_step)
+
+    def next_step(self, count=1):
+        """Move forward, past the last step into the next playlist template; returns True if anything changed"""
+        if self.current_step < len(self.steps) - 1:
+            previous = self.current_step
+            self.current_step = min(previous + count, len(self.steps) - 1)
+            self.history.record(previous, self.current_step)
+            self.record_progress()
+            if self.split_timer.state == RUNNING:
+                self.record_split()
+            return True
+        if self.playlist and self.settings.get('playlist_auto_advance', True):
+            return self.next_template()
+        return False
+
+    def previous_step(self, count=1):
+        """Move back; returns True if the position changed"""
+        if self.current_step > 0:
+            previous = self.current_step
+            self.current_step = max(previous - count, 0)
+            self.history.record(previous, self.current_step)
+            self.record_progress()
+            return True
+        return False
+
+    def jump_to_step(self, step_number):
+        """Jump to a 1-based step number, clamped to the guide"""
+        if not self.steps or step_number is None:
+            return False
+        previous = self.current_step
+        self.current_step = max(0, min(step_number - 1, len(self.steps) - 1))
+        if self.current_step != previous:
+            self.history.record(previous, self.current_step)
+        self.record_progress()
+        if self.split_timer.state == RUNNING and self.current_step > previous:
+            self.record_split()
+        return True
+
+    def next_section(self, count=1):
+        """Move to the start of the next section; returns True if the position changed"""
+        if self.outline is None:
+            return False
+        step = self.current_step
+        for _ in range(count):
+            target = self.outline.next_section(step)
+            if target is None or target >= len(self.steps):
+                break
+            step = target
+        return self._move_to(step)
+
+    def previous_section(self, count=1):
+        """Move to the start of the current section, or the previous one when already there"""
+        if self.outline is None:
+            return False
+        step = self.current_step
+        for _ in range(count):
+            target = self.outline.previous_section(step)
+            if target is None:
+                break
+            step = target
+        return self._move_to(step)
+
+    def _move_to(self, step):
+        """Go to a 0-based step; returns True if the position changed"""
+        if step == self.current_step:
+            return False
+        forward = step > self.current_step
+        self.history.record(self.current_step, step)
+        self.current_step = step
+        self.record_progress()
+        if forward and self.split_timer.state == RUNNING:
+            self.record_split()
+        return True
+
+    # History and bookmarks
+
+    def undo_step(self):
+        """Go back to the position before the last move; returns True if the position changed"""
+        return self._restore(self.history.undo())
+
+    def redo_step(self):
+        """Redo the last undone move; returns True if the position changed"""
+        return self._restore(self.history.redo())
+
+    def _restore(self, step):
+        """Return to a position from the history without recording a new move"""
+        if step is None or not self.steps:
+            return False
+        # The guide may have shrunk since (hot reload)
+        step = min(step, len(self.steps) - 1)
+        if step == self.current_step:
+            return False
+        self.current_step = step
+        self.record_progress()
+        return True
+
+    def set_bookmark(self, name):
+        """Bookmark the current step under name (saved in the background); returns True if set"""
+        if not self.steps or name is None:
+            return False
+        bookmarks = self.bookmarks
+        if not bookmarks.loaded:
+            bookmarks.load()
+        bookmarks.set(self.current_template, str(name), self.current_step)
+        self.file_writer.write(bookmarks.path, bookmarks.dumps())
+        return True
+
+    def goto_bookmark(self, name):
+        """Go to the step bookmarked as name; returns True if the position changed"""
+        if not self.steps or name is None:
+            return False
+        bookmarks = self.bookmarks
+        if not bookmarks.loaded:
+            bookmarks.load()
+        step = bookmarks.get(self.current_template, str(name))
+        if step is None:
+            return False
+        return self._move_to(min(step, len(self.steps) - 1))
+
+    # Split timer
+
+    def toggle_timer(self):
+        """Start a run from the current step, or reset the one in progress; returns True if a run started
+
+        Only runs started from the first step are compared with, or can
+        become, the personal best.
+        """
+        timer = self.split_timer
+        if timer.state != IDLE or not self.steps:
+            timer.reset()
+            return False
+        personal_best = None
+        if self.current_step == 0:
+            bests = self.personal_bests
+            if not bests.loaded:
+                bests.load()
+            personal_best = bests.get(self.current_template)
+        timer.start(self.current_template, self.current_step, personal_best)
+        return True
+
+    def record_split(self):
+        """Split the running timer at the current step; a finished run may become the personal best"""
+        timer = self.split_timer
+        if not timer.split(self.current_step, len(self.steps) - 1) or timer.steps[0] != 0:
+            return
+        bests = self.personal_bests
+        if bests.update(timer.template, timer.elapsed(), timer.arrivals(len(self.steps))):
+            timer.new_best = True
+            self.file_writer.write(bests.path, bests.snapshot())
+
+    def current_step_text(self):
+        """Return the text of the current step, or None without steps"""
+        if self.steps:
+            return self.steps[self.current_step]
+        return None
+
+    def step_counter_text(self):
+        """Return the "Step X of Y" counter text, with the section path in sectioned guides"""
+        if self.steps:
+            text = f"Step {self.current_step + 1} of {len(self.steps)}"
+            context = self.outline.context(self.current_step) if self.outline is not None else None
+            if context is not None:
+                titles, position, count = context
+                text += f" | {' > '.join(titles)} ({position}/{count})"
+            return text
+        return "No steps available"
+
+    # Keybind display
+
+    def get_controls_text(self):
+        """Generate controls text based on current keybind configuration"""
+        next_key = self.format_keybind(self.keybinds['next_step'])
+        prev_key = self.format_keybind(self.keybinds['previous_step'])
+        quit_key = self.format_keybind(self.keybinds['quit_app'])
+        minimize_key = self.format_keybind(self.keybinds['minimize_toggle'])
+        text = f"{next_key}: Next | {prev_key}: Previous | {minimize_key}: Min/Max | {quit_key}: Quit"
+        if len(self.keybind_profiles) > 1:
+            text = f"[{self.keybind_profiles.active}] {text}"
+        return text
+
+    @staticmethod
+    def format_keybind(keybind_config):
+        """Format a keybind configuration for display"""
+        modifiers = keybind_config.get('modifiers', [])
+        key = keybind_config.get('key', '')
+
+        modifier_text = '+'.join([mod.capitalize() for mod in modifiers])
+        if modifier_text:
+            return f"{modifier_text}+{key.upper()}"
+        else:
+            return key.upper()